@@ -0,0 +1,319 @@
+"""
+Vectorized audio mixing engine (NumPy).
+
+A track is described as a timeline of clip events (speech lines, inserted ads/songs/Q&A,
+narration). `layout` places them with gaps or equal-power crossfades, the background bed is
+looped under everything and sidechain-ducked wherever a ducking clip has signal, and the
+result is rendered block by block straight into one ffmpeg encoder over stdin - no
+intermediate files and no filter-graph re-encode chains.
+
+With `target_lufs`, the mix is rendered twice in memory: once through an EBU R128 meter, then
+again with the make-up gain and a true-peak limiter on the way into the encoder (still a
+single ffmpeg pass, see loudness.py).
+
+Used by podcast_engine/full_podcast_synth.py (whole episodes) and by Node 3
+(database_builder/pipeline/node_assets_gen.py) to premix narration with channel BGM.
+"""
+import math
+import subprocess
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from database_builder.pipeline.ffmpeg_tools import get_ffmpeg_exe
+from loudness import LoudnessMeter, TruePeakLimiter, TRUE_PEAK_CEILING_DBTP
+
+SAMPLE_RATE = 32000
+BLOCK_SEC = 10.0
+CONTROL_RATE = 100  # ducking envelope resolution, frames per second
+
+DEFAULT_SETTINGS: Dict[str, float] = {
+    "speech_gap_sec": 0.25,     # silence between consecutive dialogue lines
+    "asset_gap_sec": 0.6,       # silence around inserted ads / Q&A
+    "crossfade_sec": 1.5,       # equal-power overlap into and out of songs
+    "edge_fade_sec": 0.01,      # de-click every clip edge
+    "bgm_gain_db": -16.5,       # ~0.15 linear, the volume Composition.tsx plays BGM at
+    "duck_db": -10.0,           # extra BGM attenuation while someone is talking
+    "duck_threshold_db": -45.0, # speech RMS above this opens the sidechain
+    "duck_attack_sec": 0.08,
+    "duck_release_sec": 0.6,
+    "bgm_fade_sec": 2.0,        # fade the bed in/out at the ends of the track
+}
+
+def db_to_gain(db: float) -> float:
+    return 10 ** (db / 20)
+
+def decode_audio(path: str, sample_rate: int = SAMPLE_RATE, max_seconds: Optional[float] = None) -> np.ndarray:
+    """Any file ffmpeg can read -> mono float32 samples in [-1, 1] at sample_rate."""
+    cmd = [get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-i", path]
+    if max_seconds:
+        cmd += ["-t", str(max_seconds)]
+    cmd += ["-f", "f32le", "-ac", "1", "-ar", str(sample_rate), "pipe:1"]
+    result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not decode {path}: {result.stderr.decode('utf-8', 'replace').strip()[-300:]}")
+    return np.frombuffer(result.stdout, dtype="<f4").copy()
+
+def pcm16_to_float(samples: np.ndarray) -> np.ndarray:
+    return samples.astype(np.float32) / 32768.0
+
+def trim_silence(samples: np.ndarray, sample_rate: int = SAMPLE_RATE, threshold_db: float = -50.0,
+                 keep_sec: float = 0.03) -> np.ndarray:
+    """Cut the leading/trailing silence TTS engines pad every request with, keeping a short margin."""
+    loud = np.flatnonzero(np.abs(samples) > db_to_gain(threshold_db))
+    if not loud.size:
+        return samples[:0]
+    keep = int(keep_sec * sample_rate)
+    return samples[max(0, loud[0] - keep):loud[-1] + 1 + keep]
+
+def stitch(pieces: List[np.ndarray], pauses_sec: List[float], sample_rate: int = SAMPLE_RATE,
+           trim: bool = True, lead_sec: float = 0.0) -> np.ndarray:
+    """
+    Join separately synthesized pieces of one text (float samples, in order), with
+    pauses_sec[i] of silence after piece i and lead_sec before the first one (a text opening
+    with a <break>). Padding is trimmed first so the pauses are what you hear.
+    """
+    out = []
+    if lead_sec > 0:
+        out.append(np.zeros(int(lead_sec * sample_rate), dtype=np.float32))
+    for samples, pause in zip(pieces, pauses_sec):
+        out.append(trim_silence(samples, sample_rate) if trim else samples)
+        if pause > 0:
+            out.append(np.zeros(int(pause * sample_rate), dtype=np.float32))
+    return np.concatenate(out).astype(np.float32) if out else np.zeros(0, dtype=np.float32)
+
+def clip_event(samples: np.ndarray, kind: str = "speech", gap_sec: float = 0.0, crossfade_sec: float = 0.0,
+               duck: bool = True, gain_db: float = 0.0, label: str = "") -> Dict[str, Any]:
+    """
+    One timeline entry. `gap_sec` is silence after the previous clip; `crossfade_sec` instead
+    overlaps the previous clip by that much. `duck` marks clips that push the BGM down.
+    """
+    return {"samples": samples, "kind": kind, "gap_sec": gap_sec, "crossfade_sec": crossfade_sec,
+            "duck": duck, "gain_db": gain_db, "label": label}
+
+def _equal_power(n: int) -> Tuple[np.ndarray, np.ndarray]:
+    t = (np.arange(n, dtype=np.float32) + 0.5) / n
+    return np.sin(t * np.pi / 2), np.cos(t * np.pi / 2)
+
+def _place(event: Dict[str, Any], prev: Optional[Dict[str, Any]], cursor: int, sample_rate: int,
+           s: Dict[str, float]) -> Optional[Dict[str, Any]]:
+    """
+    Position one event after `prev` (which ends at `cursor`): gain, edge fades and, for a
+    crossfade, the fade-out applied to the tail of prev's samples in place. None for empty clips.
+    """
+    samples = np.asarray(event["samples"], dtype=np.float32)
+    if not samples.size:
+        return None
+    samples = samples * db_to_gain(event["gain_db"]) if event["gain_db"] else samples.copy()
+    edge = max(1, int(s["edge_fade_sec"] * sample_rate))
+
+    overlap = 0
+    if prev and event["crossfade_sec"] > 0:
+        # Never let a crossfade swallow more than half of either clip
+        overlap = min(int(event["crossfade_sec"] * sample_rate), samples.size // 2, prev["samples"].size // 2)
+    start = max(0, cursor - overlap) if overlap else cursor + int(event["gap_sec"] * sample_rate) * bool(prev)
+
+    fade_in, fade_out = _equal_power(overlap) if overlap else _equal_power(min(edge, samples.size))
+    samples[:fade_in.size] *= fade_in
+    if overlap:
+        prev["samples"][prev["samples"].size - overlap:] *= fade_out
+    tail_in, tail_out = _equal_power(min(edge, samples.size))
+    samples[samples.size - tail_out.size:] *= tail_out
+    return {"start": start, "samples": samples, "duck": event["duck"], "label": event["label"]}
+
+def layout(events: List[Dict[str, Any]], sample_rate: int = SAMPLE_RATE,
+           settings: Optional[Dict[str, float]] = None) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Place events on the sample timeline. Returns ([{start, samples, duck, label}], total_samples),
+    with gains, edge fades and crossfade curves already applied to (copies of) the samples.
+    """
+    s = {**DEFAULT_SETTINGS, **(settings or {})}
+    placed: List[Dict[str, Any]] = []
+    cursor = 0
+    for event in events:
+        clip = _place(event, placed[-1] if placed else None, cursor, sample_rate, s)
+        if clip:
+            placed.append(clip)
+            cursor = clip["start"] + clip["samples"].size
+    return placed, cursor
+
+def duck_envelope(placed: List[Dict[str, Any]], total: int, sample_rate: int = SAMPLE_RATE,
+                  settings: Optional[Dict[str, float]] = None) -> np.ndarray:
+    """BGM gain at CONTROL_RATE: 1.0 in the clear, duck_db under speech, with attack/release ramps."""
+    s = {**DEFAULT_SETTINGS, **(settings or {})}
+    hop = sample_rate // CONTROL_RATE
+    frames = math.ceil(total / hop) + 1
+    level = np.zeros(frames, dtype=np.float32)
+    for clip in placed:
+        if not clip["duck"]:
+            continue
+        samples = clip["samples"]
+        n = samples.size // hop
+        if not n:
+            continue
+        rms = np.sqrt(np.mean(samples[:n * hop].reshape(n, hop) ** 2, axis=1))
+        first = clip["start"] // hop
+        np.maximum(level[first:first + n], rms[:frames - first], out=level[first:first + n])
+
+    active = (level > db_to_gain(s["duck_threshold_db"])).astype(np.float32)
+    # Hold through the short pauses inside and between lines, then ramp in/out over the attack time
+    hold = max(1, int(s["duck_release_sec"] * CONTROL_RATE))
+    active = (np.convolve(active, np.ones(hold, dtype=np.float32))[:frames] > 0).astype(np.float32)
+    ramp = max(1, int(s["duck_attack_sec"] * CONTROL_RATE))
+    amount = np.convolve(active, np.ones(ramp, dtype=np.float32) / ramp, mode="same")
+    return 1.0 - np.clip(amount, 0.0, 1.0) * (1.0 - db_to_gain(s["duck_db"]))
+
+def render_blocks(placed: List[Dict[str, Any]], total: int, sample_rate: int = SAMPLE_RATE,
+                  bgm: Optional[np.ndarray] = None, settings: Optional[Dict[str, float]] = None) -> Iterator[np.ndarray]:
+    """Yield the mixed track in BLOCK_SEC float32 blocks; memory stays bounded by the clips themselves."""
+    s = {**DEFAULT_SETTINGS, **(settings or {})}
+    block = int(BLOCK_SEC * sample_rate)
+    clips = sorted(placed, key=lambda c: c["start"])
+    use_bgm = bgm is not None and bgm.size > 0
+    if use_bgm:
+        envelope = duck_envelope(placed, total, sample_rate, s)
+        envelope_pos = np.arange(envelope.size) * (sample_rate // CONTROL_RATE)
+        bgm_gain = db_to_gain(s["bgm_gain_db"])
+        bgm_fade = max(1, int(s["bgm_fade_sec"] * sample_rate))
+
+    for b0 in range(0, total, block):
+        b1 = min(total, b0 + block)
+        out = np.zeros(b1 - b0, dtype=np.float32)
+        for clip in clips:
+            start, samples = clip["start"], clip["samples"]
+            if start >= b1:
+                break
+            end = start + samples.size
+            if end <= b0:
+                continue
+            lo, hi = max(b0, start), min(b1, end)
+            out[lo - b0:hi - b0] += samples[lo - start:hi - start]
+        if use_bgm:
+            pos = np.arange(b0, b1)
+            edges = np.clip(np.minimum(pos, total - pos) / bgm_fade, 0.0, 1.0)
+            out += bgm[pos % bgm.size] * (bgm_gain * np.interp(pos, envelope_pos, envelope) * edges).astype(np.float32)
+        yield out
+
+class StreamingMixer:
+    """
+    Incremental counterpart of mix_timeline: add() events one at a time (in timeline order) and
+    every block that no later event can still touch - past the longest possible crossfade, duck
+    ramp and BGM fade-out - is mixed and handed to `write` immediately. Memory holds only the clips
+    around the write position. There is no global loudness pass here; level the events before
+    adding them, the optional limiter catches the peaks.
+    """
+
+    def __init__(self, write, sample_rate: int = SAMPLE_RATE, bgm: Optional[np.ndarray] = None,
+                 settings: Optional[Dict[str, float]] = None, limiter: Optional[TruePeakLimiter] = None):
+        self.write = write
+        self.sample_rate = sample_rate
+        self.s = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.bgm = bgm if bgm is not None and bgm.size else None
+        self.limiter = limiter
+        self.block = int(BLOCK_SEC * sample_rate)
+        self.hop = sample_rate // CONTROL_RATE
+        # How far back the envelope of a sample can depend on speech (hold + ramp), in samples
+        self.duck_margin = (int(self.s["duck_release_sec"] * CONTROL_RATE) + int(self.s["duck_attack_sec"] * CONTROL_RATE) + 2) * self.hop
+        self.holdback = int((self.s["crossfade_sec"] + self.s["duck_attack_sec"]
+                             + (self.s["bgm_fade_sec"] if self.bgm is not None else 0.0)) * sample_rate) + self.duck_margin
+        self.placed: List[Dict[str, Any]] = []
+        self.last: Optional[Dict[str, Any]] = None
+        self.cursor = 0
+        self.flushed = 0
+
+    def add(self, event: Dict[str, Any]) -> Optional[float]:
+        """Place an event after everything added so far. Returns its start time in seconds (None if empty)."""
+        clip = _place(event, self.last, self.cursor, self.sample_rate, self.s)
+        if not clip:
+            return None
+        # A crossfade may reach back into audio that is still held back, never into written audio
+        clip["start"] = max(clip["start"], self.flushed)
+        self.placed.append(clip)
+        self.last = clip
+        self.cursor = clip["start"] + clip["samples"].size
+        while self.cursor - self.holdback - self.flushed >= self.block:
+            self._render(self.flushed + self.block)
+        return clip["start"] / self.sample_rate
+
+    def close(self) -> float:
+        """Mix and write everything left (the BGM fades out at the real end). Returns the track length in seconds."""
+        total = self.cursor
+        while self.flushed < total:
+            self._render(min(total, self.flushed + self.block), total)
+        self.placed = []
+        return total / self.sample_rate
+
+    def _render(self, b1: int, total: Optional[int] = None):
+        b0 = self.flushed
+        out = np.zeros(b1 - b0, dtype=np.float32)
+        for clip in self.placed:
+            start, samples = clip["start"], clip["samples"]
+            lo, hi = max(b0, start), min(b1, start + samples.size)
+            if lo < hi:
+                out[lo - b0:hi - b0] += samples[lo - start:hi - start]
+        if self.bgm is not None:
+            pos = np.arange(b0, b1)
+            edges = np.clip(pos / max(1, int(self.s["bgm_fade_sec"] * self.sample_rate)), 0.0, 1.0)
+            if total is not None:
+                edges = np.minimum(edges, np.clip((total - pos) / max(1, int(self.s["bgm_fade_sec"] * self.sample_rate)), 0.0, 1.0))
+            out += self.bgm[pos % self.bgm.size] * (db_to_gain(self.s["bgm_gain_db"]) * self._envelope(b0, b1) * edges).astype(np.float32)
+        if self.limiter:
+            out = self.limiter.process(out)
+        self.write(np.clip(out, -1.0, 1.0))
+        self.flushed = b1
+        # Keep only clips that can still sound or still shape the ducking of unwritten audio
+        self.placed = [c for c in self.placed if c["start"] + c["samples"].size > b1 - self.duck_margin]
+
+    def _envelope(self, b0: int, b1: int) -> np.ndarray:
+        """duck_envelope over a window around [b0, b1), wide enough that the edges don't matter."""
+        w0 = max(0, b0 - self.duck_margin) // self.hop * self.hop
+        w1 = b1 + self.duck_margin
+        window = []
+        for clip in self.placed:
+            start, end = clip["start"], clip["start"] + clip["samples"].size
+            lo, hi = max(start, w0), min(end, w1)
+            if clip["duck"] and lo < hi:
+                window.append({"start": lo - w0, "samples": clip["samples"][lo - start:hi - start], "duck": True})
+        envelope = duck_envelope(window, w1 - w0, self.sample_rate, self.s)
+        return np.interp(np.arange(b0, b1), np.arange(envelope.size) * self.hop + w0, envelope)
+
+def mix_timeline(events: List[Dict[str, Any]], output_path: str, sample_rate: int = SAMPLE_RATE,
+                 bgm_path: Optional[str] = None, settings: Optional[Dict[str, float]] = None,
+                 encoder_args: Optional[List[str]] = None, target_lufs: Optional[float] = None,
+                 ceiling_dbtp: float = TRUE_PEAK_CEILING_DBTP) -> float:
+    """Lay out, mix and encode a timeline in one encoder pass. Returns the track length in seconds."""
+    placed, total = layout(events, sample_rate, settings)
+    if not total:
+        raise ValueError("timeline is empty")
+    bgm = decode_audio(bgm_path, sample_rate) if bgm_path else None
+
+    gain, limiter = 1.0, None
+    if target_lufs is not None:
+        meter = LoudnessMeter(sample_rate)
+        for block in render_blocks(placed, total, sample_rate, bgm, settings):
+            meter.feed(block)
+        if meter.integrated_lufs is not None:
+            gain = db_to_gain(target_lufs - meter.integrated_lufs)
+            print(f"   [Mixer] Loudness {meter.integrated_lufs:.1f} LUFS -> {target_lufs:.1f} LUFS "
+                  f"({20 * math.log10(gain):+.1f} dB), true-peak ceiling {ceiling_dbtp} dBTP")
+        limiter = TruePeakLimiter(sample_rate, ceiling_dbtp)
+
+    cmd = [get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y",
+           "-f", "f32le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0"]
+    cmd += encoder_args or ["-b:a", "192k"]
+    cmd.append(output_path)
+    process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        for block in render_blocks(placed, total, sample_rate, bgm, settings):
+            if limiter:
+                block = limiter.process(block * np.float32(gain))
+            process.stdin.write(np.clip(block, -1.0, 1.0).astype("<f4").tobytes())
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    process.stdin.close()
+    stderr = process.stderr.read().decode("utf-8", errors="replace")
+    if process.wait() != 0:
+        raise RuntimeError(f"ffmpeg encoder failed: {stderr.strip()[-300:]}")
+    return total / sample_rate
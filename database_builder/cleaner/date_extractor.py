@@ -0,0 +1,152 @@
+"""
+Rule-based date pre-extraction for scraped timeline text.
+
+Finds every line that carries a full calendar date and turns it into a candidate
+{year, month, day, text, line_no}, so the LLM only has to write title/summary/category/score
+for short lines instead of reading whole pages. Dates, not the LLM, decide month/day/year.
+
+  English   1973-03-01 | March 1, 1973 | Mar. 1 1973 | 1 March 1973 | 1973 – March 1: ...
+            "March 1" alone takes the nearest year written before it on the same line
+  Chinese   1973年3月1日 | 一九七三年三月一日 | 3月1日 / 3月1号 after a 1973年 on the same line
+
+Each pattern runs once over the whole document (not line by line) and matches are mapped
+back to their line. Citation lines ("^ ...", "Retrieved ...", "Archived from ...", a quoted
+title followed by a publisher list) are skipped: their dates are publication dates, not events.
+
+    python date_extractor.py [collection | file.json | file.txt]   # candidates + token estimate
+"""
+import os
+import re
+import sys
+import json
+import bisect
+import calendar
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional
+
+MONTHS = ["january", "february", "march", "april", "may", "june", "july",
+          "august", "september", "october", "november", "december"]
+MONTH_NUM = {m: i + 1 for i, m in enumerate(MONTHS)}
+MONTH_NUM.update({m[:3]: i + 1 for i, m in enumerate(MONTHS)})
+MONTH_NUM["sept"] = 9
+# Capitalized only: "may 10" in running text is not a date
+MONTH = r'(' + "|".join(sorted((m.capitalize() for m in MONTH_NUM), key=len, reverse=True)) + r')\.?'
+DAY = r'(\d{1,2})(?:st|nd|rd|th)?'
+YEAR = r'(\d{4})'
+CN_DIGITS = "〇零一二三四五六七八九"
+CN_VALUE = {c: (i - 1 if i else 0) for i, c in enumerate(CN_DIGITS)}
+CN_NUM = r'([〇零一二三四五六七八九十]{1,4})'
+
+# (pattern, group order) - groups are picked out as (year, month, day)
+PATTERNS = [
+    (re.compile(rf'\b{YEAR}-(\d{{2}})-(\d{{2}})\b'), "ymd"),
+    (re.compile(rf'\b{MONTH}\s+{DAY},?\s+{YEAR}\b'), "mdy"),
+    (re.compile(rf'\b{DAY}\s+{MONTH},?\s+{YEAR}\b'), "dmy"),
+    (re.compile(rf'\b{YEAR}\s*[–—:\-]\s*{MONTH}\s+{DAY}\b(?!,?\s+\d{{4}})'), "ymd"),
+    (re.compile(rf'\b{MONTH}\s+{DAY}\b(?!,?\s+\d{{4}})'), "md"),
+    (re.compile(r'(\d{4})\s*年\s*(\d{1,2})\s*月\s*(\d{1,2})\s*[日号]'), "ymd"),
+    (re.compile(rf'([{CN_DIGITS}]{{4}})年{CN_NUM}月{CN_NUM}[日号]'), "ymd"),
+    (re.compile(r'(?<![\d年])(\d{1,2})\s*月\s*(\d{1,2})\s*[日号]'), "md_cn"),
+]
+CONTEXT_YEAR_RE = re.compile(r'\b(1[5-9]\d{2}|20\d{2})\b')
+CONTEXT_YEAR_CN_RE = re.compile(r'(\d{4})\s*年')
+# Reference-list lines, including 'Author (1 January 2019). "Title"' once the "^" is on another line
+CITATION_RE = re.compile(r'^\s*\^|Retrieved\s|Archived from|ISBN\s|doi:|\([^()]*\d{4}\)[.,]\s*["“]', re.IGNORECASE)
+# '"Title", Site, Publisher, 16 August 2023': a quoted title, then two or more capitalized names and commas
+QUOTED_TITLE_CITATION_RE = re.compile(r'^\s*["“][^"“”]+[,.]?["”][,.]?\s+(?:[A-Z][^,.;:"“”]{0,40},\s*){2}')
+REF_MARK_RE = re.compile(r'\[\d+\]|\[citation needed\]')
+MIN_YEAR = 1000
+MAX_TEXT_CHARS = 400
+
+def _cn_number(text: str) -> int:
+    """'一九七三' -> 1973, '十二' -> 12, '二十一' -> 21, '三' -> 3."""
+    if "十" in text:
+        tens, _, ones = text.partition("十")
+        return (CN_VALUE[tens] if tens else 1) * 10 + (CN_VALUE[ones] if ones else 0)
+    return int("".join(str(CN_VALUE[c]) for c in text))
+
+def _int(value: str) -> int:
+    return int(value) if value.isdigit() else _cn_number(value)
+
+def _month(value: str) -> int:
+    return MONTH_NUM[value.lower()] if value[0].isalpha() and value[0] not in CN_DIGITS + "十" else _int(value)
+
+def _valid(year: int, month: int, day: int) -> bool:
+    return (MIN_YEAR <= year <= date.today().year + 1 and 1 <= month <= 12
+            and 1 <= day <= calendar.monthrange(year, month)[1])
+
+def _context_year(line: str, before: int, chinese: bool) -> Optional[int]:
+    """The last year written before position `before` on the line."""
+    found = (CONTEXT_YEAR_CN_RE if chinese else CONTEXT_YEAR_RE).findall(line[:before])
+    return int(found[-1]) if found else None
+
+def extract_dates(text: str) -> List[Dict[str, Any]]:
+    """Document text -> candidates [{year, month, day, text, line_no}] in line order, one per (line text, date)."""
+    line_starts = [0] + [m.end() for m in re.finditer(r'\n', text)]
+    lines = text.split("\n")
+    skip = {n for n, line in enumerate(lines) if CITATION_RE.search(line) or QUOTED_TITLE_CITATION_RE.match(line)}
+    found: Dict[tuple, Dict[str, Any]] = {}
+    taken: Dict[int, List[range]] = {}  # spans already matched by a more specific pattern
+
+    for pattern, order in PATTERNS:
+        for match in pattern.finditer(text):
+            line_no = bisect.bisect_right(line_starts, match.start()) - 1
+            if line_no in skip:
+                continue
+            span = range(match.start(), match.end())
+            if any(match.start() in s or match.end() - 1 in s for s in taken.get(line_no, [])):
+                continue
+            groups = match.groups()
+            line = lines[line_no]
+            if order == "ymd":
+                year, month, day = _int(groups[0]), _month(groups[1]), _int(groups[2])
+            elif order == "mdy":
+                year, month, day = int(groups[2]), _month(groups[0]), int(groups[1])
+            elif order == "dmy":
+                year, month, day = int(groups[2]), _month(groups[1]), int(groups[0])
+            else:
+                year = _context_year(line, match.start() - line_starts[line_no], order == "md_cn")
+                month, day = _month(groups[0]), int(groups[1])
+                if year is None:
+                    continue
+            if not _valid(year, month, day):
+                continue
+            taken.setdefault(line_no, []).append(span)
+            clean = " ".join(REF_MARK_RE.sub("", line).split())[:MAX_TEXT_CHARS]
+            # Keyed on the text too: pages repeat lines (lead + table, see-also lists)
+            key = (year, month, day, clean)
+            if key not in found:
+                found[key] = {"year": year, "month": month, "day": day, "text": clean, "line_no": line_no}
+    return sorted(found.values(), key=lambda c: (c["line_no"], c["year"], c["month"], c["day"]))
+
+def iter_candidates(docs: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Corpus documents -> candidates tagged with their doc_id."""
+    for doc in docs:
+        for candidate in extract_dates(doc["text"]):
+            yield {**candidate, "doc_id": doc["doc_id"]}
+
+def _load_documents(source: str) -> List[Dict[str, Any]]:
+    if os.path.exists(source):
+        with open(source, "r", encoding="utf-8") as f:
+            if source.endswith(".json"):
+                return [{"doc_id": k, "text": v} for k, v in json.load(f).items()]
+            return [{"doc_id": os.path.basename(source), "text": f.read()}]
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "db"))
+    from corpus_store import CorpusStore
+    return list(CorpusStore().iter_documents(source))
+
+if __name__ == "__main__":
+    default = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "raw", "wikipedia_timelines_raw.json")
+    docs = _load_documents(sys.argv[1] if len(sys.argv) > 1 else default)
+    total_chars = total_candidates = candidate_chars = 0
+    for doc in docs:
+        candidates = extract_dates(doc["text"])
+        total_chars += len(doc["text"])
+        total_candidates += len(candidates)
+        candidate_chars += sum(len(c["text"]) for c in candidates)
+        print(f"📄 {doc['doc_id']}: {len(doc['text'])} chars -> {len(candidates)} dated lines")
+        for c in candidates[:3]:
+            print(f"    {c['year']}-{c['month']:02d}-{c['day']:02d}  {c['text'][:90]}")
+    if total_chars:
+        print(f"\n📊 {total_candidates} candidates; LLM input {candidate_chars} chars instead of {total_chars} "
+              f"({100 * candidate_chars / total_chars:.1f}%)")
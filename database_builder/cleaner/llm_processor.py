@@ -11,10 +11,13 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 # Automatically append the db path so we can import storage.py
 sys.path.append(os.path.join(SCRIPT_DIR, "..", "db"))
 import storage
+from corpus_store import CorpusStore
+from date_extractor import extract_dates
 
-# The script is in database_builder/cleaner/
-# The data is in database_builder/data/raw/
-RAW_DATA_FILE = os.path.join(SCRIPT_DIR, "..", "data", "raw", "wikipedia_timelines_raw.json")
+# Scraped pages are read from the raw corpus (see db/corpus_store.py, scrapers/wikipedia_scraper.py)
+CORPUS_COLLECTION = "wikipedia_it_history"
+CORPUS_STAGE = "event_extraction"
+ENRICH_BATCH = 40  # dated lines per Gemini call
 
 # ----------------- PYDANTIC SCHEMA DEFINITIONS -----------------
 class HistoricalEvent(BaseModel):
@@ -29,8 +32,107 @@ class HistoricalEvent(BaseModel):
 class EventList(BaseModel):
     events: list[HistoricalEvent] = Field(description="List of extracted tech/IT events.")
 
+# Corpus mode: the date comes from date_extractor, the model only fills in the rest
+class EventEnrichment(BaseModel):
+    id: int = Field(description="id of the input row this event was written for")
+    title: str = Field(description="A highly catchy title for short videos, max 30 words")
+    summary: str = Field(description="Detailed factual summary of the tech event")
+    category: str = Field(description="E.g., Hardware, Software, Company, Hacker, OpenSource, Internet")
+    importance_score: int = Field(description="1-10 video burst potential. 10=changes world tech history (e.g. iPhone). Routine hardware updates=3-5.")
+
+class EnrichmentList(BaseModel):
+    events: list[EventEnrichment] = Field(description="One entry per input row that is a tech/IT event.")
+
 # -------------------------------------------------------------
 
+def generate_events(client, prompt, label, schema=EventList, max_retries=5):
+    """One structured Gemini call with exponential backoff. Returns the events, or None once retries run out."""
+    for attempt in range(max_retries):
+        try:
+            response = client.models.generate_content(
+                model='gemini-3-flash-preview',
+                contents=prompt,
+                config=types.GenerateContentConfig(
+                    response_mime_type="application/json",
+                    response_schema=schema,
+                    temperature=0.3,
+                ),
+            )
+            extracted_data = json.loads(response.text)
+            return extracted_data.get('events', [])
+        except Exception as e:
+            error_msg = str(e)
+            print(f"     ❌ Gemini API Error for {label} (Attempt {attempt+1}/{max_retries}): {error_msg}")
+            if attempt < max_retries - 1:
+                sleep_time = 15 * (2 ** attempt)
+                print(f"     ⏳ Sleeping for {sleep_time}s before retrying...")
+                time.sleep(sleep_time)
+    return None
+
+def enrichment_prompt(batch):
+    """Instructions once, then one `id|YYYY-MM-DD|line` row per dated line."""
+    rows = "\n".join(f"{i}|{c['year']:04d}-{c['month']:02d}-{c['day']:02d}|{c['text']}" for i, c in enumerate(batch))
+    return f"""You are an elite IT History archivist. Each row below is `id|date|line` from a scraped timeline article.
+For every row that states an IT, Computer, Hacker, or Web historical event happening on that date, return its id with:
+a highly catchy Chinese title (for short videos), a strictly factual Chinese summary, an appropriate category
+(e.g., Hardware, Software, Hacker, Internet, Game) and an importance_score. Leave out every other row.
+
+{rows}"""
+
+def process_corpus_with_gemini(collection=CORPUS_COLLECTION, force=False, batch_size=ENRICH_BATCH):
+    """
+    Turn the scraped documents of a corpus collection into events, streaming one document at a time.
+    Dates come from date_extractor; Gemini only sees the dated lines, in compact batches, and writes
+    title/summary/category/score for them. Documents already processed in their current version
+    are skipped (unless force).
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        print("Error: GEMINI_API_KEY not found. Set it in .env")
+        return
+
+    client = genai.Client(api_key=api_key)
+    storage.init_db()
+    store = CorpusStore()
+    total_inserted = 0
+    chars_read, chars_sent = 0, 0
+
+    print(f"🤖 Starting Corpus Gemini Pipeline (corpus/{collection})...")
+    docs = store.iter_documents(collection) if force else store.iter_pending(collection, CORPUS_STAGE)
+    for doc in docs:
+        candidates = extract_dates(doc['text'])
+        chars_read += len(doc['text'])
+        print(f"\n📄 Processing Document: {doc['doc_id']} ({len(doc['text'])} chars -> {len(candidates)} dated lines)...")
+        complete = True
+        for n, start in enumerate(range(0, len(candidates), batch_size)):
+            batch = candidates[start:start + batch_size]
+            prompt = enrichment_prompt(batch)
+            chars_sent += len(prompt)
+            enriched = generate_events(client, prompt, f"{doc['doc_id']} #{n + 1}", schema=EnrichmentList)
+            if enriched is None:
+                complete = False
+                continue
+            # Dates are taken from the extracted line, never from the model
+            extracted_events = [
+                {'year': batch[e['id']]['year'], 'month': batch[e['id']]['month'], 'day': batch[e['id']]['day'],
+                 'title': e['title'], 'summary': e['summary'], 'category': e['category'],
+                 'importance_score': e['importance_score']}
+                for e in enriched if 0 <= e['id'] < len(batch)
+            ]
+            inserted, duplicates = storage.insert_events(extracted_events, source=f"corpus/{collection}/{doc['doc_id']}")
+            print(f"     ✅ Batch {n + 1}: {len(batch)} lines -> {len(extracted_events)} events, {inserted} inserted, {duplicates} duplicate skipped.")
+            total_inserted += inserted
+            time.sleep(5)
+        # A document with a failed batch stays pending, so the next run retries it
+        if complete:
+            store.mark_processed(collection, doc['doc_id'], CORPUS_STAGE, doc['sha1'])
+
+    if chars_read:
+        print(f"\n📉 Prompted with {chars_sent} chars for {chars_read} chars of scraped text ({100 * chars_sent / chars_read:.1f}%).")
+    print(f"\n🎉 Fully Complete! Total DB Grown By: +{total_inserted} events.")
+
 def process_dates_with_gemini(start_month=3, start_day=6, days_to_fetch=30):
     from dotenv import load_dotenv
     load_dotenv()
@@ -66,40 +168,15 @@ def process_dates_with_gemini(start_month=3, start_day=6, days_to_fetch=30):
         6. Provide an appropriate category (e.g., Hardware, Software, Hacker, Internet, Game).
         """
         
-        max_retries = 5
-        for attempt in range(max_retries):
-            try:
-                response = client.models.generate_content(
-                    model='gemini-3-flash-preview',
-                    contents=prompt,
-                    config=types.GenerateContentConfig(
-                        response_mime_type="application/json",
-                        response_schema=EventList,
-                        temperature=0.3,
-                    ),
-                )
-                
-                extracted_data = json.loads(response.text)
-                extracted_events = extracted_data.get('events', [])
-                
-                if not extracted_events:
-                    print("     ⚠️ No valid events found for this date.")
-                    break
-                    
-                inserted, duplicates = storage.insert_events(extracted_events, source=f"gemini_date/{month}_{day}")
-                print(f"     ✅ Found {len(extracted_events)} events for {date_str} -> {inserted} inserted, {duplicates} duplicate skipped.")
-                total_inserted += inserted
-                break
-
-            except Exception as e:
-                error_msg = str(e)
-                print(f"     ❌ Gemini API Error for {date_str} (Attempt {attempt+1}/{max_retries}): {error_msg}")
-                if attempt < max_retries - 1:
-                    sleep_time = 15 * (2 ** attempt)
-                    print(f"     ⏳ Sleeping for {sleep_time}s before retrying...")
-                    time.sleep(sleep_time)
-                else:
-                    print(f"     ☠️ Max retries reached for {date_str}. Skipping to next date.")
+        extracted_events = generate_events(client, prompt, date_str)
+        if extracted_events is None:
+            print(f"     ☠️ Max retries reached for {date_str}. Skipping to next date.")
+        elif not extracted_events:
+            print("     ⚠️ No valid events found for this date.")
+        else:
+            inserted, duplicates = storage.insert_events(extracted_events, source=f"gemini_date/{month}_{day}")
+            print(f"     ✅ Found {len(extracted_events)} events for {date_str} -> {inserted} inserted, {duplicates} duplicate skipped.")
+            total_inserted += inserted
                     
         # Move to the next day
         current_date += timedelta(days=1)
@@ -109,4 +186,9 @@ def process_dates_with_gemini(start_month=3, start_day=6, days_to_fetch=30):
     print(f"\n🎉 Fully Complete! Total DB Grown By: +{total_inserted} events.")
 
 if __name__ == "__main__":
-    process_dates_with_gemini(start_month=3, start_day=6, days_to_fetch=30)
+    if "--corpus" in sys.argv:
+        # python llm_processor.py --corpus [collection] [--force]
+        args = [a for a in sys.argv[sys.argv.index("--corpus") + 1:] if not a.startswith("--")]
+        process_corpus_with_gemini(args[0] if args else CORPUS_COLLECTION, force="--force" in sys.argv)
+    else:
+        process_dates_with_gemini(start_month=3, start_day=6, days_to_fetch=30)
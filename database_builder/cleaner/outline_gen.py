@@ -1,12 +1,18 @@
 import os
-import glob
+import sys
 from google import genai
 from google.genai import types
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-RAW_DIR = os.path.join(SCRIPT_DIR, "..", "..", "data", "raw_stocks")
-OUT_DIR = os.path.join(SCRIPT_DIR, "..", "..", "data", "outlines_stocks")
-os.makedirs(OUT_DIR, exist_ok=True)
+sys.path.append(os.path.join(SCRIPT_DIR, "..", "db"))
+from corpus_store import CorpusStore
+
+# Raw dossiers in, outlines out - both in the raw corpus. A dossier is outlined again only
+# when its text changed since the last outline (stage "outline").
+RAW_COLLECTION = "stocks_raw"
+OUTLINE_COLLECTION = "stocks_outline"
+STAGE = "outline"
+OUTLINE_MODEL = 'gemini-2.5-flash' # Flash is fast and cheap enough for outlining
 
 # Load API key
 try:
@@ -15,24 +21,7 @@ try:
 except ImportError:
     pass
 
-def generate_outline(raw_filepath):
-    filename = os.path.basename(raw_filepath)
-    base_name = os.path.splitext(filename)[0]
-    out_filepath = os.path.join(OUT_DIR, f"{base_name}_outline.md")
-    
-    print(f"✍️ Drafting Outline for: {filename}")
-    
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        print("❌ GEMINI_API_KEY not set.")
-        return False
-        
-    with open(raw_filepath, 'r', encoding='utf-8') as f:
-        raw_text = f.read()
-        
-    client = genai.Client(api_key=api_key)
-    
-    system_prompt = """你现在是喜马拉雅/蜻蜓FM等音频平台最顶级的“财经悬疑故事”金牌编剧。
+OUTLINE_PROMPT = """你现在是喜马拉雅/蜻蜓FM等音频平台最顶级的“财经悬疑故事”金牌编剧。
 我们需要为一档叫《妖股传说与游资复盘》的20分钟音频节目撰写剧本大纲。
 
 要求：
@@ -42,33 +31,53 @@ def generate_outline(raw_filepath):
 4. 输出格式为 Markdown，务必排版清晰（比如标注出每一幕的核心冲突和情绪基调）。
 """
 
+def generate_outline(doc, store: CorpusStore):
+    """`doc` is a stocks_raw corpus document; its outline is stored under the same doc_id."""
+    doc_id = doc["doc_id"]
+    print(f"✍️ Drafting Outline for: {doc_id}")
+    
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        print("❌ GEMINI_API_KEY not set.")
+        return False
+        
+    raw_text = doc["text"]
+        
+    client = genai.Client(api_key=api_key)
+
     try:
         response = client.models.generate_content(
-            model='gemini-2.5-flash', # Flash is fast and cheap enough for outlining
-            contents=[system_prompt, f"Raw Source Material:\n{raw_text}"],
+            model=OUTLINE_MODEL,
+            contents=[OUTLINE_PROMPT, f"Raw Source Material:\n{raw_text}"],
             config=types.GenerateContentConfig(
                 temperature=0.6 # Balance creativity with factual structure
             ),
         )
         
-        with open(out_filepath, 'w', encoding='utf-8') as f:
-            f.write(response.text)
+        store.put(OUTLINE_COLLECTION, doc_id, response.text, source="outline_gen", meta={"raw_sha1": doc["sha1"]})
+        store.mark_processed(RAW_COLLECTION, doc_id, STAGE, doc["sha1"])
             
-        print(f"✅ Saved Outline to {out_filepath} ({len(response.text)} chars)")
+        print(f"✅ Saved Outline to {OUTLINE_COLLECTION}/{doc_id} ({len(response.text)} chars)")
         return True
     except Exception as e:
-        print(f"❌ Failed to generate outline for {filename}: {e}")
+        print(f"❌ Failed to generate outline for {doc_id}: {e}")
         return False
 
 if __name__ == "__main__":
     print(f"🎬 Starting Phase 10: Step 2 - LLM Outline Generator")
-    print(f"📂 Reading from: {RAW_DIR}")
-    print(f"📂 Output to: {OUT_DIR}\n")
+    print(f"📂 Reading from: corpus/{RAW_COLLECTION}")
+    print(f"📂 Output to: corpus/{OUTLINE_COLLECTION}\n")
     
-    raw_files = glob.glob(os.path.join(RAW_DIR, "*.txt"))
-    if not raw_files:
-        print("❌ No raw text files found in data/raw_stocks/")
+    store = CorpusStore()
+    if not store.index(RAW_COLLECTION):
+        print(f"❌ No raw dossiers in corpus/{RAW_COLLECTION} (run stock_scraper.py, or corpus_store.py import)")
         sys.exit(1)
-        
-    for rf in raw_files:
-        generate_outline(rf)
+    
+    # --force re-outlines every dossier, otherwise only new or changed ones
+    docs = store.iter_documents(RAW_COLLECTION) if "--force" in sys.argv else store.iter_pending(RAW_COLLECTION, STAGE)
+    count = 0
+    for doc in docs:
+        generate_outline(doc, store)
+        count += 1
+    if not count:
+        print("✅ Every outline is up to date.")
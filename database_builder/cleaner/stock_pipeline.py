@@ -0,0 +1,284 @@
+"""
+DAG runner for the stock_replay chain, one target (trader in stock_targets.json) at a time:
+
+    scrape (stock_scraper) -> outline (outline_gen) -> synthesis (story_synthesis) -> visual (node_visual_mapper)
+
+Every stage of a target has an input hash over what it reads (the upstream document or event
+text) and what shapes its output (prompt, model, parameters). A stage whose last successful run
+had the same input hash, and whose output still exists, is skipped. Since a stage's inputs are
+the content its upstream produced, a rerun that yields the same text stops there too. Targets
+are independent and run side by side (STOCK_PIPELINE_WORKERS); inside a target the stages run in
+dependency order, and a failed stage blocks only the stages after it. Every stage execution is
+recorded with its input hash, output and duration in the stage_runs table.
+
+    python stock_pipeline.py                      # every target in stock_targets.json
+    python stock_pipeline.py xu_xiang zhao_laoge  # only these doc_ids
+    python stock_pipeline.py --force [stage]      # rerun every stage (or one) whatever the hashes say
+    python stock_pipeline.py --dry-run            # what would run, without calling anything
+    python stock_pipeline.py --timings            # per-stage durations over past runs
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+sys.path.append(os.path.join(SCRIPT_DIR, "..", "db"))
+sys.path.append(os.path.join(SCRIPT_DIR, "..", "pipeline"))
+import storage
+from corpus_store import CorpusStore
+import stock_scraper
+import outline_gen
+import story_synthesis
+
+PIPELINE = "stock_replay"
+WORKERS = int(os.environ.get("STOCK_PIPELINE_WORKERS", "3"))
+WORDS_PER_CHUNK = 400  # same as the orchestrator's stock_replay visual mapping
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+def input_hash(inputs: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def _doc_sha1(store: CorpusStore, collection: str, doc_id: str) -> Optional[str]:
+    row = store.index(collection).get(doc_id)
+    return row["sha1"] if row else None
+
+def _event_text(event_id) -> Optional[str]:
+    conn = storage.get_db_connection()
+    row = conn.execute('SELECT rich_context FROM historical_events WHERE id = ?', (int(event_id),)).fetchone()
+    conn.close()
+    return row['rich_context'] if row and row['rich_context'] else None
+
+# ----------------- STAGES -----------------
+# inputs(target, store, outputs) -> dict to hash, or None while an upstream output is missing
+# run(target, store, outputs, previous) -> output reference (str), or None on failure
+# exists(target, store, output) -> the recorded output is still there
+
+def _scrape_inputs(target, store, outputs):
+    return {"target": target["name"], "prompt": stock_scraper.SCOUT_PROMPT, "model": stock_scraper.SCOUT_MODEL}
+
+def _scrape_run(target, store, outputs, previous):
+    if not stock_scraper.scrape_with_ai_search(target["name"], target["doc_id"], store):
+        return None
+    return _doc_sha1(store, stock_scraper.RAW_COLLECTION, target["doc_id"])
+
+def _scrape_exists(target, store, output):
+    return _doc_sha1(store, stock_scraper.RAW_COLLECTION, target["doc_id"]) is not None
+
+def _outline_inputs(target, store, outputs):
+    raw_sha1 = _doc_sha1(store, outline_gen.RAW_COLLECTION, target["doc_id"])
+    if raw_sha1 is None:
+        return None
+    return {"raw": raw_sha1, "prompt": outline_gen.OUTLINE_PROMPT, "model": outline_gen.OUTLINE_MODEL}
+
+def _outline_run(target, store, outputs, previous):
+    doc = store.get(outline_gen.RAW_COLLECTION, target["doc_id"])
+    if not outline_gen.generate_outline(doc, store):
+        return None
+    return _doc_sha1(store, outline_gen.OUTLINE_COLLECTION, target["doc_id"])
+
+def _outline_exists(target, store, output):
+    return _doc_sha1(store, outline_gen.OUTLINE_COLLECTION, target["doc_id"]) is not None
+
+def _synthesis_inputs(target, store, outputs):
+    outline_sha1 = _doc_sha1(store, story_synthesis.OUTLINE_COLLECTION, target["doc_id"])
+    if outline_sha1 is None:
+        return None
+    return {"outline": outline_sha1, "prompt": story_synthesis.SYNTHESIS_PROMPT, "model": story_synthesis.SYNTHESIS_MODEL}
+
+def _synthesis_run(target, store, outputs, previous):
+    doc = store.get(story_synthesis.OUTLINE_COLLECTION, target["doc_id"])
+    # Update the event this target produced before instead of adding a second one
+    event_id = story_synthesis.synthesize_target(doc, store, event_id=int(previous) if previous else None)
+    return str(event_id) if event_id else None
+
+def _synthesis_exists(target, store, output):
+    return _event_text(output) is not None
+
+def _visual_inputs(target, store, outputs):
+    event_text = _event_text(outputs["synthesis"]) if outputs.get("synthesis") else None
+    if event_text is None:
+        return None
+    return {"event": outputs["synthesis"], "script": _digest(event_text), "words_per_chunk": WORDS_PER_CHUNK}
+
+def _visual_run(target, store, outputs, previous):
+    from automation_orchestrator import ensure_jobs
+    from node_visual_mapper import run_visual_mapping
+    # Only the video job: the visual stage must not queue a podcast as a side effect
+    job_id, _ = ensure_jobs(int(outputs["synthesis"]), with_podcast=False)
+    return str(job_id) if run_visual_mapping(job_id, words_per_chunk=WORDS_PER_CHUNK) else None
+
+def _visual_exists(target, store, output):
+    conn = storage.get_db_connection()
+    row = conn.execute('SELECT script_json FROM video_jobs WHERE id = ?', (int(output),)).fetchone()
+    conn.close()
+    return bool(row and row['script_json'])
+
+STAGES = {
+    "scrape": {"after": [], "inputs": _scrape_inputs, "run": _scrape_run, "exists": _scrape_exists},
+    "outline": {"after": ["scrape"], "inputs": _outline_inputs, "run": _outline_run, "exists": _outline_exists},
+    "synthesis": {"after": ["outline"], "inputs": _synthesis_inputs, "run": _synthesis_run, "exists": _synthesis_exists},
+    "visual": {"after": ["synthesis"], "inputs": _visual_inputs, "run": _visual_run, "exists": _visual_exists},
+}
+
+def stage_order(stages: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Topological order of the stage graph (raises on a cycle or an unknown dependency)."""
+    order, done = [], set()
+    pending = dict(stages)
+    while pending:
+        ready = [name for name, stage in pending.items() if all(dep in done for dep in stage["after"])]
+        if not ready:
+            raise ValueError(f"Stage graph has a cycle or unknown dependency among {sorted(pending)}")
+        for name in ready:
+            order.append(name)
+            done.add(name)
+            del pending[name]
+    return order
+
+# ----------------- RUN STATE -----------------
+
+def last_success(target_id: str, stage: str):
+    conn = storage.get_db_connection()
+    row = conn.execute('''
+        SELECT input_hash, output_ref FROM stage_runs
+        WHERE pipeline = ? AND target = ? AND stage = ? AND status = 'DONE'
+        ORDER BY id DESC LIMIT 1
+    ''', (PIPELINE, target_id, stage)).fetchone()
+    conn.close()
+    return row
+
+def record_run(target_id: str, stage: str, hash_: str, status: str, output_ref: Optional[str],
+               started_at: str, duration_ms: int, error_log: Optional[str] = None):
+    conn = storage.get_db_connection()
+    conn.execute('''
+        INSERT INTO stage_runs (pipeline, target, stage, input_hash, status, output_ref, duration_ms, error_log, started_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', (PIPELINE, target_id, stage, hash_, status, output_ref, duration_ms, error_log, started_at))
+    conn.commit()
+    conn.close()
+
+def run_target(target: Dict[str, str], store: CorpusStore, force=(), dry_run=False) -> Dict[str, Dict[str, Any]]:
+    """
+    Walk one target through the stage graph. `force` names stages to rerun regardless of hashes.
+    Returns {stage: {"status": ran | skipped | failed | blocked | pending, "seconds": float}}.
+    """
+    target_id = target["doc_id"]
+    outputs: Dict[str, Optional[str]] = {}
+    results: Dict[str, Dict[str, Any]] = {}
+    for name in stage_order(STAGES):
+        stage = STAGES[name]
+        if any(results[dep]["status"] in ("failed", "blocked") for dep in stage["after"]):
+            results[name] = {"status": "blocked", "seconds": 0.0}
+            continue
+        if dry_run and any(results[dep]["status"] == "pending" for dep in stage["after"]):
+            results[name] = {"status": "pending", "seconds": 0.0}
+            continue
+
+        previous = last_success(target_id, name)
+        inputs = stage["inputs"](target, store, outputs)
+        hash_ = input_hash(inputs) if inputs is not None else None
+        if (hash_ and previous and previous['input_hash'] == hash_ and name not in force
+                and stage["exists"](target, store, previous['output_ref'])):
+            outputs[name] = previous['output_ref']
+            results[name] = {"status": "skipped", "seconds": 0.0}
+            continue
+        if dry_run:
+            # Downstream inputs are only known once this stage has produced its output
+            results[name] = {"status": "pending", "seconds": 0.0}
+            outputs[name] = previous['output_ref'] if previous else None
+            continue
+        if hash_ is None:
+            print(f"⚠️ [{target_id}] {name}: upstream output missing")
+            results[name] = {"status": "blocked", "seconds": 0.0}
+            continue
+
+        print(f"▶️ [{target_id}] {name}")
+        started_at = datetime.now().isoformat(timespec="seconds")
+        t0 = time.perf_counter()
+        error = None
+        try:
+            output = stage["run"](target, store, outputs, previous['output_ref'] if previous else None)
+        except Exception as e:
+            output, error = None, f"{type(e).__name__}: {e}"
+            print(f"❌ [{target_id}] {name} crashed: {error}")
+        seconds = time.perf_counter() - t0
+        record_run(target_id, name, hash_, "DONE" if output else "FAILED", output, started_at,
+                   int(seconds * 1000), error)
+        outputs[name] = output
+        results[name] = {"status": "ran" if output else "failed", "seconds": seconds}
+        print(f"{'✅' if output else '❌'} [{target_id}] {name} in {seconds:.1f}s")
+    return results
+
+def run_pipeline(targets: List[Dict[str, str]], force=(), dry_run=False, workers: int = WORKERS):
+    storage.init_db()
+    store = CorpusStore()
+    t_start = time.perf_counter()
+    print(f"📦 [{PIPELINE}] {len(targets)} targets, stages {' -> '.join(stage_order(STAGES))}, {workers} workers"
+          f"{' (dry run)' if dry_run else ''}\n")
+
+    def run(target):
+        try:
+            return run_target(target, store, force, dry_run)
+        except Exception as e:
+            print(f"❌ [{target['doc_id']}] crashed: {e}")
+            return {name: {"status": "failed", "seconds": 0.0} for name in STAGES}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = dict(zip((t["doc_id"] for t in targets), pool.map(run, targets)))
+
+    icons = {"ran": "✅", "skipped": "⏭️", "failed": "❌", "blocked": "⛔", "pending": "🔜"}
+    order = stage_order(STAGES)
+    print(f"\n{'target':<16}" + "".join(f"{name:>14}" for name in order))
+    for target_id, stages in results.items():
+        cells = []
+        for name in order:
+            r = stages[name]
+            cells.append(f"{icons[r['status']]} {r['seconds']:.1f}s" if r["status"] in ("ran", "failed") else icons[r["status"]])
+        print(f"{target_id:<16}" + "".join(f"{c:>14}" for c in cells))
+    stage_seconds = sum(r["seconds"] for stages in results.values() for r in stages.values())
+    print(f"\n⏱️ {time.perf_counter() - t_start:.1f}s wall, {stage_seconds:.1f}s of stage work")
+    return results
+
+def print_timings(limit: int = 50):
+    storage.init_db()
+    conn = storage.get_db_connection()
+    rows = conn.execute('''
+        SELECT stage, COUNT(*) AS runs, SUM(status = 'FAILED') AS failed,
+               AVG(duration_ms) AS avg_ms, MAX(duration_ms) AS max_ms
+        FROM (SELECT * FROM stage_runs WHERE pipeline = ? ORDER BY id DESC LIMIT ?)
+        GROUP BY stage
+    ''', (PIPELINE, limit * len(STAGES))).fetchall()
+    conn.close()
+    by_stage = {r['stage']: r for r in rows}
+    print(f"{'stage':<12}{'runs':>6}{'failed':>8}{'avg s':>9}{'max s':>9}")
+    for name in stage_order(STAGES):
+        r = by_stage.get(name)
+        if r:
+            print(f"{name:<12}{r['runs']:>6}{r['failed']:>8}{r['avg_ms'] / 1000:>9.1f}{r['max_ms'] / 1000:>9.1f}")
+
+if __name__ == "__main__":
+    if "--timings" in sys.argv:
+        print_timings()
+        sys.exit(0)
+
+    targets = stock_scraper.load_targets()
+    wanted = [a for a in sys.argv[1:] if not a.startswith("--") and a not in STAGES]
+    if wanted:
+        unknown = set(wanted) - {t["doc_id"] for t in targets}
+        if unknown:
+            print(f"❌ Not in {stock_scraper.TARGETS_FILE}: {', '.join(sorted(unknown))}")
+            sys.exit(1)
+        targets = [t for t in targets if t["doc_id"] in wanted]
+
+    force = ()
+    if "--force" in sys.argv:
+        following = sys.argv[sys.argv.index("--force") + 1:]
+        force = (following[0],) if following and following[0] in STAGES else tuple(STAGES)
+    run_pipeline(targets, force=force, dry_run="--dry-run" in sys.argv)
@@ -1,11 +1,18 @@
 import os
 import sys
+import json
 from google import genai
 from google.genai import types
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-OUT_DIR = os.path.join(SCRIPT_DIR, "..", "..", "data", "raw_stocks")
-os.makedirs(OUT_DIR, exist_ok=True)
+sys.path.append(os.path.join(SCRIPT_DIR, "..", "db"))
+from corpus_store import CorpusStore
+
+# Dossiers land in the raw corpus (data/corpus/stocks_raw), one document per trader
+RAW_COLLECTION = "stocks_raw"
+SCOUT_MODEL = 'gemini-2.5-pro' # Use Pro for deep research
+# Traders to research: [{"name": search subject, "doc_id": corpus document id}]
+TARGETS_FILE = os.path.join(SCRIPT_DIR, "stock_targets.json")
 
 # Load API key from .env
 try:
@@ -14,16 +21,7 @@ try:
 except ImportError:
     pass
 
-def scrape_with_ai_search(target_name: str, output_filename: str):
-    print(f"🔍 AI Scouting: Performing deep web search for '{target_name}'...")
-    api_key = os.environ.get("GEMINI_API_KEY")
-    if not api_key:
-        print("❌ GEMINI_API_KEY not set.")
-        return False
-        
-    client = genai.Client(api_key=api_key)
-    
-    prompt = f"""
+SCOUT_PROMPT = """
     Please perform a comprehensive deep web search for the famous Chinese stock market trader: {target_name}.
     
     I need you to act as a raw data scraper. Gather the following factual information:
@@ -35,10 +33,25 @@ def scrape_with_ai_search(target_name: str, output_filename: str):
     
     Output this strictly as a highly detailed, factual Wikipedia-style report in Chinese. Do NOT format it as a video script. This is just raw research data. Include as many specific dates, numbers, and stock codes as you can find.
     """
+
+def load_targets():
+    with open(TARGETS_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def scrape_with_ai_search(target_name: str, doc_id: str, store: CorpusStore = None):
+    print(f"🔍 AI Scouting: Performing deep web search for '{target_name}'...")
+    api_key = os.environ.get("GEMINI_API_KEY")
+    if not api_key:
+        print("❌ GEMINI_API_KEY not set.")
+        return False
+        
+    client = genai.Client(api_key=api_key)
+    
+    prompt = SCOUT_PROMPT.format(target_name=target_name)
     
     try:
         response = client.models.generate_content(
-            model='gemini-2.5-pro', # Use Pro for deep research
+            model=SCOUT_MODEL,
             contents=prompt,
             config=types.GenerateContentConfig(
                 tools=[{'google_search': {}}],
@@ -46,12 +59,11 @@ def scrape_with_ai_search(target_name: str, output_filename: str):
             ),
         )
         
-        output_path = os.path.join(OUT_DIR, output_filename)
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(f"--- Factual Dossier: {target_name} ---\n\n")
-            f.write(response.text)
-            
-        print(f"✅ Saved {len(response.text)} characters of rich factual data to {output_filename}\n")
+        store = store or CorpusStore()
+        dossier = f"--- Factual Dossier: {target_name} ---\n\n{response.text}"
+        changed = store.put(RAW_COLLECTION, doc_id, dossier, source="gemini_search", meta={"target": target_name})
+        print(f"✅ Saved {len(response.text)} characters of rich factual data to {RAW_COLLECTION}/{doc_id}"
+              f"{'' if changed else ' (unchanged)'}\n")
         return True
     except Exception as e:
         print(f"❌ Failed to scout '{target_name}': {e}\n")
@@ -59,12 +71,8 @@ def scrape_with_ai_search(target_name: str, output_filename: str):
 
 if __name__ == "__main__":
     print(f"🎬 Starting Phase 10: Step 1 - AI Grounded Web Scraper")
-    print(f"📂 Output Directory: {OUT_DIR}\n")
-    
-    targets = [
-        {"name": "徐翔 (泽熙投资, 涨停板敢死队)", "filename": "xu_xiang_raw.txt"},
-        {"name": "赵强 (赵老哥, 八年一万倍, 银河证券绍兴营业部)", "filename": "zhao_laoge_raw.txt"}
-    ]
+    print(f"📂 Output Collection: corpus/{RAW_COLLECTION}\n")
     
-    for target in targets:
-        scrape_with_ai_search(target['name'], target['filename'])
+    store = CorpusStore()
+    for target in load_targets():
+        scrape_with_ai_search(target['name'], target['doc_id'], store)
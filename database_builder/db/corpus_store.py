@@ -0,0 +1,315 @@
+"""
+Raw text corpus: append-only gzip JSONL shards plus a sqlite index.
+
+Documents live in named collections (wikipedia_it_history, stocks_raw, stocks_outline, ...):
+
+    data/corpus/<collection>/shard_00000.jsonl.gz   one gzip member per document version
+    data/corpus/index.db                             where each document's latest version sits
+
+Every version is written as its own gzip member, so the file stays a valid .gz to zcat and a
+single document can be read back by seeking to its (offset, length). A shard is closed once it
+passes SHARD_MAX_BYTES. Putting an unchanged text (same sha1) writes nothing.
+
+Readers stream: iter_documents() decompresses one document at a time in shard order, so memory
+does not grow with the corpus. Processing stages (outline, synthesis, extraction...) record the
+sha1 they last consumed; iter_pending(collection, stage) yields only documents that are new or
+changed since, and mark_processed() moves the stage forward.
+
+    python corpus_store.py                 # collections, documents, bytes
+    python corpus_store.py import          # pull the legacy loose files into the corpus
+    python corpus_store.py compact <name>  # rewrite a collection without superseded versions
+"""
+import os
+import sys
+import glob
+import gzip
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(SCRIPT_DIR, "..", "..")
+CORPUS_DIR = os.environ.get("CORPUS_DIR", os.path.join(ROOT_DIR, "data", "corpus"))
+SHARD_MAX_BYTES = 64 * 1024 * 1024
+
+def text_digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+class CorpusStore:
+    def __init__(self, root: str = CORPUS_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self.index_path = os.path.join(root, "index.db")
+        self._lock = threading.Lock()
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS documents (
+                collection TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                source TEXT,
+                fetched_at TEXT,
+                sha1 TEXT NOT NULL,
+                chars INTEGER,
+                shard TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                meta_json TEXT,
+                PRIMARY KEY (collection, doc_id)
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS processed (
+                collection TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                sha1 TEXT NOT NULL,
+                processed_at TEXT,
+                PRIMARY KEY (collection, doc_id, stage)
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.index_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _collection_dir(self, collection: str) -> str:
+        return os.path.join(self.root, collection)
+
+    def _open_shard(self, collection: str) -> str:
+        """The shard new versions are appended to: the last one, or a fresh one once it is full."""
+        directory = self._collection_dir(collection)
+        os.makedirs(directory, exist_ok=True)
+        shards = sorted(glob.glob(os.path.join(directory, "shard_*.jsonl.gz")))
+        if shards and os.path.getsize(shards[-1]) < SHARD_MAX_BYTES:
+            return os.path.basename(shards[-1])
+        return self._shard_name(self._next_shard_number(collection))
+
+    @staticmethod
+    def _shard_name(number: int) -> str:
+        return f"shard_{number:05d}.jsonl.gz"
+
+    def _next_shard_number(self, collection: str) -> int:
+        # One past the highest number in use: compaction leaves gaps, so the count would collide
+        numbers = [int(os.path.basename(p)[6:11]) for p in
+                   glob.glob(os.path.join(self._collection_dir(collection), "shard_*.jsonl.gz"))]
+        return max(numbers) + 1 if numbers else 0
+
+    # ----------------- WRITE -----------------
+
+    def put(self, collection: str, doc_id: str, text: str, source: str = "",
+            meta: Optional[Dict[str, Any]] = None, fetched_at: Optional[str] = None) -> bool:
+        """Append a document version. Returns False (and writes nothing) when the text is unchanged."""
+        sha1 = text_digest(text)
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute('SELECT sha1, meta_json FROM documents WHERE collection = ? AND doc_id = ?',
+                               (collection, doc_id)).fetchone()
+            if row and row["sha1"] == sha1:
+                if meta is not None and json.loads(row["meta_json"] or "{}") != meta:
+                    conn.execute('UPDATE documents SET meta_json = ? WHERE collection = ? AND doc_id = ?',
+                                 (json.dumps(meta, ensure_ascii=False), collection, doc_id))
+                    conn.commit()
+                conn.close()
+                return False
+
+            fetched_at = fetched_at or datetime.now().isoformat(timespec="seconds")
+            record = {"doc_id": doc_id, "source": source, "fetched_at": fetched_at, "sha1": sha1,
+                      "meta": meta or {}, "text": text}
+            member = gzip.compress((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            shard = self._open_shard(collection)
+            with open(os.path.join(self._collection_dir(collection), shard), "ab") as f:
+                offset = f.tell()
+                f.write(member)
+            conn.execute('''
+                INSERT OR REPLACE INTO documents
+                (collection, doc_id, source, fetched_at, sha1, chars, shard, offset, length, meta_json)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (collection, doc_id, source, fetched_at, sha1, len(text), shard, offset, len(member),
+                  json.dumps(meta or {}, ensure_ascii=False)))
+            conn.commit()
+            conn.close()
+            return True
+
+    def mark_processed(self, collection: str, doc_id: str, stage: str, sha1: str):
+        conn = self._connect()
+        conn.execute('''
+            INSERT OR REPLACE INTO processed (collection, doc_id, stage, sha1, processed_at)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (collection, doc_id, stage, sha1, datetime.now().isoformat(timespec="seconds")))
+        conn.commit()
+        conn.close()
+
+    # ----------------- READ -----------------
+
+    def _read(self, collection: str, shard: str, offset: int, length: int, f=None) -> Dict[str, Any]:
+        if f is None:
+            with open(os.path.join(self._collection_dir(collection), shard), "rb") as fh:
+                fh.seek(offset)
+                return json.loads(gzip.decompress(fh.read(length)))
+        f.seek(offset)
+        return json.loads(gzip.decompress(f.read(length)))
+
+    def index(self, collection: str) -> Dict[str, Dict[str, Any]]:
+        """{doc_id: metadata row} without touching the shards."""
+        conn = self._connect()
+        rows = conn.execute('''
+            SELECT doc_id, source, fetched_at, sha1, chars, meta_json FROM documents
+            WHERE collection = ? ORDER BY shard, offset
+        ''', (collection,)).fetchall()
+        conn.close()
+        return {r["doc_id"]: {**dict(r), "meta": json.loads(r["meta_json"] or "{}")} for r in rows}
+
+    def get(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        conn = self._connect()
+        row = conn.execute('SELECT shard, offset, length FROM documents WHERE collection = ? AND doc_id = ?',
+                           (collection, doc_id)).fetchone()
+        conn.close()
+        return self._read(collection, row["shard"], row["offset"], row["length"]) if row else None
+
+    def _iter_rows(self, collection: str, rows) -> Iterator[Dict[str, Any]]:
+        handle, handle_shard = None, None
+        try:
+            for row in rows:
+                if row["shard"] != handle_shard:
+                    if handle:
+                        handle.close()
+                    handle_shard = row["shard"]
+                    handle = open(os.path.join(self._collection_dir(collection), handle_shard), "rb")
+                yield self._read(collection, row["shard"], row["offset"], row["length"], handle)
+        finally:
+            if handle:
+                handle.close()
+
+    def iter_documents(self, collection: str) -> Iterator[Dict[str, Any]]:
+        """Latest version of every document, one at a time: {doc_id, source, fetched_at, sha1, meta, text}."""
+        conn = self._connect()
+        rows = conn.execute('''
+            SELECT shard, offset, length FROM documents WHERE collection = ? ORDER BY shard, offset
+        ''', (collection,)).fetchall()
+        conn.close()
+        return self._iter_rows(collection, rows)
+
+    def iter_pending(self, collection: str, stage: str) -> Iterator[Dict[str, Any]]:
+        """Documents `stage` has not processed in their current version."""
+        conn = self._connect()
+        rows = conn.execute('''
+            SELECT d.shard, d.offset, d.length FROM documents d
+            LEFT JOIN processed p ON p.collection = d.collection AND p.doc_id = d.doc_id AND p.stage = ?
+            WHERE d.collection = ? AND (p.sha1 IS NULL OR p.sha1 != d.sha1)
+            ORDER BY d.shard, d.offset
+        ''', (stage, collection)).fetchall()
+        conn.close()
+        return self._iter_rows(collection, rows)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        conn = self._connect()
+        rows = conn.execute('''
+            SELECT collection, COUNT(*) AS documents, SUM(chars) AS chars, SUM(length) AS live_bytes
+            FROM documents GROUP BY collection ORDER BY collection
+        ''').fetchall()
+        conn.close()
+        result = {}
+        for r in rows:
+            shards = glob.glob(os.path.join(self._collection_dir(r["collection"]), "shard_*.jsonl.gz"))
+            result[r["collection"]] = {"documents": r["documents"], "chars": r["chars"] or 0,
+                                       "live_bytes": r["live_bytes"] or 0,
+                                       "disk_bytes": sum(os.path.getsize(p) for p in shards)}
+        return result
+
+    # ----------------- MAINTENANCE -----------------
+
+    def compact(self, collection: str) -> int:
+        """
+        Rewrite a collection keeping only the latest version of each document. Returns bytes freed.
+        The live members are copied into new shards numbered after the old ones, the index is
+        switched over in one commit, and only then are the old shards deleted: a crash at any
+        point leaves the index pointing at files that exist (at worst with unreferenced shards,
+        or .part files, which the next compaction removes).
+        """
+        with self._lock:
+            directory = self._collection_dir(collection)
+            for path in glob.glob(os.path.join(directory, "shard_*.jsonl.gz.part")):
+                os.remove(path)  # left by a compaction that died while writing
+            old_shards = glob.glob(os.path.join(directory, "shard_*.jsonl.gz"))
+            before = sum(os.path.getsize(p) for p in old_shards)
+            conn = self._connect()
+            rows = conn.execute('''
+                SELECT doc_id, shard, offset, length FROM documents WHERE collection = ? ORDER BY shard, offset
+            ''', (collection,)).fetchall()
+
+            shard_no = self._next_shard_number(collection)
+            moves, out, written = [], None, 0
+
+            def finish(f):
+                # Under a .part name until complete, so a half-written shard is never picked for appends
+                f.flush()
+                os.fsync(f.fileno())
+                f.close()
+                os.replace(f.name, f.name[:-len(".part")])
+
+            for row in rows:
+                if out is None or written >= SHARD_MAX_BYTES:
+                    if out:
+                        finish(out)
+                        shard_no += 1
+                    out = open(os.path.join(directory, self._shard_name(shard_no) + ".part"), "wb")
+                    written = 0
+                with open(os.path.join(directory, row["shard"]), "rb") as f:
+                    f.seek(row["offset"])
+                    member = f.read(row["length"])
+                moves.append((self._shard_name(shard_no), written, row["doc_id"]))
+                out.write(member)
+                written += len(member)
+            if out:
+                finish(out)
+
+            conn.executemany('UPDATE documents SET shard = ?, offset = ? WHERE collection = ? AND doc_id = ?',
+                             [(shard, offset, collection, doc_id) for shard, offset, doc_id in moves])
+            conn.commit()
+            conn.close()
+            for path in old_shards:
+                os.remove(path)
+            after = sum(os.path.getsize(p) for p in glob.glob(os.path.join(directory, "shard_*.jsonl.gz")))
+            return before - after
+
+def import_legacy_files(store: CorpusStore) -> Dict[str, int]:
+    """One-off: the monolithic Wikipedia JSON and the loose stock .txt/.md files -> collections."""
+    data_dir = os.path.join(ROOT_DIR, "data")
+    counts: Dict[str, int] = {}
+
+    def put(collection, doc_id, text, source, path):
+        fetched_at = datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec="seconds")
+        if store.put(collection, doc_id, text, source=source, fetched_at=fetched_at):
+            counts[collection] = counts.get(collection, 0) + 1
+
+    wiki_file = os.path.join(SCRIPT_DIR, "..", "data", "raw", "wikipedia_timelines_raw.json")
+    if os.path.exists(wiki_file):
+        with open(wiki_file, "r", encoding="utf-8") as f:
+            for page, text in json.load(f).items():
+                put("wikipedia_it_history", page, text, "wikipedia", wiki_file)
+    for path in sorted(glob.glob(os.path.join(data_dir, "raw_stocks", "*.txt"))):
+        with open(path, "r", encoding="utf-8") as f:
+            put("stocks_raw", os.path.basename(path)[:-len("_raw.txt")] if path.endswith("_raw.txt")
+                else os.path.splitext(os.path.basename(path))[0], f.read(), "gemini_search", path)
+    for path in sorted(glob.glob(os.path.join(data_dir, "outlines_stocks", "*_outline.md"))):
+        with open(path, "r", encoding="utf-8") as f:
+            name = os.path.basename(path)[:-len("_outline.md")]
+            put("stocks_outline", name[:-len("_raw")] if name.endswith("_raw") else name, f.read(), "outline_gen", path)
+    return counts
+
+if __name__ == "__main__":
+    store = CorpusStore()
+    if len(sys.argv) > 1 and sys.argv[1] == "import":
+        counts = import_legacy_files(store)
+        print(f"📥 Imported: {counts or 'nothing new'}")
+    elif len(sys.argv) > 2 and sys.argv[1] == "compact":
+        print(f"🧹 Freed {store.compact(sys.argv[2]) / 1024:.1f} KB from {sys.argv[2]}")
+    for name, s in store.stats().items():
+        print(f"📚 {name}: {s['documents']} docs, {s['chars']} chars, "
+              f"{s['live_bytes'] / 1024:.1f} KB live / {s['disk_bytes'] / 1024:.1f} KB on disk")
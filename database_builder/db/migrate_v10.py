@@ -0,0 +1,49 @@
+import sqlite3
+import os
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(SCRIPT_DIR, "..", "..", "data", "history_events.db")
+
+def migrate():
+    print("⏳ Starting V10 Database Migration...")
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='stage_runs'")
+        
+        if cursor.fetchone() is None:
+            # One row per stage execution of a DAG runner (cleaner/stock_pipeline.py)
+            print("   -> Creating 'stage_runs' table...")
+            cursor.execute('''
+                CREATE TABLE stage_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    pipeline TEXT NOT NULL,
+                    target TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    input_hash TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    output_ref TEXT,
+                    duration_ms INTEGER,
+                    error_log TEXT,
+                    started_at TIMESTAMP,
+                    finished_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_stage_runs_target
+                ON stage_runs(pipeline, target, stage, status)
+            ''')
+            print("   ✅ Schema updated successfully.")
+            conn.commit()
+        else:
+            print("   ✅ Table 'stage_runs' already exists. No migration needed.")
+            
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+        
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,33 @@
+import sqlite3
+import os
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(SCRIPT_DIR, "..", "..", "data", "history_events.db")
+
+def migrate():
+    print("⏳ Starting V5 Database Migration...")
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("PRAGMA table_info(channels)")
+        columns = [col[1] for col in cursor.fetchall()]
+        
+        if "renderer" not in columns:
+            # 'remotion' = React composition in headless Chromium, 'ffmpeg' = native Ken Burns filtergraph
+            print("   -> Adding 'renderer' column to channels table...")
+            cursor.execute("ALTER TABLE channels ADD COLUMN renderer TEXT DEFAULT 'remotion'")
+            cursor.execute("UPDATE channels SET renderer = 'remotion' WHERE renderer IS NULL")
+            print("   ✅ Schema updated successfully. All channels keep the Remotion renderer.")
+            conn.commit()
+        else:
+            print("   ✅ Column 'renderer' already exists. No migration needed.")
+            
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+        
+if __name__ == "__main__":
+    migrate()
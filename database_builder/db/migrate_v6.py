@@ -0,0 +1,53 @@
+import sqlite3
+import os
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(SCRIPT_DIR, "..", "..", "data", "history_events.db")
+
+def migrate():
+    print("⏳ Starting V6 Database Migration...")
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='render_metrics'")
+        
+        if cursor.fetchone() is None:
+            # One row per render attempt (Node 4), updated live while it runs
+            print("   -> Creating 'render_metrics' table...")
+            cursor.execute('''
+                CREATE TABLE render_metrics (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id INTEGER NOT NULL,
+                    kind TEXT NOT NULL DEFAULT 'final',
+                    backend TEXT,
+                    status TEXT NOT NULL DEFAULT 'RUNNING',
+                    stage TEXT,
+                    total_ms INTEGER,
+                    stages_json TEXT,
+                    frames_total INTEGER DEFAULT 0,
+                    frames_rendered INTEGER DEFAULT 0,
+                    frames_encoded INTEGER DEFAULT 0,
+                    fps REAL,
+                    eta_sec REAL,
+                    peak_rss_mb REAL,
+                    extra_json TEXT,
+                    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    finished_at TIMESTAMP,
+                    FOREIGN KEY (job_id) REFERENCES video_jobs (id)
+                )
+            ''')
+            cursor.execute("CREATE INDEX idx_render_metrics_job ON render_metrics(job_id, id)")
+            print("   ✅ Schema updated successfully.")
+            conn.commit()
+        else:
+            print("   ✅ Table 'render_metrics' already exists. No migration needed.")
+            
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+        
+if __name__ == "__main__":
+    migrate()
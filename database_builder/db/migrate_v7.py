@@ -0,0 +1,38 @@
+import sqlite3
+import os
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(SCRIPT_DIR, "..", "..", "data", "history_events.db")
+
+def migrate():
+    print("⏳ Starting V7 Database Migration...")
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("PRAGMA table_info(video_jobs)")
+        columns = [col[1] for col in cursor.fetchall()]
+        
+        # preview_key identifies the script/assets a preview was rendered from;
+        # approval is only valid while preview_approved_key still matches it
+        added = False
+        for column in ("preview_path", "preview_key", "preview_approved_key"):
+            if column not in columns:
+                print(f"   -> Adding '{column}' column to video_jobs table...")
+                cursor.execute(f"ALTER TABLE video_jobs ADD COLUMN {column} TEXT")
+                added = True
+        
+        if added:
+            conn.commit()
+            print("   ✅ Schema updated successfully.")
+        else:
+            print("   ✅ Preview columns already exist. No migration needed.")
+            
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+        
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,44 @@
+import sqlite3
+import os
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(SCRIPT_DIR, "..", "..", "data", "history_events.db")
+
+def migrate():
+    print("⏳ Starting V8 Database Migration...")
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='video_exports'")
+        
+        if cursor.fetchone() is None:
+            # Platform deliverables derived from the master render; platform uses publish_metrics keys
+            print("   -> Creating 'video_exports' table...")
+            cursor.execute('''
+                CREATE TABLE video_exports (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id INTEGER NOT NULL,
+                    platform TEXT NOT NULL,
+                    width INTEGER NOT NULL,
+                    height INTEGER NOT NULL,
+                    video_kbps INTEGER,
+                    path TEXT NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (job_id) REFERENCES video_jobs (id),
+                    UNIQUE(job_id, platform, width, height)
+                )
+            ''')
+            print("   ✅ Schema updated successfully.")
+            conn.commit()
+        else:
+            print("   ✅ Table 'video_exports' already exists. No migration needed.")
+            
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+        
+if __name__ == "__main__":
+    migrate()
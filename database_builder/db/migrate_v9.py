@@ -0,0 +1,48 @@
+import sqlite3
+import os
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(SCRIPT_DIR, "..", "..", "data", "history_events.db")
+
+def migrate():
+    print("⏳ Starting V9 Database Migration...")
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='podcast_jobs'")
+        
+        if cursor.fetchone() is None:
+            # Podcast episodes tracked like video_jobs: PENDING -> DRAFT_READY -> TTS_COMPLETE -> ASSEMBLED
+            print("   -> Creating 'podcast_jobs' table...")
+            cursor.execute('''
+                CREATE TABLE podcast_jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    event_id INTEGER NOT NULL UNIQUE,
+                    channel_id INTEGER REFERENCES channels(id),
+                    video_job_id INTEGER REFERENCES video_jobs(id),
+                    status TEXT NOT NULL DEFAULT 'PENDING',
+                    draft_json TEXT,
+                    output_path TEXT,
+                    duration_sec REAL,
+                    lines_total INTEGER DEFAULT 0,
+                    lines_done INTEGER DEFAULT 0,
+                    error_log TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (event_id) REFERENCES historical_events (id)
+                )
+            ''')
+            print("   ✅ Schema updated successfully.")
+            conn.commit()
+        else:
+            print("   ✅ Table 'podcast_jobs' already exists. No migration needed.")
+            
+    except Exception as e:
+        print(f"❌ Error during migration: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+        
+if __name__ == "__main__":
+    migrate()
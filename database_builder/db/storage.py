@@ -74,6 +74,88 @@ def init_db():
         )
     ''')
     
+    # Render instrumentation (Node 4): one row per render attempt, updated live while it runs
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS render_metrics (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id INTEGER NOT NULL,
+            kind TEXT NOT NULL DEFAULT 'final',
+            backend TEXT,
+            status TEXT NOT NULL DEFAULT 'RUNNING',
+            stage TEXT,
+            total_ms INTEGER,
+            stages_json TEXT,
+            frames_total INTEGER DEFAULT 0,
+            frames_rendered INTEGER DEFAULT 0,
+            frames_encoded INTEGER DEFAULT 0,
+            fps REAL,
+            eta_sec REAL,
+            peak_rss_mb REAL,
+            extra_json TEXT,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP,
+            FOREIGN KEY (job_id) REFERENCES video_jobs (id)
+        )
+    ''')
+    
+    # Platform deliverables (aspect ratio / bitrate ladder) exported from a job's master render
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS video_exports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            job_id INTEGER NOT NULL,
+            platform TEXT NOT NULL,
+            width INTEGER NOT NULL,
+            height INTEGER NOT NULL,
+            video_kbps INTEGER,
+            path TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (job_id) REFERENCES video_jobs (id),
+            UNIQUE(job_id, platform, width, height)
+        )
+    ''')
+    
+    # Podcast episodes for an event, tracked like video_jobs (see pipeline/node_podcast.py)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS podcast_jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            event_id INTEGER NOT NULL UNIQUE,
+            channel_id INTEGER REFERENCES channels(id),
+            video_job_id INTEGER REFERENCES video_jobs(id),
+            status TEXT NOT NULL DEFAULT 'PENDING',
+            draft_json TEXT,
+            output_path TEXT,
+            duration_sec REAL,
+            lines_total INTEGER DEFAULT 0,
+            lines_done INTEGER DEFAULT 0,
+            error_log TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (event_id) REFERENCES historical_events (id)
+        )
+    ''')
+    
+    # Stage executions of the content DAG runners (see cleaner/stock_pipeline.py): the input hash
+    # decides whether a stage is up to date, duration_ms is its timing
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS stage_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            pipeline TEXT NOT NULL,
+            target TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            input_hash TEXT NOT NULL,
+            status TEXT NOT NULL,
+            output_ref TEXT,
+            duration_ms INTEGER,
+            error_log TEXT,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_stage_runs_target
+        ON stage_runs(pipeline, target, stage, status)
+    ''')
+    
     # ====== Phase 9: Multi-Series Support ======
     # Channels config table — the control center for all content verticals
     cursor.execute('''
@@ -273,6 +355,49 @@ def insert_events(events, source="wikipedia", channel_id=1):
     conn.close()
     return inserted_count, duplicate_count
 
+def insert_events_bulk(events, source="wikipedia", channel_id=1, batch_size=5000):
+    """
+    insert_events for large imports: `events` may be any iterable (consumed batch by batch),
+    one executemany per batch, duplicates skipped by the unique index instead of raising.
+    Every batch is committed as its own transaction, so the write lock is released between
+    batches (the dashboard and orchestrator can write meanwhile) and an interrupted import
+    keeps the batches already committed. Returns (inserted, duplicates).
+    """
+    conn = sqlite3.connect(DB_FILE)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    seen = 0
+    inserted_count = 0
+    batch = []
+
+    def flush():
+        nonlocal inserted_count
+        before = conn.total_changes
+        conn.executemany('''
+            INSERT OR IGNORE INTO historical_events
+            (month, day, year, title, summary, category, importance_score, source, channel_id)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [(
+            event['month'], event['day'], event['year'],
+            event['title'][:100], event['summary'], event['category'],
+            event['importance_score'], source, channel_id
+        ) for event in batch])
+        conn.commit()
+        inserted_count += conn.total_changes - before
+        batch.clear()
+
+    try:
+        for event in events:
+            batch.append(event)
+            seen += 1
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    finally:
+        conn.close()
+    return inserted_count, seen - inserted_count
+
 if __name__ == "__main__":
     init_db()
     print(f"✅ SQLite Database initialized at {DB_FILE}")
@@ -0,0 +1,275 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+import argparse
+from typing import Dict, Any, Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_DIR = os.path.join(SCRIPT_DIR, "..", "db")
+sys.path.append(DB_DIR)
+from storage import get_db_connection
+
+ROOT_DIR = os.path.join(SCRIPT_DIR, "..", "..")
+REMOTION_DIR = os.path.join(ROOT_DIR, "video-generator")
+PUBLIC_DIR = os.path.join(REMOTION_DIR, "public")
+OUT_DIR = os.path.join(REMOTION_DIR, "out")
+PROPS_DIR = os.path.join(OUT_DIR, "props")
+
+# Content-addressed store: every file lives exactly once under objects/<2-char prefix>/<sha256><ext>.
+# Jobs only hold a manifest mapping the URLs used in script_json to object digests.
+STORE_DIR = os.path.join(ROOT_DIR, "data", "asset_store")
+OBJECTS_DIR = os.path.join(STORE_DIR, "objects")
+MANIFEST_DIR = os.path.join(STORE_DIR, "manifests")
+INCOMING_DIR = os.path.join(STORE_DIR, "incoming")
+
+# Per-render public dirs handed to Remotion via --public-dir, so the bundler only copies what the job needs
+STAGING_DIR = os.path.join(REMOTION_DIR, ".render_public")
+
+DEFAULT_RETENTION_DAYS = 30
+# Unreferenced files younger than this are left alone (Node 3 may still be writing the manifest)
+ORPHAN_GRACE_SECONDS = 3600
+
+def file_digest(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+def object_path(digest: str, ext: str) -> str:
+    return os.path.join(OBJECTS_DIR, digest[:2], f"{digest}{ext}")
+
+def _link_or_copy(src: str, dst: str):
+    """Hardlink when possible (zero extra bytes), fall back to a copy across filesystems."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+def incoming_dir(job_id: int) -> str:
+    """Scratch directory where Node 3 writes freshly generated files before they are ingested."""
+    path = os.path.join(INCOMING_DIR, f"job_{job_id}")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+def put_file(path: str, remove_source: bool = True) -> Dict[str, Any]:
+    """Ingest a file into the store. Identical content is stored once no matter how many jobs use it."""
+    digest = file_digest(path)
+    ext = os.path.splitext(path)[1].lower()
+    target = object_path(digest, ext)
+
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_target = f"{target}.{os.getpid()}.tmp"
+        _link_or_copy(path, tmp_target)
+        os.replace(tmp_target, target)
+
+    if remove_source and os.path.abspath(path) != os.path.abspath(target):
+        os.remove(path)
+
+    return {"digest": digest, "ext": ext, "size": os.path.getsize(target)}
+
+def _manifest_path(job_id: int) -> str:
+    return os.path.join(MANIFEST_DIR, f"job_{job_id}.json")
+
+def write_manifest(job_id: int, assets: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Ingest the job's generated files and record them in its manifest.
+    `assets` maps the public URL used in script_json (e.g. 'assets/job_4_scene_0.png') to the file on disk.
+    """
+    manifest = load_manifest(job_id) or {"job_id": job_id, "assets": {}}
+    for url, path in assets.items():
+        if not os.path.exists(path):
+            continue
+        manifest["assets"][url] = put_file(path)
+    manifest["updated_at"] = time.time()
+
+    os.makedirs(MANIFEST_DIR, exist_ok=True)
+    tmp_path = f"{_manifest_path(job_id)}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, _manifest_path(job_id))
+    return manifest
+
+def load_manifest(job_id: int) -> Optional[Dict[str, Any]]:
+    path = _manifest_path(job_id)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def resolve_asset(url: str, manifest: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """Find the physical file behind a public URL: the store first, then the shared public/ folder (BGM, legacy jobs)."""
+    if manifest and url in manifest["assets"]:
+        entry = manifest["assets"][url]
+        path = object_path(entry["digest"], entry["ext"])
+        if os.path.exists(path):
+            return path
+    legacy_path = os.path.join(PUBLIC_DIR, url)
+    if os.path.exists(legacy_path):
+        return legacy_path
+    return None
+
+def script_asset_urls(script_data: Dict[str, Any]) -> list:
+    urls = [script_data.get("audioUrl"), script_data.get("bgmUrl")]
+    urls += [scene.get("imageUrl") for scene in script_data.get("scenes", [])]
+    return [u for u in dict.fromkeys(urls) if u]
+
+def stage_public_dir(job_id: int, script_data: Dict[str, Any], name: Optional[str] = None) -> str:
+    """
+    Build a throwaway public dir containing only the files this render references (hardlinked, so it's instant).
+    Returns the directory to pass to Remotion's --public-dir.
+    """
+    manifest = load_manifest(job_id)
+    staging = os.path.join(STAGING_DIR, name or f"job_{job_id}")
+    shutil.rmtree(staging, ignore_errors=True)
+
+    for url in script_asset_urls(script_data):
+        src = resolve_asset(url, manifest)
+        if not src:
+            print(f"   [Assets] ⚠️ Missing asset for job {job_id}: {url}")
+            continue
+        dst = os.path.join(staging, url)
+        os.makedirs(os.path.dirname(dst), exist_ok=True)
+        _link_or_copy(src, dst)
+
+    os.makedirs(staging, exist_ok=True)
+    return staging
+
+def release_staging(job_id: int, name: Optional[str] = None):
+    shutil.rmtree(os.path.join(STAGING_DIR, name or f"job_{job_id}"), ignore_errors=True)
+
+def adopt_legacy_assets():
+    """One-off: move flat public/assets/job_* files of existing jobs into the store."""
+    conn = get_db_connection()
+    try:
+        jobs = conn.execute("SELECT id, script_json FROM video_jobs WHERE script_json IS NOT NULL").fetchall()
+    finally:
+        conn.close()
+
+    adopted = 0
+    for job in jobs:
+        if load_manifest(job['id']):
+            continue
+        try:
+            script_data = json.loads(job['script_json'])
+        except json.JSONDecodeError:
+            continue
+        legacy = {}
+        for url in script_asset_urls(script_data):
+            # Shared assets like BGM stay in public/, only per-job files are adopted
+            if os.path.basename(url).startswith(f"job_{job['id']}_"):
+                path = os.path.join(PUBLIC_DIR, url)
+                if os.path.exists(path):
+                    legacy[url] = path
+        if legacy:
+            write_manifest(job['id'], legacy)
+            adopted += len(legacy)
+            print(f"   [Assets] Adopted {len(legacy)} files for Job #{job['id']}")
+    print(f"✅ [Assets] Adopted {adopted} legacy files into {OBJECTS_DIR}")
+
+def _older_than(path: str, seconds: float) -> bool:
+    return time.time() - os.path.getmtime(path) > seconds
+
+def collect_garbage(retention_days: int = DEFAULT_RETENTION_DAYS, dry_run: bool = False) -> Dict[str, int]:
+    """
+    Reference-count objects against live `video_jobs` rows and delete everything nothing points to.
+
+    Retention policy:
+      - jobs still in flight (not RENDER_COMPLETE / ERROR) always keep their assets;
+      - finished or failed jobs keep them for `retention_days` after their last update, so re-renders stay cheap;
+      - manifests of deleted jobs are dropped immediately;
+      - rendered mp4s in out/ are kept while a job's video_path points at them.
+    """
+    conn = get_db_connection()
+    try:
+        rows = conn.execute('''
+            SELECT id, video_path,
+                   (status NOT IN ('RENDER_COMPLETE', 'ERROR')
+                    OR updated_at >= datetime('now', ?)) AS retained
+            FROM video_jobs
+        ''', (f"-{int(retention_days)} days",)).fetchall()
+    finally:
+        conn.close()
+
+    retained_jobs = {r['id'] for r in rows if r['retained']}
+    live_videos = {os.path.normpath(os.path.join(REMOTION_DIR, r['video_path'])) for r in rows if r['video_path']}
+    stats = {"manifests_dropped": 0, "objects_deleted": 0, "videos_deleted": 0, "bytes_freed": 0}
+
+    def _remove(path):
+        stats["bytes_freed"] += os.path.getsize(path)
+        if not dry_run:
+            os.remove(path)
+
+    # 1. Count references from retained manifests, drop the rest
+    refcounts: Dict[str, int] = {}
+    if os.path.isdir(MANIFEST_DIR):
+        for name in os.listdir(MANIFEST_DIR):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(MANIFEST_DIR, name)
+            with open(path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest["job_id"] in retained_jobs:
+                for entry in manifest["assets"].values():
+                    refcounts[entry["digest"]] = refcounts.get(entry["digest"], 0) + 1
+            else:
+                stats["manifests_dropped"] += 1
+                if not dry_run:
+                    os.remove(path)
+
+    # 2. Delete objects with zero references
+    if os.path.isdir(OBJECTS_DIR):
+        for prefix in os.listdir(OBJECTS_DIR):
+            prefix_dir = os.path.join(OBJECTS_DIR, prefix)
+            for name in os.listdir(prefix_dir):
+                path = os.path.join(prefix_dir, name)
+                digest = name.split(".")[0]
+                if refcounts.get(digest, 0) == 0 and _older_than(path, ORPHAN_GRACE_SECONDS):
+                    stats["objects_deleted"] += 1
+                    _remove(path)
+
+    # 3. Delete rendered videos no job points to anymore
+    if os.path.isdir(OUT_DIR):
+        for name in os.listdir(OUT_DIR):
+            path = os.path.normpath(os.path.join(OUT_DIR, name))
+            if name.endswith(".mp4") and path not in live_videos and _older_than(path, ORPHAN_GRACE_SECONDS):
+                stats["videos_deleted"] += 1
+                _remove(path)
+
+    # 4. Leftovers from crashed renders / asset runs
+    for leftover_root in (STAGING_DIR, INCOMING_DIR):
+        if os.path.isdir(leftover_root):
+            for name in os.listdir(leftover_root):
+                path = os.path.join(leftover_root, name)
+                if _older_than(path, ORPHAN_GRACE_SECONDS) and not dry_run:
+                    shutil.rmtree(path, ignore_errors=True)
+    # Props files are deleted when their render ends; only a killed process leaves one behind
+    if os.path.isdir(PROPS_DIR):
+        for name in os.listdir(PROPS_DIR):
+            path = os.path.join(PROPS_DIR, name)
+            if _older_than(path, ORPHAN_GRACE_SECONDS):
+                _remove(path)
+
+    label = "Would free" if dry_run else "Freed"
+    print(f"🧹 [Assets GC] {label} {stats['bytes_freed'] / (1024 * 1024):.1f} MB: "
+          f"{stats['objects_deleted']} objects, {stats['videos_deleted']} videos, {stats['manifests_dropped']} manifests "
+          f"({len(refcounts)} objects still referenced)")
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Content-addressed asset store for the video pipeline")
+    sub = parser.add_subparsers(dest="command", required=True)
+    gc_parser = sub.add_parser("gc", help="Delete assets and videos no longer referenced by video_jobs")
+    gc_parser.add_argument("--retention-days", type=int, default=DEFAULT_RETENTION_DAYS)
+    gc_parser.add_argument("--dry-run", action="store_true")
+    sub.add_parser("adopt", help="Move legacy public/assets/job_* files into the store")
+    args = parser.parse_args()
+
+    if args.command == "gc":
+        collect_garbage(args.retention_days, args.dry_run)
+    elif args.command == "adopt":
+        adopt_legacy_assets()
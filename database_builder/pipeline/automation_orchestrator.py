@@ -2,6 +2,8 @@ import sys
 import os
 import json
 import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 
 # Ensure modules in pipeline can be imported
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -11,23 +13,39 @@ sys.path.append(SCRIPT_DIR)
 from node_script_gen import run_script_generation
 from node_assets_gen import run_asset_generation
 from node_render import render_video_for_job
+from node_preview import REQUIRE_PREVIEW_APPROVAL, is_approved, render_preview_for_job
+from node_podcast import run_podcast_draft, run_podcast_tts, run_podcast_assembly, job_paths
 
-def run_full_pipeline(job_id: int):
+DB_PATH = os.path.join(SCRIPT_DIR, "..", "..", "data", "history_events.db")
+REMOTION_DIR = os.path.join(SCRIPT_DIR, "..", "..", "video-generator")
+# Jobs run side by side in a batch (each one is mostly waiting on Gemini / TTS / Remotion)
+BATCH_WORKERS = int(os.environ.get("PIPELINE_BATCH_WORKERS", "2"))
+# Channels whose events also get a podcast episode in a batch run unless told otherwise
+PODCAST_CHANNELS = {"stock_replay"}
+# video_jobs statuses at which a stage's output is already in the DB (RENDER_COMPLETE without its
+# file on disk falls back to re-rendering only)
+SCRIPT_DONE_STATUSES = {'SCRIPT_GEN', 'SCRIPT_MAPPED', 'AUDIO_GEN', 'RENDER_COMPLETE'}
+ASSETS_DONE_STATUSES = {'AUDIO_GEN', 'RENDER_COMPLETE'}
+
+def _connect():
+    conn = sqlite3.connect(DB_PATH)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def run_full_pipeline(job_id: int, force: bool = False):
     """
     Orchestrates the entire video generation pipeline for a given job.
-    Executes Node 2 -> Node 3 -> Node 4 sequentially.
+    Executes Node 2 -> Node 3 -> Node 4 sequentially. Like the podcast path, stages the job already
+    finished (per its status) are skipped unless `force`; a job in ERROR starts over.
     """
     print(f"\n=======================================================")
     print(f"🚀 [Orchestrator] Launching Full Pipeline for Job #{job_id}")
     print(f"=======================================================\n")
     
     # 0. Check Job Channel to determine branching
-    import sqlite3
-    DB_PATH = os.path.join(SCRIPT_DIR, "..", "..", "data", "history_events.db")
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    conn = _connect()
     job_info = conn.execute('''
-        SELECT ch.slug 
+        SELECT ch.slug, vj.status, vj.script_json, vj.video_path
         FROM video_jobs vj 
         LEFT JOIN channels ch ON vj.channel_id = ch.id 
         WHERE vj.id = ?
@@ -35,11 +53,20 @@ def run_full_pipeline(job_id: int):
     conn.close()
     
     channel_slug = job_info['slug'] if job_info else ''
+    status = job_info['status'] if job_info and not force else None
+    # video_path is stored relative to the Remotion project (see node_render)
+    if status == 'RENDER_COMPLETE' and job_info['video_path'] and os.path.exists(os.path.join(REMOTION_DIR, job_info['video_path'])):
+        print(f"⏭️ [Orchestrator] Job #{job_id} already rendered: {job_info['video_path']}")
+        return True
+    has_script = status in SCRIPT_DONE_STATUSES and bool(job_info['script_json'])
+    has_assets = status in ASSETS_DONE_STATUSES and bool(job_info['script_json'])
     
     # Node 2: Script Generation (or Visual Mapping for long-form content)
     print(f">>> STEP 1: AI Script/Visual Generation (Channel: {channel_slug})")
     
-    if channel_slug == 'stock_replay':
+    if has_script:
+        print(f"   ⏭️ Script already in DB ({status}), skipping")
+    elif channel_slug == 'stock_replay':
         from node_visual_mapper import run_visual_mapping
         if not run_visual_mapping(job_id, words_per_chunk=400):
             print(f"❌ [Orchestrator] Pipeline Halted: Visual Mapping Failed for Job {job_id}")
@@ -51,12 +78,20 @@ def run_full_pipeline(job_id: int):
         
     print("\n>>> STEP 2: Asset Synthesis (Audio & Vision)")
     # Node 3: Audio (TTS) & Image Generation
-    if not run_asset_generation(job_id):
+    if has_assets:
+        print(f"   ⏭️ Assets already generated ({status}), skipping")
+    elif not run_asset_generation(job_id):
         print(f"❌ [Orchestrator] Pipeline Halted: Asset Synthesis Failed for Job {job_id}")
         return False
         
     print("\n>>> STEP 3: React Remotion Rendering")
-    # Node 4: React Remotion Rendering
+    # Node 4: the final render waits for an approved preview; stop at the preview until then
+    if REQUIRE_PREVIEW_APPROVAL and not is_approved(job_id):
+        if not render_preview_for_job(job_id):
+            print(f"❌ [Orchestrator] Pipeline Halted: Preview Rendering Failed for Job {job_id}")
+            return False
+        print(f"⏸️ [Orchestrator] Job #{job_id} is waiting for preview approval; approving it queues the final render")
+        return False
     if not render_video_for_job(job_id):
         print(f"❌ [Orchestrator] Pipeline Halted: Video Rendering Failed for Job {job_id}")
         return False
@@ -64,9 +99,125 @@ def run_full_pipeline(job_id: int):
     print(f"\n🎉 [Orchestrator] SUCCESS! Full Pipeline completed for Job #{job_id}")
     return True
 
+def run_podcast_pipeline(podcast_job_id: int):
+    """
+    Draft -> TTS -> Assembly for one podcast job. Stages that already finished are skipped, so
+    rerunning a failed job only redoes the stage that broke (and TTS only the lines that broke).
+    """
+    print(f"\n=======================================================")
+    print(f"🎙️ [Orchestrator] Launching Podcast Pipeline for Podcast Job #{podcast_job_id}")
+    print(f"=======================================================\n")
+
+    conn = _connect()
+    job = conn.execute('SELECT status, draft_json, output_path FROM podcast_jobs WHERE id = ?', (podcast_job_id,)).fetchone()
+    conn.close()
+    if not job:
+        print(f"❌ [Orchestrator] Podcast job {podcast_job_id} not found")
+        return False
+    if job['status'] == 'ASSEMBLED' and os.path.exists(job_paths(podcast_job_id)["output"]):
+        print(f"⏭️ [Orchestrator] Podcast Job #{podcast_job_id} already assembled: {job['output_path']}")
+        return True
+
+    print(">>> STEP 1: Podcast Draft")
+    if job['draft_json']:
+        print("   ⏭️ Draft already in DB, skipping")
+    elif not run_podcast_draft(podcast_job_id):
+        print(f"❌ [Orchestrator] Podcast Halted: Draft Failed for Podcast Job {podcast_job_id}")
+        return False
+
+    print("\n>>> STEP 2: Podcast TTS")
+    if not run_podcast_tts(podcast_job_id):
+        print(f"❌ [Orchestrator] Podcast Halted: TTS Failed for Podcast Job {podcast_job_id}")
+        return False
+
+    print("\n>>> STEP 3: Podcast Assembly")
+    if not run_podcast_assembly(podcast_job_id):
+        print(f"❌ [Orchestrator] Podcast Halted: Assembly Failed for Podcast Job {podcast_job_id}")
+        return False
+
+    print(f"\n🎉 [Orchestrator] SUCCESS! Podcast episode ready for Podcast Job #{podcast_job_id}")
+    return True
+
+def ensure_jobs(event_id: int, with_podcast=None):
+    """
+    Get (creating if needed) the video job and, when wanted, the podcast job of an event.
+    with_podcast=None means "if the event's channel is in PODCAST_CHANNELS".
+    Returns (video_job_id, podcast_job_id or None).
+    """
+    conn = _connect()
+    try:
+        event = conn.execute('''
+            SELECT e.id, e.channel_id, ch.slug
+            FROM historical_events e
+            LEFT JOIN channels ch ON e.channel_id = ch.id
+            WHERE e.id = ?
+        ''', (event_id,)).fetchone()
+        if not event:
+            raise ValueError(f"Event {event_id} not found")
+        if with_podcast is None:
+            with_podcast = event['slug'] in PODCAST_CHANNELS
+
+        conn.execute("INSERT OR IGNORE INTO video_jobs (event_id, channel_id, status) VALUES (?, ?, 'PENDING')",
+                     (event_id, event['channel_id']))
+        video_job_id = conn.execute('SELECT id FROM video_jobs WHERE event_id = ?', (event_id,)).fetchone()['id']
+        podcast_job_id = None
+        if with_podcast:
+            conn.execute('''
+                INSERT OR IGNORE INTO podcast_jobs (event_id, channel_id, video_job_id, status)
+                VALUES (?, ?, ?, 'PENDING')
+            ''', (event_id, event['channel_id'], video_job_id))
+            podcast_job_id = conn.execute('SELECT id FROM podcast_jobs WHERE event_id = ?', (event_id,)).fetchone()['id']
+        conn.commit()
+        return video_job_id, podcast_job_id
+    finally:
+        conn.close()
+
+def run_event_batch(event_ids, with_podcast=None, workers: int = BATCH_WORKERS, force: bool = False):
+    """
+    Queue a video (and podcast episode) for every event and run them side by side. The video and
+    the episode of one event are independent jobs, so they run in parallel too. Both resume from
+    the stage they reached, so rerunning a batch to add episodes leaves finished videos alone;
+    `force` redoes every video stage.
+    Returns {"video": {job_id: ok}, "podcast": {podcast_job_id: ok}}.
+    """
+    tasks = []
+    for event_id in event_ids:
+        video_job_id, podcast_job_id = ensure_jobs(event_id, with_podcast)
+        tasks.append(("video", video_job_id, lambda job_id: run_full_pipeline(job_id, force=force)))
+        if podcast_job_id:
+            tasks.append(("podcast", podcast_job_id, run_podcast_pipeline))
+
+    print(f"📦 [Orchestrator] Batch: {len(event_ids)} events -> {len(tasks)} jobs on {workers} workers")
+
+    def run(task):
+        kind, job_id, fn = task
+        try:
+            return fn(job_id)
+        except Exception as e:
+            print(f"❌ [Orchestrator] {kind} job #{job_id} crashed: {e}")
+            return False
+
+    results = {"video": {}, "podcast": {}}
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for (kind, job_id, _), ok in zip(tasks, pool.map(run, tasks)):
+            results[kind][job_id] = bool(ok)
+
+    failed = sum(not ok for jobs in results.values() for ok in jobs.values())
+    print(f"\n📦 [Orchestrator] Batch finished: {len(tasks) - failed}/{len(tasks)} jobs succeeded")
+    return results
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
+    if len(sys.argv) > 2 and sys.argv[1] == "--batch":
+        # python automation_orchestrator.py --batch <event_id> [<event_id> ...] [--podcast | --no-podcast] [--force]
+        flag = True if "--podcast" in sys.argv else False if "--no-podcast" in sys.argv else None
+        run_event_batch([int(a) for a in sys.argv[2:] if not a.startswith("--")], with_podcast=flag,
+                        force="--force" in sys.argv)
+    elif len(sys.argv) > 2 and sys.argv[1] == "--podcast":
+        run_podcast_pipeline(int(sys.argv[2]))
+    elif len(sys.argv) > 1:
         job_id = int(sys.argv[1])
-        run_full_pipeline(job_id)
+        run_full_pipeline(job_id, force="--force" in sys.argv)
     else:
-        print("Usage: python automation_orchestrator.py <job_id>")
+        print("Usage: python automation_orchestrator.py <job_id> [--force]")
+        print("       python automation_orchestrator.py --podcast <podcast_job_id>")
+        print("       python automation_orchestrator.py --batch <event_id> [...] [--podcast | --no-podcast] [--force]")
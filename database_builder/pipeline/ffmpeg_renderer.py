@@ -0,0 +1,313 @@
+import os
+import re
+import sys
+import json
+import math
+import time
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_DIR = os.path.join(SCRIPT_DIR, "..", "db")
+sys.path.append(DB_DIR)
+sys.path.append(SCRIPT_DIR)
+import ffmpeg_tools
+
+ROOT_DIR = os.path.join(SCRIPT_DIR, "..", "..")
+REMOTION_DIR = os.path.join(ROOT_DIR, "video-generator")
+SEGMENTS_DIR = os.path.join(REMOTION_DIR, "out", "ffmpeg_segments")
+
+# Must match the <Composition> in Root.tsx
+WIDTH, HEIGHT, FPS = 1080, 1920, 30
+DEFAULT_FILTER_STYLE = "sepia(0.3) contrast(1.1) brightness(0.9) grayscale(0.2)"
+
+# Ken Burns is computed on a 2x upscale so zoompan's integer crop positions don't visibly jitter
+SUPERSAMPLE = 2
+CAPTION_FONT = os.environ.get("FFMPEG_CAPTION_FONT", "Noto Sans CJK SC")
+SEGMENT_WORKERS = int(os.environ.get("FFMPEG_SEGMENT_WORKERS", str(os.cpu_count() or 2)))
+
+# Bump whenever a change here alters the rendered pixels (filter matrices, zoompan, captions, encoder
+# settings). Part of every cached scene's fingerprint; refactors that keep the output identical keep the cache.
+RENDERER_VERSION = 1
+
+# Minimum SSIM against the Remotion render for --compare to pass
+VISUAL_DIFF_MIN_SSIM = 0.85
+
+# ----------------- CSS FILTER -> FFMPEG -----------------
+# Matrices follow the Filter Effects spec, which is what Chromium applies for `filter:` in Composition.tsx.
+
+def _mixer(m: List[List[float]]) -> str:
+    names = ["rr", "rg", "rb", "gr", "gg", "gb", "br", "bg", "bb"]
+    values = [m[0][0], m[0][1], m[0][2], m[1][0], m[1][1], m[1][2], m[2][0], m[2][1], m[2][2]]
+    return "colorchannelmixer=" + ":".join(f"{n}={v:.4f}" for n, v in zip(names, values))
+
+def _sepia(a: float) -> str:
+    k = 1 - min(a, 1.0)
+    return _mixer([
+        [0.393 + 0.607 * k, 0.769 - 0.769 * k, 0.189 - 0.189 * k],
+        [0.349 - 0.349 * k, 0.686 + 0.314 * k, 0.168 - 0.168 * k],
+        [0.272 - 0.272 * k, 0.534 - 0.534 * k, 0.131 + 0.869 * k],
+    ])
+
+def _grayscale(a: float) -> str:
+    k = 1 - min(a, 1.0)
+    return _mixer([
+        [0.2126 + 0.7874 * k, 0.7152 - 0.7152 * k, 0.0722 - 0.0722 * k],
+        [0.2126 - 0.2126 * k, 0.7152 + 0.2848 * k, 0.0722 - 0.0722 * k],
+        [0.2126 - 0.2126 * k, 0.7152 - 0.7152 * k, 0.0722 + 0.9278 * k],
+    ])
+
+def _saturate(s: float) -> str:
+    return _mixer([
+        [0.213 + 0.787 * s, 0.715 - 0.715 * s, 0.072 - 0.072 * s],
+        [0.213 - 0.213 * s, 0.715 + 0.285 * s, 0.072 - 0.072 * s],
+        [0.213 - 0.213 * s, 0.715 - 0.715 * s, 0.072 + 0.928 * s],
+    ])
+
+def _hue_rotate(deg: float) -> str:
+    c, s = math.cos(math.radians(deg)), math.sin(math.radians(deg))
+    return _mixer([
+        [0.213 + c * 0.787 - s * 0.213, 0.715 - c * 0.715 - s * 0.715, 0.072 - c * 0.072 + s * 0.928],
+        [0.213 - c * 0.213 + s * 0.143, 0.715 + c * 0.285 + s * 0.140, 0.072 - c * 0.072 - s * 0.283],
+        [0.213 - c * 0.213 - s * 0.787, 0.715 - c * 0.715 + s * 0.715, 0.072 + c * 0.928 + s * 0.072],
+    ])
+
+def _parse_amount(raw: str) -> float:
+    raw = raw.strip()
+    if raw.endswith("%"):
+        return float(raw[:-1]) / 100.0
+    if raw.endswith("deg"):
+        return float(raw[:-3])
+    if raw.endswith("px"):
+        return float(raw[:-2])
+    return float(raw)
+
+def css_filter_to_ffmpeg(css_filter: str) -> List[str]:
+    """Translate a CSS `filter:` string into an equivalent chain of ffmpeg filters, applied in the same order."""
+    chain = []
+    for name, raw in re.findall(r'([a-z-]+)\(([^)]*)\)', css_filter or ""):
+        value = _parse_amount(raw)
+        if name == "sepia":
+            chain.append(_sepia(value))
+        elif name == "grayscale":
+            chain.append(_grayscale(value))
+        elif name == "saturate":
+            chain.append(_saturate(value))
+        elif name == "hue-rotate":
+            chain.append(_hue_rotate(value))
+        elif name == "brightness":
+            chain.append(f"lutrgb=r=val*{value}:g=val*{value}:b=val*{value}")
+        elif name == "contrast":
+            expr = f"(val-128)*{value}+128"
+            chain.append(f"lutrgb=r='{expr}':g='{expr}':b='{expr}'")
+        elif name == "invert":
+            expr = f"val+(255-2*val)*{value}"
+            chain.append(f"lutrgb=r='{expr}':g='{expr}':b='{expr}'")
+        elif name == "blur" and value > 0:
+            chain.append(f"gblur=sigma={value * SUPERSAMPLE}")
+        else:
+            print(f"   [FFmpeg Renderer] ⚠️ Unsupported CSS filter '{name}({raw})', ignored.")
+    return chain
+
+# ----------------- KEN BURNS -----------------
+
+def ken_burns_zoompan(index: int, duration: int, width: int, height: int, fps: int) -> str:
+    """
+    Same four motions as SceneContent in Composition.tsx, chosen by index % 4.
+    CSS `scale(s) translateX(t)` shows the source window centred at (W/2 - t, H/2) with size W/s x H/s.
+    """
+    progress = f"(on/{duration})"
+    motion = index % 4
+    if motion == 0:    # zoom_in
+        zoom, shift = f"(1+0.15*{progress})", "0"
+    elif motion == 1:  # pan_right
+        zoom, shift = "1.1", f"(-50+100*{progress})"
+    elif motion == 2:  # zoom_out
+        zoom, shift = f"(1.15-0.15*{progress})", "0"
+    else:              # pan_left
+        zoom, shift = "1.1", f"(50-100*{progress})"
+
+    # translateX is in output pixels of the 1080-wide composition; convert to input pixels
+    x = f"max(0,iw/2-{shift}*iw/{WIDTH}-iw/zoom/2)"
+    y = "ih/2-ih/zoom/2"
+    return f"zoompan=z='{zoom}':x='{x}':y='{y}':d={duration}:s={width}x{height}:fps={fps}"
+
+# ----------------- CAPTIONS -----------------
+
+def _ass_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("{", "\\{").replace("}", "\\}").replace("\n", "\\N")
+
+def _ass_time(seconds: float) -> str:
+    cs = int(round(seconds * 100))
+    return f"{cs // 360000}:{cs // 6000 % 60:02d}:{cs // 100 % 60:02d}.{cs % 100:02d}"
+
+def write_caption_ass(text: str, duration_sec: float, path: str, width: int, height: int):
+    """
+    Caption box of Composition.tsx as an ASS subtitle: bold white 42px on a 70% black box,
+    15% from the bottom, 5% side margins, fading in over the first 15 frames.
+    """
+    scale = width / WIDTH
+    header = f"""[Script Info]
+ScriptType: v4.00+
+PlayResX: {width}
+PlayResY: {height}
+WrapStyle: 0
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Caption,{CAPTION_FONT},{round(42 * scale)},&H00FFFFFF,&H00FFFFFF,&H4D000000,&H4D000000,-1,0,0,0,100,100,0,0,3,{round(20 * scale)},0,2,{round(94 * scale)},{round(94 * scale)},{round(0.15 * height + 20 * scale)},1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+    fade_ms = round(15 / FPS * 1000)
+    line = f"Dialogue: 0,{_ass_time(0)},{_ass_time(duration_sec)},Caption,,0,0,0,,{{\\fad({fade_ms},0)}}{_ass_escape(text)}\n"
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(header + line)
+
+def _filter_path(path: str) -> str:
+    """Escape a path for use inside an ffmpeg filter argument."""
+    return os.path.abspath(path).replace("\\", "/").replace(":", "\\:").replace("'", "\\'")
+
+# ----------------- SEGMENTS -----------------
+
+def render_scene_segment(scene: Dict[str, Any], index: int, filter_style: str, public_dir: str, output_path: str,
+                         width: int = WIDTH, height: int = HEIGHT, fps: int = FPS, crf: int = 18,
+                         preset: str = "veryfast"):
+    """Render one scene (image + Ken Burns + filter + caption) to a silent H.264 segment."""
+    # durationInFrames is in 30fps composition frames; keep the same wall-clock length at other rates (previews)
+    duration = max(1, round(int(scene.get('durationInFrames') or 150) * fps / FPS))
+    work_w, work_h = width * SUPERSAMPLE, height * SUPERSAMPLE
+
+    ass_path = f"{output_path}.ass"
+    write_caption_ass(scene.get('text', ''), duration / fps, ass_path, width, height)
+
+    image_path = os.path.join(public_dir, scene['imageUrl']) if scene.get('imageUrl') else None
+    if image_path and os.path.exists(image_path):
+        inputs = ["-i", image_path]
+        # object-fit: cover, then the CSS filter on the single still frame, then the camera move
+        video_chain = [
+            f"scale={work_w}:{work_h}:force_original_aspect_ratio=increase",
+            f"crop={work_w}:{work_h}",
+            "format=rgb24",
+            *css_filter_to_ffmpeg(filter_style),
+            ken_burns_zoompan(index, duration, width, height, fps),
+        ]
+    else:
+        inputs = ["-f", "lavfi", "-i", f"color=c=black:s={width}x{height}:r={fps}:d={duration / fps}"]
+        video_chain = []
+
+    video_chain += [f"subtitles='{_filter_path(ass_path)}'", "format=yuv420p"]
+    try:
+        ffmpeg_tools.run_ffmpeg(inputs + [
+            "-filter_complex", f"[0:v]{','.join(video_chain)}[v]",
+            "-map", "[v]", "-frames:v", str(duration), "-r", str(fps),
+            "-c:v", "libx264", "-preset", preset, "-crf", str(crf), "-threads", "2",
+            output_path,
+        ])
+    finally:
+        if os.path.exists(ass_path):
+            os.remove(ass_path)
+
+def render_with_ffmpeg(job_id: int, script_data: Dict[str, Any], public_dir: str, output_path: str,
+                       width: int = WIDTH, height: int = HEIGHT, fps: int = FPS, crf: int = 18,
+                       preset: str = "veryfast", segment_dir_name: Optional[str] = None):
+    """
+    Chromium-free renderer for the static-image Ken Burns composition: every scene is encoded
+    straight from its image by ffmpeg (in parallel), then the segments are concatenated and the
+    narration + BGM are mixed underneath.
+    """
+    scenes = script_data.get('scenes', [])
+    filter_style = script_data.get('filterStyle') or DEFAULT_FILTER_STYLE
+    segment_dir = os.path.join(SEGMENTS_DIR, segment_dir_name or f"job_{job_id}")
+    shutil.rmtree(segment_dir, ignore_errors=True)
+    os.makedirs(segment_dir, exist_ok=True)
+
+    t0 = time.perf_counter()
+    segment_paths = [os.path.join(segment_dir, f"scene_{i:03d}.mp4") for i in range(len(scenes))]
+    with ThreadPoolExecutor(max_workers=max(1, SEGMENT_WORKERS)) as pool:
+        list(pool.map(
+            lambda i: render_scene_segment(scenes[i], i, filter_style, public_dir, segment_paths[i],
+                                           width, height, fps, crf, preset),
+            range(len(scenes)),
+        ))
+    print(f"   [FFmpeg Renderer] ✅ {len(scenes)} scene segments encoded in {time.perf_counter() - t0:.1f}s")
+
+    silent_path = os.path.join(segment_dir, "stitched_silent.mp4")
+    ffmpeg_tools.concat_copy(segment_paths, silent_path)
+
+    def staged(url):
+        path = os.path.join(public_dir, url) if url else None
+        return path if path and os.path.exists(path) else None
+
+    ffmpeg_tools.mux_audio(silent_path, staged(script_data.get('audioUrl')), staged(script_data.get('bgmUrl')), output_path)
+    shutil.rmtree(segment_dir, ignore_errors=True)
+
+def renderer_fingerprint(width: int = WIDTH, height: int = HEIGHT, fps: int = FPS) -> str:
+    """Version of this renderer's output: RENDERER_VERSION plus the settings that change the pixels."""
+    return f"ffmpeg:v{RENDERER_VERSION}:{width}x{height}@{fps}:ss{SUPERSAMPLE}:{CAPTION_FONT}"
+
+# ----------------- VISUAL DIFF -----------------
+
+def parse_diff_scores(stderr: str) -> Dict[str, float]:
+    """Read the summary lines the ssim/psnr filters print to stderr. Raises if either is missing."""
+    ssim = re.search(r"SSIM .*All:([\d.]+)", stderr)
+    psnr = re.search(r"PSNR .*average:(inf|[\d.]+)", stderr)
+    if not ssim or not psnr:
+        raise RuntimeError(f"Could not parse SSIM/PSNR from ffmpeg output: {stderr.strip()[-500:]}")
+    return {"ssim": float(ssim.group(1)), "psnr": float(psnr.group(1))}
+
+def visual_diff(reference_path: str, candidate_path: str) -> Dict[str, float]:
+    """SSIM/PSNR of the candidate against the reference (e.g. ffmpeg output vs the Remotion render)."""
+    # Each input feeds two filters, so split it explicitly instead of reusing [0:v]/[1:v]
+    graph = ("[0:v]setpts=PTS-STARTPTS,split=2[a0][a1];[1:v]setpts=PTS-STARTPTS,split=2[b0][b1];"
+             "[a0][b0]ssim;[a1][b1]psnr")
+    cmd = [
+        ffmpeg_tools.get_ffmpeg_exe(), "-hide_banner", "-i", candidate_path, "-i", reference_path,
+        "-lavfi", graph, "-f", "null", "-",
+    ]
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors="replace")
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg visual diff failed ({result.returncode}): {result.stderr.strip()[-500:]}")
+    return parse_diff_scores(result.stderr)
+
+def compare_with_remotion(job_id: int) -> bool:
+    """
+    Visual-diff check: render the job with ffmpeg and compare against its existing Remotion render.
+    Returns True (exit code 0) when SSIM stays above VISUAL_DIFF_MIN_SSIM.
+    """
+    import asset_store
+    from storage import get_db_connection
+
+    conn = get_db_connection()
+    job = conn.execute('SELECT script_json, video_path FROM video_jobs WHERE id = ?', (job_id,)).fetchone()
+    conn.close()
+    if not job or not job['video_path']:
+        print(f"❌ Job {job_id} has no Remotion render to compare against. Render it with the remotion backend first.")
+        return False
+
+    script_data = json.loads(job['script_json'])
+    reference = os.path.join(REMOTION_DIR, job['video_path'])
+    candidate = os.path.join(REMOTION_DIR, "out", f"job_{job_id}_ffmpeg_compare.mp4")
+    staging_name = f"compare_{job_id}"
+    public_dir = asset_store.stage_public_dir(job_id, script_data, name=staging_name)
+    try:
+        t0 = time.perf_counter()
+        render_with_ffmpeg(job_id, script_data, public_dir, candidate)
+        elapsed = time.perf_counter() - t0
+    finally:
+        asset_store.release_staging(job_id, name=staging_name)
+
+    scores = visual_diff(reference, candidate)
+    passed = scores["ssim"] >= VISUAL_DIFF_MIN_SSIM
+    print(f"📊 [Visual Diff] Job #{job_id}: SSIM {scores['ssim']:.4f}, PSNR {scores['psnr']:.2f}dB "
+          f"(ffmpeg render took {elapsed:.1f}s) -> {'PASS' if passed else 'FAIL'} (min SSIM {VISUAL_DIFF_MIN_SSIM})")
+    return passed
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--compare":
+        sys.exit(0 if compare_with_remotion(int(sys.argv[2])) else 1)
+    else:
+        print("Usage: python ffmpeg_renderer.py --compare <job_id>")
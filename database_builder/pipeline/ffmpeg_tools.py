@@ -0,0 +1,64 @@
+import os
+import subprocess
+from typing import List, Optional
+
+# Volume Composition.tsx uses for background music under the narration
+BGM_VOLUME = 0.15
+
+def get_ffmpeg_exe() -> str:
+    """The one ffmpeg lookup for the pipeline and podcast_engine: imageio-ffmpeg's binary, else ffmpeg on PATH."""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except ImportError:
+        return "ffmpeg"
+
+def run_ffmpeg(args: List[str]):
+    cmd = [get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y"] + args
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors="replace")
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg failed ({result.returncode}): {result.stderr.strip()[-500:]}")
+
+def concat_copy(parts: List[str], output_path: str):
+    """Losslessly join same-codec segments with the concat demuxer (no re-encode)."""
+    list_path = f"{output_path}.concat.txt"
+    with open(list_path, "w", encoding="utf-8") as f:
+        for part in parts:
+            f.write(f"file '{os.path.abspath(part).replace(os.sep, '/')}'\n")
+    try:
+        run_ffmpeg(["-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", "-movflags", "+faststart", output_path])
+    finally:
+        os.remove(list_path)
+
+def mux_audio(video_path: str, narration_path: Optional[str], bgm_path: Optional[str], output_path: str):
+    """
+    Lay the narration (and looped BGM at BGM_VOLUME) under a silent video, copying the video stream.
+    Mirrors the <Audio> tags in Composition.tsx.
+    """
+    args = ["-i", video_path]
+    filters = []
+    if narration_path:
+        args += ["-i", narration_path]
+        filters.append("[1:a]apad[narr]")
+    if bgm_path:
+        args += ["-stream_loop", "-1", "-i", bgm_path]
+        bgm_index = 2 if narration_path else 1
+        filters.append(f"[{bgm_index}:a]volume={BGM_VOLUME}[bgm]")
+
+    if not filters:
+        os.replace(video_path, output_path)
+        return
+
+    if narration_path and bgm_path:
+        filters.append("[narr][bgm]amix=inputs=2:duration=first:normalize=0[aout]")
+    else:
+        filters[-1] = filters[-1].rsplit("[", 1)[0] + "[aout]"
+
+    args += [
+        "-filter_complex", ";".join(filters),
+        "-map", "0:v", "-map", "[aout]",
+        "-c:v", "copy", "-c:a", "aac", "-b:a", "192k",
+        "-shortest", "-movflags", "+faststart",
+        output_path,
+    ]
+    run_ffmpeg(args)
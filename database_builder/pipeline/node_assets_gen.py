@@ -9,6 +9,7 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_DIR = os.path.join(SCRIPT_DIR, "..", "db")
 sys.path.append(DB_DIR)
 from storage import get_db_connection
+import asset_store
 
 # Add root folder to sys path to import our existing Edge-TTS wrapper
 ROOT_DIR = os.path.join(SCRIPT_DIR, "..", "..")
@@ -17,10 +18,20 @@ try:
     from generate_audio import generate_audio
 except ImportError:
     generate_audio = None
+try:
+    import audio_mixer
+except ImportError:
+    audio_mixer = None
 
-# Where to save the physical media files for Remotion
-ASSET_OUT_DIR = os.path.join(ROOT_DIR, "video-generator", "public", "assets")
-os.makedirs(ASSET_OUT_DIR, exist_ok=True)
+# Mix the channel BGM (sidechain-ducked under the voice) into the narration here,
+# instead of letting Remotion/ffmpeg lay it under at a fixed volume
+PREMIX_BGM = os.environ.get("PREMIX_BGM", "0") == "1"
+PREMIX_SAMPLE_RATE = 44100
+# Bring every channel's narration to the same integrated loudness (EBU R128, see loudness.py).
+# Only inside an encode that happens anyway (BGM premix, or stitching a multi-piece narration):
+# a narration Edge TTS returned in one piece is never decoded and re-encoded just to level it.
+NORMALIZE_NARRATION = os.environ.get("NORMALIZE_NARRATION", "1") == "1"
+NARRATION_TARGET_LUFS = float(os.environ.get("NARRATION_TARGET_LUFS", "-16"))
 
 async def generate_scene_image(prompt: str, scene_index: int, output_path: str):
     """
@@ -118,14 +129,31 @@ async def synthesize_assets_for_job(job_id: int):
         print(f"🎤 [Audio] Aggregating narration for {len(scenes)} scenes...")
         full_narration = " ".join([scene.get('text', '') for scene in scenes])
         
+        # Fresh files go to a scratch dir first; they are moved into the content-addressed store at the end
+        work_dir = asset_store.incoming_dir(job_id)
         audio_filename = f"job_{job_id}_narration.mp3"
-        audio_filepath = os.path.join(ASSET_OUT_DIR, audio_filename)
+        audio_filepath = os.path.join(work_dir, audio_filename)
         
         if generate_audio:
-            success = await generate_audio(full_narration, audio_filepath, voice=tts_voice)
+            bgm_path = asset_store.resolve_asset(job['audio_bgm']) if job['audio_bgm'] else None
+            premix = audio_mixer and PREMIX_BGM and bgm_path
+            target_lufs = NARRATION_TARGET_LUFS if NORMALIZE_NARRATION else None
+            # Without a premix, stitched narrations are leveled in the stitch encode
+            success = await generate_audio(full_narration, audio_filepath, voice=tts_voice,
+                                           target_lufs=None if premix else target_lufs)
             if not success:
                raise Exception("TTS Generation failed.")
             print(f"🎤 [Audio] ✅ Master audio saved to {audio_filepath}")
+            if premix:
+                # Leveling and BGM premix share one decode -> NumPy -> encode pass
+                mixed_filepath = os.path.join(work_dir, f"job_{job_id}_narration_mix.mp3")
+                narration = audio_mixer.decode_audio(audio_filepath, PREMIX_SAMPLE_RATE)
+                audio_mixer.mix_timeline([audio_mixer.clip_event(narration, label="narration")], mixed_filepath,
+                                         PREMIX_SAMPLE_RATE, bgm_path=bgm_path, target_lufs=target_lufs)
+                os.replace(mixed_filepath, audio_filepath)
+                # The bed is baked into the narration now; don't let the renderer add it a second time
+                script_data.pop('bgmUrl', None)
+                print(f"🎤 [Audio] ✅ Premixed ducked BGM ({job['audio_bgm']}) into the narration")
         else:
             print(f"🎤 [Audio] ⚠️ Could not import generate_audio. Skipping true TTS.")
             # Leave dummy file
@@ -168,13 +196,15 @@ async def synthesize_assets_for_job(job_id: int):
         # 2. Concurrently generate Images for every scene
         print(f"🎨 [Vision] Generating {len(scenes)} discrete assets...")
         image_tasks = []
+        job_assets = {script_data['audioUrl']: audio_filepath}
         for idx, scene in enumerate(scenes):
             prompt = scene.get('imagePrompt', f"Tech computer history scene {idx}")
             img_filename = f"job_{job_id}_scene_{idx}.png"
-            img_filepath = os.path.join(ASSET_OUT_DIR, img_filename)
+            img_filepath = os.path.join(work_dir, img_filename)
             
             # React components will load from the public folder root
             scene['imageUrl'] = f"assets/{img_filename}"
+            job_assets[scene['imageUrl']] = img_filepath
             
             # Push task to asyncio event loop
             image_tasks.append(generate_scene_image(prompt, idx, img_filepath))
@@ -182,6 +212,12 @@ async def synthesize_assets_for_job(job_id: int):
         # Await all images to finish downloading/generating
         await asyncio.gather(*image_tasks)
 
+        # Hash, dedupe and hardlink everything into the asset store, recorded in the job's manifest
+        manifest = asset_store.write_manifest(job_id, job_assets)
+        audio_entry = manifest['assets'][script_data['audioUrl']]
+        audio_filepath = asset_store.object_path(audio_entry['digest'], audio_entry['ext'])
+        print(f"📦 [Assets] ✅ Stored {len(job_assets)} files in the asset store (manifest job_{job_id}.json)")
+
         # 3. Save the enriched script JSON (with asset URLs attached) back to the DB
         enriched_json_str = json.dumps(script_data, ensure_ascii=False)
         
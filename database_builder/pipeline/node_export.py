@@ -0,0 +1,191 @@
+import os
+import sys
+import json
+import time
+from typing import Dict, Any, List, Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_DIR = os.path.join(SCRIPT_DIR, "..", "db")
+sys.path.append(DB_DIR)
+sys.path.append(SCRIPT_DIR)
+from storage import get_db_connection
+import asset_store
+import ffmpeg_tools
+
+ROOT_DIR = os.path.join(SCRIPT_DIR, "..", "..")
+REMOTION_DIR = os.path.join(ROOT_DIR, "video-generator")
+EXPORT_DIR = os.path.join(REMOTION_DIR, "out", "exports")
+FPS = 30
+
+# Per-platform delivery profiles, keyed like publish_metrics.platform.
+# Every rendition of a platform comes out of the same ffmpeg pass (decode + compose once, split, encode N times).
+EXPORT_PROFILES: Dict[str, Dict[str, Any]] = {
+    'douyin': {
+        'aspect': (9, 16),
+        'renditions': [
+            {'width': 1080, 'height': 1920, 'video_kbps': 8000, 'audio_kbps': 192},
+            {'width': 720, 'height': 1280, 'video_kbps': 4000, 'audio_kbps': 128},
+        ],
+    },
+    'wechat': {
+        'aspect': (9, 16),
+        'renditions': [
+            {'width': 1080, 'height': 1920, 'video_kbps': 6000, 'audio_kbps': 128},
+        ],
+    },
+    'xiaohongshu': {
+        'aspect': (3, 4),
+        'renditions': [
+            {'width': 1080, 'height': 1440, 'video_kbps': 6000, 'audio_kbps': 192},
+        ],
+    },
+    'youtube_shorts': {
+        'aspect': (9, 16),
+        'renditions': [
+            {'width': 1080, 'height': 1920, 'video_kbps': 8000, 'audio_kbps': 192},
+            {'width': 720, 'height': 1280, 'video_kbps': 4000, 'audio_kbps': 128},
+        ],
+    },
+    'youtube': {
+        'aspect': (16, 9),
+        'renditions': [
+            {'width': 1920, 'height': 1080, 'video_kbps': 8000, 'audio_kbps': 192},
+            {'width': 1280, 'height': 720, 'video_kbps': 5000, 'audio_kbps': 128},
+            {'width': 854, 'height': 480, 'video_kbps': 2500, 'audio_kbps': 128},
+        ],
+    },
+    'instagram': {
+        'aspect': (1, 1),
+        'renditions': [
+            {'width': 1080, 'height': 1080, 'video_kbps': 6000, 'audio_kbps': 192},
+        ],
+    },
+}
+
+# Side fill for non-vertical targets: the scene's own image, cover-cropped, blurred and darkened
+FILL_BLUR_SIGMA = 40
+FILL_BRIGHTNESS = -0.2
+
+def _canvas_size(profile: Dict[str, Any]) -> tuple:
+    """Compose once at the largest rendition; smaller rungs are scaled from it."""
+    top = max(profile['renditions'], key=lambda r: r['width'] * r['height'])
+    return top['width'], top['height']
+
+def _background_inputs(script_data: Dict[str, Any], public_dir: str) -> List[tuple]:
+    """(image_path, seconds) per scene, or [] if any image is missing (fall back to the master itself)."""
+    backgrounds = []
+    for scene in script_data.get('scenes', []):
+        path = os.path.join(public_dir, scene['imageUrl']) if scene.get('imageUrl') else None
+        if not path or not os.path.exists(path):
+            return []
+        backgrounds.append((path, int(scene.get('durationInFrames') or 150) / FPS))
+    return backgrounds
+
+def build_export_command(master_path: str, profile: Dict[str, Any], backgrounds: List[tuple],
+                         outputs: List[str]) -> List[str]:
+    """ffmpeg arguments producing every rendition of one platform profile in a single pass."""
+    width, height = _canvas_size(profile)
+    renditions = profile['renditions']
+    args = ["-i", master_path]
+    filters = []
+
+    master_w, master_h = 9, 16
+    same_aspect = profile['aspect'][0] * master_h == profile['aspect'][1] * master_w
+    if same_aspect:
+        filters.append(f"[0:v]scale={width}:{height},setsar=1[canvas]")
+    else:
+        if backgrounds:
+            labels = []
+            for i, (image_path, seconds) in enumerate(backgrounds, start=1):
+                args += ["-loop", "1", "-framerate", str(FPS), "-t", f"{seconds:.3f}", "-i", image_path]
+                filters.append(
+                    f"[{i}:v]scale={width}:{height}:force_original_aspect_ratio=increase,"
+                    f"crop={width}:{height},setsar=1,fps={FPS},format=yuv420p[bg{i}]"
+                )
+                labels.append(f"[bg{i}]")
+            filters.append(f"{''.join(labels)}concat=n={len(labels)}:v=1:a=0[bgraw]")
+            foreground = "[0:v]"
+        else:
+            filters.append("[0:v]split=2[fgsrc][bgsrc]")
+            filters.append(
+                f"[bgsrc]scale={width}:{height}:force_original_aspect_ratio=increase,crop={width}:{height},setsar=1[bgraw]"
+            )
+            foreground = "[fgsrc]"
+        filters.append(f"[bgraw]gblur=sigma={FILL_BLUR_SIGMA},eq=brightness={FILL_BRIGHTNESS}[bg]")
+        filters.append(f"{foreground}scale={width}:{height}:force_original_aspect_ratio=decrease,setsar=1[fg]")
+        filters.append("[bg][fg]overlay=(W-w)/2:(H-h)/2:shortest=1[canvas]")
+
+    split_labels = "".join(f"[c{i}]" for i in range(len(renditions)))
+    filters.append(f"[canvas]format=yuv420p,split={len(renditions)}{split_labels}")
+    for i, rendition in enumerate(renditions):
+        filters.append(f"[c{i}]scale={rendition['width']}:{rendition['height']}:flags=lanczos[v{i}]")
+
+    args += ["-filter_complex", ";".join(filters)]
+    for i, (rendition, output_path) in enumerate(zip(renditions, outputs)):
+        kbps = rendition['video_kbps']
+        args += [
+            "-map", f"[v{i}]", "-map", "0:a?",
+            "-c:v", "libx264", "-preset", "medium", "-profile:v", "high", "-r", str(FPS),
+            "-b:v", f"{kbps}k", "-maxrate", f"{int(kbps * 1.5)}k", "-bufsize", f"{kbps * 2}k",
+            "-g", str(FPS * 2), "-c:a", "aac", "-b:a", f"{rendition['audio_kbps']}k",
+            "-movflags", "+faststart", output_path,
+        ]
+    return args
+
+def export_job(job_id: int, platforms: Optional[List[str]] = None) -> bool:
+    """Derive every platform's aspect ratio and bitrate ladder from the finished 9:16 master render."""
+    print(f"📐 [Node 4b - Export] Starting multi-aspect export for Job #{job_id}...")
+    platforms = platforms or list(EXPORT_PROFILES)
+
+    conn = get_db_connection()
+    staging_name = f"export_{job_id}"
+    try:
+        job = conn.execute('SELECT * FROM video_jobs WHERE id = ?', (job_id,)).fetchone()
+        if not job or not job['video_path'] or job['status'] != 'RENDER_COMPLETE':
+            print(f"❌ Job {job_id} has no finished master render to export from.")
+            return False
+
+        master_path = os.path.join(REMOTION_DIR, job['video_path'])
+        script_data = json.loads(job['script_json'])
+        public_dir = asset_store.stage_public_dir(job_id, script_data, name=staging_name)
+        backgrounds = _background_inputs(script_data, public_dir)
+
+        job_dir = os.path.join(EXPORT_DIR, f"job_{job_id}")
+        os.makedirs(job_dir, exist_ok=True)
+
+        for platform in platforms:
+            profile = EXPORT_PROFILES[platform]
+            outputs = [
+                os.path.join(job_dir, f"{platform}_{r['width']}x{r['height']}.mp4") for r in profile['renditions']
+            ]
+            t0 = time.perf_counter()
+            ffmpeg_tools.run_ffmpeg(build_export_command(master_path, profile, backgrounds, outputs))
+            print(f"   [Export] ✅ {platform} {profile['aspect'][0]}:{profile['aspect'][1]} "
+                  f"({len(outputs)} renditions) in {time.perf_counter() - t0:.1f}s")
+
+            for rendition, output_path in zip(profile['renditions'], outputs):
+                conn.execute('''
+                    INSERT INTO video_exports (job_id, platform, width, height, video_kbps, path)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(job_id, platform, width, height) DO UPDATE SET
+                        video_kbps = excluded.video_kbps, path = excluded.path, created_at = CURRENT_TIMESTAMP
+                ''', (job_id, platform, rendition['width'], rendition['height'], rendition['video_kbps'],
+                      os.path.relpath(output_path, REMOTION_DIR).replace(os.sep, "/")))
+            conn.commit()
+
+        print(f"✅ [Node 4b - Export] {len(platforms)} platform exports ready in {os.path.relpath(job_dir, REMOTION_DIR)}")
+        return True
+
+    except Exception as e:
+        print(f"❌ [Node 4b - Export] Export crashed: {e}")
+        return False
+    finally:
+        asset_store.release_staging(job_id, name=staging_name)
+        conn.close()
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        selected = sys.argv[2].split(",") if len(sys.argv) > 2 else None
+        export_job(int(sys.argv[1]), selected)
+    else:
+        print(f"Usage: python node_export.py <job_id> [{','.join(EXPORT_PROFILES)}]")
@@ -0,0 +1,167 @@
+import os
+import sys
+import json
+from typing import Any, Dict, Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_DIR = os.path.join(SCRIPT_DIR, "..", "db")
+sys.path.append(DB_DIR)
+from storage import get_db_connection
+
+ROOT_DIR = os.path.join(SCRIPT_DIR, "..", "..")
+PODCAST_ENGINE_DIR = os.path.join(ROOT_DIR, "podcast_engine")
+sys.path.append(PODCAST_ENGINE_DIR)
+
+# Every podcast job gets its own working dir: draft.json, episode.mp3 and the synthesis checkpoint
+PODCAST_DIR = os.path.join(ROOT_DIR, "data", "podcasts")
+
+def job_dir(podcast_job_id: int) -> str:
+    return os.path.join(PODCAST_DIR, f"job_{podcast_job_id}")
+
+def job_paths(podcast_job_id: int) -> Dict[str, str]:
+    base = job_dir(podcast_job_id)
+    return {"draft": os.path.join(base, "draft.json"), "output": os.path.join(base, "episode.mp3")}
+
+def _load_job(conn, podcast_job_id: int):
+    return conn.execute('''
+        SELECT pj.*, e.title, e.summary, e.rich_context
+        FROM podcast_jobs pj
+        JOIN historical_events e ON pj.event_id = e.id
+        WHERE pj.id = ?
+    ''', (podcast_job_id,)).fetchone()
+
+def _fail(conn, podcast_job_id: int, stage: str, error: Any) -> bool:
+    print(f"❌ [Node P - {stage}] Job #{podcast_job_id}: {error}")
+    conn.execute("UPDATE podcast_jobs SET error_log = ?, status = 'ERROR', updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                 (str(error), podcast_job_id))
+    conn.commit()
+    return False
+
+def _write_draft(job) -> str:
+    """Materialize the job's draft from the DB (the dashboard may have edited it) for the synth stages."""
+    paths = job_paths(job['id'])
+    os.makedirs(job_dir(job['id']), exist_ok=True)
+    dialogues = json.loads(job['draft_json'])
+    with open(paths["draft"], 'w', encoding='utf-8') as f:
+        json.dump(dialogues, f, ensure_ascii=False, indent=4)
+    return paths["draft"]
+
+def run_podcast_draft(podcast_job_id: int) -> bool:
+    """Stage 1: event text -> two-person dialogue draft (Gemini), stored in podcast_jobs.draft_json."""
+    print(f"🎙️ [Node P1 - Podcast Draft] Starting for Podcast Job #{podcast_job_id}...")
+    conn = get_db_connection()
+    try:
+        job = _load_job(conn, podcast_job_id)
+        if not job:
+            print(f"❌ Podcast job {podcast_job_id} not found.")
+            return False
+        content = job['rich_context'] or job['summary']
+        if not content:
+            return _fail(conn, podcast_job_id, "Podcast Draft", "Event has no text to adapt")
+
+        from prompt_tester import generate_podcast_draft
+        dialogues = generate_podcast_draft(content)
+        conn.execute('''
+            UPDATE podcast_jobs
+            SET draft_json = ?, lines_total = ?, lines_done = 0, error_log = NULL,
+                status = 'DRAFT_READY', updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (json.dumps(dialogues, ensure_ascii=False), len(dialogues), podcast_job_id))
+        conn.commit()
+        print(f"✅ [Node P1 - Podcast Draft] {len(dialogues)} lines written to DB.")
+        return True
+    except Exception as e:
+        return _fail(conn, podcast_job_id, "Podcast Draft", e)
+    finally:
+        conn.close()
+
+def run_podcast_tts(podcast_job_id: int, tts_url: Optional[str] = None) -> bool:
+    """
+    Stage 2: synthesize every line into the shared clip cache (see podcast_engine/full_podcast_synth.py).
+    Resumable: lines already in the cache are not sent to the TTS server again.
+    """
+    print(f"🗣️ [Node P2 - Podcast TTS] Starting for Podcast Job #{podcast_job_id}...")
+    conn = get_db_connection()
+    try:
+        job = _load_job(conn, podcast_job_id)
+        if not job:
+            print(f"❌ Podcast job {podcast_job_id} not found.")
+            return False
+        if not job['draft_json']:
+            return _fail(conn, podcast_job_id, "Podcast TTS", "No draft yet, run the draft stage first")
+
+        from full_podcast_synth import plan_lines, synthesize_lines, checkpoint_path, TTS_URL
+        from clip_cache import ClipCache
+        from synth_checkpoint import SynthCheckpoint, STATUS_DONE
+
+        draft_file = _write_draft(job)
+        with open(draft_file, 'r', encoding='utf-8') as f:
+            lines = plan_lines(json.load(f))
+        checkpoint = SynthCheckpoint(checkpoint_path(job_paths(podcast_job_id)["output"]), draft_file)
+        stats = synthesize_lines(lines, checkpoint, ClipCache(), tts_url or TTS_URL)
+        done = checkpoint.counts()[STATUS_DONE]
+
+        conn.execute("UPDATE podcast_jobs SET lines_total = ?, lines_done = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?",
+                     (len(lines), done, podcast_job_id))
+        conn.commit()
+        if done < len(lines):
+            return _fail(conn, podcast_job_id, "Podcast TTS",
+                         f"{len(lines) - done} of {len(lines)} lines failed TTS, rerun to retry only those")
+
+        conn.execute("UPDATE podcast_jobs SET status = 'TTS_COMPLETE', error_log = NULL WHERE id = ?", (podcast_job_id,))
+        conn.commit()
+        print(f"✅ [Node P2 - Podcast TTS] {done} lines voiced ({stats['reused']} from clip cache).")
+        return True
+    except Exception as e:
+        return _fail(conn, podcast_job_id, "Podcast TTS", e)
+    finally:
+        conn.close()
+
+def run_podcast_assembly(podcast_job_id: int) -> bool:
+    """
+    Stage 3: level, splice the sys_inject assets and mix the cached lines into episode.mp3.
+    With lines still missing it exports episode.partial.mp3 and leaves the job unfinished.
+    """
+    print(f"🎚️ [Node P3 - Podcast Assembly] Starting for Podcast Job #{podcast_job_id}...")
+    conn = get_db_connection()
+    try:
+        job = _load_job(conn, podcast_job_id)
+        if not job:
+            print(f"❌ Podcast job {podcast_job_id} not found.")
+            return False
+        if not job['draft_json']:
+            return _fail(conn, podcast_job_id, "Podcast Assembly", "No draft yet, run the draft stage first")
+
+        from full_podcast_synth import assemble_from_cache
+
+        draft_file = _write_draft(job)
+        result = assemble_from_cache(draft_file, job_paths(podcast_job_id)["output"])
+        if not result:
+            return _fail(conn, podcast_job_id, "Podcast Assembly", "No synthesized lines to assemble, run the TTS stage first")
+
+        conn.execute('''
+            UPDATE podcast_jobs
+            SET output_path = ?, duration_sec = ?, lines_total = ?, lines_done = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (os.path.relpath(result["output_path"], ROOT_DIR), round(result["duration_sec"], 2),
+              result["lines_total"], result["lines_done"], podcast_job_id))
+        conn.commit()
+        if not result["complete"]:
+            return _fail(conn, podcast_job_id, "Podcast Assembly",
+                         f"Partial episode: {result['lines_done']}/{result['lines_total']} lines voiced")
+
+        conn.execute("UPDATE podcast_jobs SET status = 'ASSEMBLED', error_log = NULL WHERE id = ?", (podcast_job_id,))
+        conn.commit()
+        print(f"✅ [Node P3 - Podcast Assembly] Episode ready: {result['output_path']} ({result['duration_sec'] / 60:.1f} min)")
+        return True
+    except Exception as e:
+        return _fail(conn, podcast_job_id, "Podcast Assembly", e)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    stages = {"draft": run_podcast_draft, "tts": run_podcast_tts, "assemble": run_podcast_assembly}
+    if len(sys.argv) > 2 and sys.argv[1] in stages:
+        stages[sys.argv[1]](int(sys.argv[2]))
+    else:
+        print("Usage: python node_podcast.py <draft|tts|assemble> <podcast_job_id>")
@@ -0,0 +1,189 @@
+import os
+import sys
+import json
+import hashlib
+import subprocess
+from typing import Dict, Any, Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_DIR = os.path.join(SCRIPT_DIR, "..", "db")
+sys.path.append(DB_DIR)
+sys.path.append(SCRIPT_DIR)
+from storage import get_db_connection
+import asset_store
+import ffmpeg_renderer
+import render_chunks
+from render_metrics import RenderMetrics
+from node_render import _write_props_file, _remove_props_file, _service_available, COMPOSITION_ID, REMOTION_DIR
+from render_service import get_render_service
+
+PREVIEW_DIR = os.path.join(REMOTION_DIR, "out", "previews")
+
+# Half resolution, half frame rate, throwaway encoder settings: good enough to review pacing, captions and images
+PREVIEW_SCALE = float(os.environ.get("PREVIEW_SCALE", "0.5"))
+PREVIEW_FPS = int(os.environ.get("PREVIEW_FPS", "15"))
+PREVIEW_CRF = 32
+PREVIEW_X264_PRESET = "ultrafast"
+PREVIEW_JPEG_QUALITY = 60
+
+# Final renders (dashboard, orchestrator, render_video_for_job) wait until the current preview has been
+# approved. Set to 0 to render straight after asset generation.
+REQUIRE_PREVIEW_APPROVAL = os.environ.get("REQUIRE_PREVIEW_APPROVAL", "1") == "1"
+
+def preview_key(job_id: int, script_json: str, renderer: str) -> str:
+    """Identifies what a preview shows: the script, the exact asset contents and the preview settings."""
+    manifest = asset_store.load_manifest(job_id) or {"assets": {}}
+    payload = {
+        "script": json.loads(script_json),
+        "assets": {url: entry.get("digest") for url, entry in manifest["assets"].items()},
+        "renderer": renderer,
+        "scale": PREVIEW_SCALE,
+        "fps": PREVIEW_FPS,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def _render_preview_remotion(job_id: int, script_data: Dict[str, Any], public_dir: str, staging_name: str,
+                             output_path: str, metrics: RenderMetrics):
+    preview_props = {**script_data, "previewFps": PREVIEW_FPS}
+    if _service_available():
+        metrics.backend = 'remotion-service'
+        service = get_render_service()
+        service.render(
+            {**preview_props, "assetBaseUrl": service.asset_base_url(staging_name)},
+            output_path,
+            on_progress=metrics.feed_service_progress,
+            scale=PREVIEW_SCALE,
+            crf=PREVIEW_CRF,
+            x264Preset=PREVIEW_X264_PRESET,
+            jpegQuality=PREVIEW_JPEG_QUALITY,
+        )
+        return
+
+    metrics.backend = 'remotion-cli'
+    props_path = _write_props_file(job_id, preview_props, suffix="_preview")
+    cmd = [
+        "npx.cmd" if os.name == "nt" else "npx", "remotion", "render", "src/index.ts", COMPOSITION_ID, output_path,
+        f"--props={props_path}", f"--public-dir={public_dir}", f"--scale={PREVIEW_SCALE}",
+        f"--crf={PREVIEW_CRF}", f"--x264-preset={PREVIEW_X264_PRESET}", f"--jpeg-quality={PREVIEW_JPEG_QUALITY}",
+    ]
+    try:
+        process = subprocess.Popen(cmd, cwd=REMOTION_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                   text=True, encoding="utf-8", errors="replace")
+        for line in process.stdout:
+            sys.stdout.write(f"     [Remotion Preview #{job_id}] {line}")
+            metrics.feed_line(line)
+        if process.wait() != 0:
+            raise Exception(f"Remotion Exit Code: {process.returncode}")
+    finally:
+        _remove_props_file(props_path)
+
+def render_preview_for_job(job_id: int, force: bool = False) -> Optional[str]:
+    """
+    Fast low-resolution review render (after Node 3). Cached: if script and assets are unchanged
+    the existing preview is returned immediately. Returns the preview path relative to video-generator/.
+    """
+    print(f"👀 [Node 4 - Preview] Starting for Job #{job_id}...")
+
+    conn = get_db_connection()
+    metrics = None
+    staging_name = f"preview_{job_id}"
+    try:
+        job = conn.execute('''
+            SELECT vj.*, ch.renderer
+            FROM video_jobs vj
+            LEFT JOIN channels ch ON vj.channel_id = ch.id
+            WHERE vj.id = ?
+        ''', (job_id,)).fetchone()
+
+        if not job or not job['script_json'] or job['status'] not in ['AUDIO_GEN', 'RENDER_COMPLETE']:
+            print(f"❌ Job {job_id} is missing assets or doesn't exist.")
+            return None
+
+        renderer = job['renderer'] or 'remotion'
+        key = preview_key(job_id, job['script_json'], renderer)
+        relative_path = f"out/previews/job_{job_id}_preview_{key[:12]}.mp4"
+        output_path = os.path.join(REMOTION_DIR, relative_path)
+
+        if not force and job['preview_key'] == key and os.path.exists(output_path):
+            print(f"   [Preview] ♻️ Script and assets unchanged, reusing {relative_path}")
+            return relative_path
+
+        script_data = json.loads(job['script_json'])
+        os.makedirs(PREVIEW_DIR, exist_ok=True)
+        public_dir = asset_store.stage_public_dir(job_id, script_data, name=staging_name)
+
+        metrics = RenderMetrics(job_id, renderer, kind='preview')
+        metrics.add_frames(total=round(sum(render_chunks.scene_frames(script_data)) * PREVIEW_FPS / ffmpeg_renderer.FPS))
+        metrics.enter_stage('render')
+        if renderer == 'ffmpeg':
+            ffmpeg_renderer.render_with_ffmpeg(
+                job_id, script_data, public_dir, output_path,
+                width=round(ffmpeg_renderer.WIDTH * PREVIEW_SCALE) // 2 * 2,
+                height=round(ffmpeg_renderer.HEIGHT * PREVIEW_SCALE) // 2 * 2,
+                fps=PREVIEW_FPS, crf=PREVIEW_CRF, preset=PREVIEW_X264_PRESET,
+                segment_dir_name=staging_name,
+            )
+        else:
+            _render_preview_remotion(job_id, script_data, public_dir, staging_name, output_path, metrics)
+        metrics.finish(success=True)
+
+        # Drop the previous preview file of this job; only the current one can be approved
+        if job['preview_path'] and job['preview_path'] != relative_path:
+            stale = os.path.join(REMOTION_DIR, job['preview_path'])
+            if os.path.exists(stale):
+                os.remove(stale)
+
+        conn.execute('''
+            UPDATE video_jobs SET preview_path = ?, preview_key = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?
+        ''', (relative_path, key, job_id))
+        conn.commit()
+        print(f"✅ [Node 4 - Preview] Preview ready at {relative_path}")
+        return relative_path
+
+    except Exception as e:
+        print(f"❌ [Node 4 - Preview] Preview render crashed: {e}")
+        if metrics:
+            metrics.finish(success=False)
+        return None
+    finally:
+        asset_store.release_staging(job_id, name=staging_name)
+        conn.close()
+
+def approve_preview(job_id: int) -> bool:
+    """Approve the preview currently on record. Fails if the script/assets changed since it was rendered."""
+    conn = get_db_connection()
+    try:
+        job = conn.execute('''
+            SELECT vj.*, ch.renderer FROM video_jobs vj LEFT JOIN channels ch ON vj.channel_id = ch.id WHERE vj.id = ?
+        ''', (job_id,)).fetchone()
+        if not job or not job['preview_key']:
+            print(f"❌ Job {job_id} has no preview to approve.")
+            return False
+        if preview_key(job_id, job['script_json'], job['renderer'] or 'remotion') != job['preview_key']:
+            print(f"❌ Job {job_id} changed since its preview was rendered. Render a new preview first.")
+            return False
+        conn.execute('UPDATE video_jobs SET preview_approved_key = ? WHERE id = ?', (job['preview_key'], job_id))
+        conn.commit()
+        print(f"✅ [Node 4 - Preview] Preview of Job #{job_id} approved.")
+        return True
+    finally:
+        conn.close()
+
+def is_approved(job_id: int) -> bool:
+    """True when the approved preview still matches the job's current script and assets."""
+    conn = get_db_connection()
+    try:
+        job = conn.execute('''
+            SELECT vj.*, ch.renderer FROM video_jobs vj LEFT JOIN channels ch ON vj.channel_id = ch.id WHERE vj.id = ?
+        ''', (job_id,)).fetchone()
+    finally:
+        conn.close()
+    if not job or not job['preview_approved_key'] or not job['script_json']:
+        return False
+    return preview_key(job_id, job['script_json'], job['renderer'] or 'remotion') == job['preview_approved_key']
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        render_preview_for_job(int(sys.argv[1]), force="--force" in sys.argv)
+    else:
+        print("Usage: python node_preview.py <job_id> [--force]")
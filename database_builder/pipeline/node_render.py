@@ -1,75 +1,234 @@
 import os
 import sys
 import json
+import threading
 import subprocess
-from typing import Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Tuple
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DB_DIR = os.path.join(SCRIPT_DIR, "..", "db")
 sys.path.append(DB_DIR)
 from storage import get_db_connection
+import asset_store
+from render_service import get_render_service, RenderServiceError, source_fingerprint
+import render_chunks
+import ffmpeg_renderer
+import scene_cache
+from render_metrics import RenderMetrics
 
 ROOT_DIR = os.path.join(SCRIPT_DIR, "..", "..")
 REMOTION_DIR = os.path.join(ROOT_DIR, "video-generator")
-SCRIPT_JSON_PATH = os.path.join(REMOTION_DIR, "src", "current_script.json")
+PROPS_DIR = os.path.join(REMOTION_DIR, "out", "props")
+COMPOSITION_ID = "IT-History-Today-Xerox-Alto"
 
-def render_video_for_job(job_id: int) -> bool:
+# How many jobs may render side by side. Each Remotion process gets an equal share of the CPU cores.
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", "2"))
+
+# Render through the warm Node service (cached bundle + reused browser). Set to 0 to force the one-shot CLI.
+USE_RENDER_SERVICE = os.environ.get("REMOTION_RENDER_SERVICE", "1") == "1"
+
+# Render scene by scene through the segment cache, so edits only re-render the scenes that changed.
+# Needs the warm service (or the ffmpeg backend): the one-shot CLI would re-bundle for every scene.
+USE_SCENE_CACHE = os.environ.get("SCENE_CACHE", "1") == "1"
+
+def _write_props_file(job_id: int, script_data: Dict[str, Any], suffix: str = "") -> str:
+    """Each job gets its own input props file, so concurrent renders never share mutable state."""
+    os.makedirs(PROPS_DIR, exist_ok=True)
+    props_path = os.path.join(PROPS_DIR, f"job_{job_id}{suffix}.json")
+    with open(props_path, "w", encoding="utf-8") as f:
+        json.dump(script_data, f, ensure_ascii=False)
+    return props_path
+
+def _remove_props_file(props_path: str):
+    if props_path and os.path.exists(props_path):
+        os.remove(props_path)
+
+def _staged_file(public_dir: str, url: str):
+    path = os.path.join(public_dir, url) if url else None
+    return path if path and os.path.exists(path) else None
+
+def _service_available() -> bool:
+    if not USE_RENDER_SERVICE:
+        return False
+    try:
+        get_render_service().ensure_started()
+        return True
+    except (RenderServiceError, OSError) as e:
+        print(f"   [Render Service] ⚠️ Unavailable ({e}), falling back to npx remotion render.")
+        return False
+
+def _render_with_service(job_id: int, script_data: Dict[str, Any], output_filepath: str, concurrency: int = None,
+                         frame_range: Tuple[int, int] = None, muted: bool = False, metrics: RenderMetrics = None):
+    service = get_render_service()
+    props = {**script_data, "assetBaseUrl": service.asset_base_url(f"job_{job_id}")}
+    if frame_range is None:
+        print(f"   [Render Service] 🚀 Rendering Job #{job_id} on the warm bundle/browser...")
+    options = {"concurrency": concurrency, "muted": muted}
+    if frame_range is not None:
+        options["frameRange"] = list(frame_range)
+    report = service.render(props, output_filepath, on_progress=metrics.feed_service_progress if metrics else None, **options)
+    if metrics:
+        metrics.extra['selectMs'] = report.get('selectMs')
+        metrics.extra['firstFrameMs'] = report.get('firstFrameMs')
+    if frame_range is None:
+        print(f"   [Render Service] ✅ {report['frames']} frames in {report['totalMs'] / 1000:.1f}s "
+              f"(first frame after {(report['firstFrameMs'] or 0) / 1000:.1f}s)")
+
+def _render_with_cli(job_id: int, props_path: str, output_filepath: str, public_dir: str, concurrency: int = None,
+                     frame_range: Tuple[int, int] = None, muted: bool = False, metrics: RenderMetrics = None):
+    # Call `npx remotion render` subprocess (bundles and launches a browser on every call)
+    cmd = [
+        "npx.cmd" if os.name == "nt" else "npx",
+        "remotion",
+        "render",
+        "src/index.ts",
+        COMPOSITION_ID,
+        output_filepath,
+        f"--props={props_path}",
+        f"--public-dir={public_dir}",
+    ]
+    if concurrency:
+        cmd.append(f"--concurrency={concurrency}")
+    if frame_range is not None:
+        cmd.append(f"--frames={frame_range[0]}-{frame_range[1]}")
+    if muted:
+        cmd.append("--muted")
+
+    print(f"   [FFMpeg] 🚀 Spawning Remotion Bundle & Render command...")
+    print(f"   [FFMpeg] Executing: {' '.join(cmd)}")
+
+    # This will block until the video is rendered. Capturing output.
+    process = subprocess.Popen(
+        cmd,
+        cwd=REMOTION_DIR,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        encoding="utf-8",
+        errors="replace"
+    )
+
+    # Stream logs to the python terminal (tagged with the job, since several renders may interleave)
+    for line in process.stdout:
+        sys.stdout.write(f"     [Remotion #{job_id}] {line}")
+        if metrics:
+            metrics.feed_line(line)
+
+    process.wait()
+
+    if process.returncode != 0:
+        raise Exception(f"Remotion Exit Code: {process.returncode}")
+
+def render_video_for_job(job_id: int, concurrency: int = None) -> bool:
     print(f"🎬 [Node 4 - Render Engine] Starting for Job #{job_id}...")
-    
+
+    # node_preview imports this module, so the approval gate is looked up at call time
+    import node_preview
+    if node_preview.REQUIRE_PREVIEW_APPROVAL and not node_preview.is_approved(job_id):
+        print(f"⏸️ [Node 4 - Render Engine] Job #{job_id} has no approved preview of its current script/assets. "
+              f"Render and approve a preview first (or set REQUIRE_PREVIEW_APPROVAL=0).")
+        return False
+
     conn = get_db_connection()
+    metrics = None
+    props_path = None
     try:
-        job = conn.execute('SELECT * FROM video_jobs WHERE id = ?', (job_id,)).fetchone()
+        job = conn.execute('''
+            SELECT vj.*, ch.renderer
+            FROM video_jobs vj
+            LEFT JOIN channels ch ON vj.channel_id = ch.id
+            WHERE vj.id = ?
+        ''', (job_id,)).fetchone()
         
         if not job or not job['script_json'] or job['status'] not in ['AUDIO_GEN', 'RENDER_COMPLETE']:
             print(f"❌ Job {job_id} is missing assets or doesn't exist.")
             return False
 
-        # 1. Inject JSON into the React codebase
+        # 1. Hand the script to the composition as input props (no source file is touched, so no re-bundle)
         script_data = json.loads(job['script_json'])
-        with open(SCRIPT_JSON_PATH, "w", encoding="utf-8") as f:
-            json.dump(script_data, f, ensure_ascii=False, indent=2)
-            
-        print(f"   [Data Injection] ✅ Rewrote current_script.json for React compiler.")
+        props_path = _write_props_file(job_id, script_data)
+
+        print(f"   [Data Injection] ✅ Wrote input props to {os.path.relpath(props_path, REMOTION_DIR)}")
 
         # 2. Setup output paths
         output_filename = f"job_{job_id}_final.mp4"
         output_filepath = os.path.join(REMOTION_DIR, "out", output_filename)
         os.makedirs(os.path.dirname(output_filepath), exist_ok=True)
 
-        # 3. Call `npx remotion render` subprocess
-        cmd = [
-            "npx.cmd" if os.name == "nt" else "npx",
-            "remotion",
-            "render",
-            "src/index.ts",
-            "IT-History-Today-Xerox-Alto",
-            f"out/{output_filename}"
-        ]
-        
-        print(f"   [FFMpeg] 🚀 Spawning Remotion Bundle & Render command...")
-        print(f"   [FFMpeg] Executing: {' '.join(cmd)}")
-        
-        # This will block until the video is rendered. Capturing output.
-        process = subprocess.Popen(
-            cmd,
-            cwd=REMOTION_DIR,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            encoding="utf-8",
-            errors="replace"
-        )
-        
-        # Stream logs to the python terminal
-        for line in process.stdout:
-            sys.stdout.write(f"     [Remotion] {line}")
-            
-        process.wait()
+        # 3. Stage a public dir holding only this job's assets so the bundler doesn't copy the whole library
+        public_dir = asset_store.stage_public_dir(job_id, script_data)
+
+        # 4. Render: channels on the ffmpeg backend skip Chromium entirely; Remotion uses the warm
+        #    service if available (scene by scene through the segment cache), otherwise the one-shot CLI
+        renderer = job['renderer'] or 'remotion'
+        scenes = script_data.get('scenes', [])
+        metrics = RenderMetrics(job_id, renderer)
+        metrics.add_frames(total=sum(render_chunks.scene_frames(script_data)))
+
+        metrics.enter_stage('startup')
+        use_service = renderer == 'remotion' and _service_available()
+        if use_service:
+            service_stats = get_render_service().startup_stats
+            metrics.extra['bundleMs'] = service_stats.get('bundleMs')
+            metrics.extra['bundleCached'] = service_stats.get('bundleCached')
+
+        def piece_done(frame_range):
+            frames = frame_range[1] - frame_range[0] + 1
+            metrics.add_frames(rendered=frames, encoded=frames)
+
+        metrics.enter_stage('render')
+        if renderer == 'ffmpeg':
+            print(f"   [FFmpeg Renderer] 🚀 Rendering Job #{job_id} natively with ffmpeg (no browser)...")
+            filter_style = script_data.get('filterStyle') or ffmpeg_renderer.DEFAULT_FILTER_STYLE
+
+            def render_scene(index, frame_range, scene_path, scene_concurrency):
+                ffmpeg_renderer.render_scene_segment(scenes[index], index, filter_style, public_dir, scene_path)
+                piece_done(frame_range)
+
+            metrics.extra.update(scene_cache.render_scenes_cached(
+                job_id, script_data, public_dir, render_scene, ffmpeg_renderer.renderer_fingerprint(), output_filepath,
+                metrics=metrics,
+            ))
+        elif use_service and USE_SCENE_CACHE:
+            metrics.backend = 'remotion-service'
 
-        if process.returncode != 0:
-            raise Exception(f"Remotion Exit Code: {process.returncode}")
+            def render_scene(index, frame_range, scene_path, scene_concurrency):
+                _render_with_service(job_id, script_data, scene_path, scene_concurrency, frame_range, muted=True)
+                piece_done(frame_range)
 
-        # 4. Save video path and mark complete
+            metrics.extra.update(scene_cache.render_scenes_cached(
+                job_id, script_data, public_dir, render_scene, f"remotion:{source_fingerprint()}", output_filepath,
+                metrics=metrics,
+            ))
+        elif render_chunks.should_render_chunked(script_data):
+            # Long-form: scene-aligned chunks in parallel, stitched losslessly, resumable after crashes
+            metrics.backend = 'remotion-service' if use_service else 'remotion-cli'
+
+            def render_range(frame_range, chunk_path, chunk_concurrency):
+                if use_service:
+                    _render_with_service(job_id, script_data, chunk_path, chunk_concurrency, frame_range, muted=True)
+                else:
+                    _render_with_cli(job_id, props_path, chunk_path, public_dir, chunk_concurrency, frame_range, muted=True)
+                piece_done(frame_range)
+
+            render_chunks.render_chunked(
+                job_id, script_data, render_range, output_filepath,
+                narration_path=_staged_file(public_dir, script_data.get('audioUrl')),
+                bgm_path=_staged_file(public_dir, script_data.get('bgmUrl')),
+                metrics=metrics,
+            )
+        elif use_service:
+            metrics.backend = 'remotion-service'
+            _render_with_service(job_id, script_data, output_filepath, concurrency, metrics=metrics)
+        else:
+            metrics.backend = 'remotion-cli'
+            # The one-shot CLI bundles first; its own progress lines move the stage on to render
+            metrics.enter_stage('bundle')
+            _render_with_cli(job_id, props_path, output_filepath, public_dir, concurrency, metrics=metrics)
+        metrics.finish(success=True)
+
+        # 5. Save video path and mark complete
         relative_video_path = f"out/{output_filename}" # Use relative to be served by a static server if needed
         conn.execute('''
             UPDATE video_jobs 
@@ -83,15 +242,66 @@ def render_video_for_job(job_id: int) -> bool:
 
     except Exception as e:
         print(f"❌ [Node 4 - Render Engine] Rendering crashed: {e}")
+        if metrics:
+            metrics.finish(success=False)
         conn.execute("UPDATE video_jobs SET error_log = ?, status = 'ERROR' WHERE id = ?", (str(e), job_id))
         conn.commit()
         return False
     finally:
+        asset_store.release_staging(job_id)
+        _remove_props_file(props_path)
         conn.close()
 
+# Background renders queued from the dashboard, so an HTTP request never blocks on a full render
+_render_queue = None
+_queued_jobs = set()
+_queue_lock = threading.Lock()
+
+def queue_render(job_id: int) -> bool:
+    """
+    Run render_video_for_job in the background on up to RENDER_WORKERS threads.
+    Returns False if the job is already queued or rendering. Progress is visible in render_metrics.
+    """
+    global _render_queue
+    with _queue_lock:
+        if job_id in _queued_jobs:
+            return False
+        _queued_jobs.add(job_id)
+        if _render_queue is None:
+            _render_queue = ThreadPoolExecutor(max_workers=max(1, RENDER_WORKERS))
+
+    def run():
+        try:
+            render_video_for_job(job_id)
+        except Exception as e:
+            print(f"❌ [Node 4 - Render Engine] Queued render of Job #{job_id} crashed: {e}")
+        finally:
+            with _queue_lock:
+                _queued_jobs.discard(job_id)
+
+    _render_queue.submit(run)
+    print(f"📥 [Node 4 - Render Engine] Job #{job_id} queued for final render")
+    return True
+
+def render_jobs_concurrently(job_ids: List[int], max_workers: int = RENDER_WORKERS) -> Dict[int, bool]:
+    """
+    Render several jobs in parallel. Safe because every job has its own props file,
+    staged public dir and output file.
+    """
+    max_workers = max(1, min(max_workers, len(job_ids)))
+    concurrency = max(1, (os.cpu_count() or 2) // max_workers)
+    print(f"🏭 [Node 4 - Render Pool] {len(job_ids)} jobs on {max_workers} workers ({concurrency} Chromium tabs each)")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        results = pool.map(lambda jid: render_video_for_job(jid, concurrency=concurrency), job_ids)
+        return dict(zip(job_ids, results))
+
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
+    if len(sys.argv) > 2:
+        results = render_jobs_concurrently([int(arg) for arg in sys.argv[1:]])
+        print(f"🏁 [Node 4 - Render Pool] {sum(results.values())}/{len(results)} jobs rendered.")
+    elif len(sys.argv) > 1:
         job_id = int(sys.argv[1])
         render_video_for_job(job_id)
     else:
-        print("Usage: python node_render.py <job_id>")
+        print("Usage: python node_render.py <job_id> [<job_id> ...]")
@@ -0,0 +1,106 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, List, Tuple, Callable, Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+import ffmpeg_tools
+
+ROOT_DIR = os.path.join(SCRIPT_DIR, "..", "..")
+CHUNKS_DIR = os.path.join(ROOT_DIR, "video-generator", "out", "chunks")
+
+# Videos longer than this (3 minutes @ 30fps) are rendered as parallel chunks
+CHUNKED_RENDER_MIN_FRAMES = int(os.environ.get("CHUNKED_RENDER_MIN_FRAMES", str(3 * 60 * 30)))
+# Chunks grow scene by scene until they reach roughly this many frames (~1 minute)
+CHUNK_TARGET_FRAMES = int(os.environ.get("CHUNK_TARGET_FRAMES", str(60 * 30)))
+CHUNK_WORKERS = int(os.environ.get("CHUNK_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+CHUNK_RETRIES = 3
+
+# render_range(frame_range, output_path, concurrency) renders a muted frame range to output_path
+RangeRenderer = Callable[[Tuple[int, int], str, int], None]
+
+def scene_frames(script_data: Dict[str, Any]) -> List[int]:
+    return [int(scene.get('durationInFrames') or 150) for scene in script_data.get('scenes', [])]
+
+def should_render_chunked(script_data: Dict[str, Any]) -> bool:
+    return sum(scene_frames(script_data)) >= CHUNKED_RENDER_MIN_FRAMES
+
+def plan_chunks(script_data: Dict[str, Any], target_frames: int = CHUNK_TARGET_FRAMES) -> List[Tuple[int, int]]:
+    """Split the timeline into inclusive frame ranges that always start and end on scene boundaries."""
+    chunks = []
+    chunk_start = 0
+    cursor = 0
+    for duration in scene_frames(script_data):
+        cursor += duration
+        if cursor - chunk_start >= target_frames:
+            chunks.append((chunk_start, cursor - 1))
+            chunk_start = cursor
+    if cursor > chunk_start:
+        chunks.append((chunk_start, cursor - 1))
+    return chunks
+
+def _render_key(script_data: Dict[str, Any]) -> str:
+    """Identifies the exact render a chunk belongs to, so resumed runs never mix chunks of two script versions."""
+    stable = {k: v for k, v in script_data.items() if k != 'assetBaseUrl'}
+    return hashlib.sha256(json.dumps(stable, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+def _render_chunk_with_retries(render_range: RangeRenderer, frame_range: Tuple[int, int], chunk_path: str,
+                               concurrency: int, label: str) -> str:
+    if os.path.exists(chunk_path):
+        print(f"   [Chunks] ♻️ {label} frames {frame_range[0]}-{frame_range[1]} already rendered, reusing.")
+        return chunk_path
+
+    part_path = chunk_path.replace(".mp4", ".part.mp4")
+    for attempt in range(1, CHUNK_RETRIES + 1):
+        try:
+            t0 = time.perf_counter()
+            render_range(frame_range, part_path, concurrency)
+            os.replace(part_path, chunk_path)
+            print(f"   [Chunks] ✅ {label} frames {frame_range[0]}-{frame_range[1]} in {time.perf_counter() - t0:.1f}s")
+            return chunk_path
+        except Exception as e:
+            print(f"   [Chunks] ⚠️ {label} attempt {attempt}/{CHUNK_RETRIES} failed: {e}")
+            if attempt == CHUNK_RETRIES:
+                raise
+            time.sleep(5 * attempt)
+
+def render_chunked(job_id: int, script_data: Dict[str, Any], render_range: RangeRenderer, output_path: str,
+                   narration_path: Optional[str], bgm_path: Optional[str], metrics=None):
+    """
+    Render a long video as independent scene-aligned chunks in parallel, then stitch them with
+    ffmpeg (stream copy) and lay the audio back underneath.
+
+    Finished chunks survive crashes: rerunning the job only renders the chunks that are missing.
+    """
+    chunks = plan_chunks(script_data)
+    chunk_dir = os.path.join(CHUNKS_DIR, f"job_{job_id}", _render_key(script_data))
+    os.makedirs(chunk_dir, exist_ok=True)
+
+    workers = max(1, min(CHUNK_WORKERS, len(chunks)))
+    concurrency = max(1, (os.cpu_count() or 2) // workers)
+    print(f"   [Chunks] 🧩 {sum(scene_frames(script_data))} frames -> {len(chunks)} chunks on {workers} workers")
+
+    chunk_paths = [os.path.join(chunk_dir, f"chunk_{i:03d}_{start}-{end}.mp4") for i, (start, end) in enumerate(chunks)]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_render_chunk_with_retries, render_range, frame_range, path, concurrency,
+                        f"Chunk {i + 1}/{len(chunks)}")
+            for i, (frame_range, path) in enumerate(zip(chunks, chunk_paths))
+        ]
+        for future in as_completed(futures):
+            future.result()
+
+    if metrics:
+        metrics.enter_stage('stitch')
+    print(f"   [Chunks] 🔗 Stitching {len(chunk_paths)} chunks with ffmpeg (stream copy)...")
+    silent_path = os.path.join(chunk_dir, "stitched_silent.mp4")
+    ffmpeg_tools.concat_copy(chunk_paths, silent_path)
+    ffmpeg_tools.mux_audio(silent_path, narration_path, bgm_path, output_path)
+
+    # Only clean up once the final file exists, so a crash during stitching can resume cheaply
+    shutil.rmtree(os.path.join(CHUNKS_DIR, f"job_{job_id}"), ignore_errors=True)
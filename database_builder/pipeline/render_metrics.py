@@ -0,0 +1,242 @@
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import threading
+from typing import Dict, Any, Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_DIR = os.path.join(SCRIPT_DIR, "..", "db")
+sys.path.append(DB_DIR)
+from storage import get_db_connection
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# How often the running row is written back, so the dashboard can poll progress/ETA
+PERSIST_INTERVAL_SEC = 2.0
+MEMORY_SAMPLE_INTERVAL_SEC = 0.5
+
+# Remotion CLI (non-TTY) progress lines, e.g. "Bundling 42%", "Rendered 120/300", "Encoded 118/300", "Stitching..."
+BUNDLE_RE = re.compile(r'Bundl(?:ing|ed)\D*?(\d+)%')
+RENDERED_RE = re.compile(r'Render(?:ed|ing frames)\D*?(\d+)/(\d+)')
+ENCODED_RE = re.compile(r'Encod(?:ed|ing video)\D*?(\d+)/(\d+)')
+STITCH_RE = re.compile(r'Stitch', re.IGNORECASE)
+COMPOSITION_RE = re.compile(r'Getting composition|Composition\s', re.IGNORECASE)
+
+class RenderMetrics:
+    """
+    Collects structured metrics for one render: stage durations, rendered/encoded frame counts,
+    throughput, ETA and peak memory. Fed either with raw Remotion CLI lines (`feed_line`) or with
+    render-service progress messages (`feed_service_progress`), and persisted to `render_metrics`.
+    """
+
+    def __init__(self, job_id: int, backend: str, kind: str = 'final'):
+        self.job_id = job_id
+        self.backend = backend
+        self.kind = kind
+        self.started = time.perf_counter()
+        self.stage: Optional[str] = None
+        self.stages: Dict[str, float] = {}
+        self._stage_started = self.started
+        self.frames_total = 0
+        self.frames_rendered = 0
+        self.frames_encoded = 0
+        self.fps = 0.0
+        self.eta_sec: Optional[float] = None
+        self.peak_rss_mb = 0.0
+        self.extra: Dict[str, Any] = {}
+        self._render_started: Optional[float] = None
+        self._frames_at_render_start = 0
+        self._progress_seen = False
+        self._lock = threading.Lock()
+        self._last_persist = 0.0
+        self._stop = threading.Event()
+        self.row_id = self._insert()
+        self._sampler = threading.Thread(target=self._sample_memory, daemon=True)
+        self._sampler.start()
+
+    # ----------------- STAGES -----------------
+
+    def enter_stage(self, stage: str):
+        with self._lock:
+            if stage == self.stage:
+                return
+            now = time.perf_counter()
+            if self.stage:
+                self.stages[self.stage] = self.stages.get(self.stage, 0.0) + (now - self._stage_started)
+            self.stage = stage
+            self._stage_started = now
+            if stage == 'render' and self._render_started is None:
+                self._render_started = now
+
+    def add_frames(self, rendered: int = 0, encoded: int = 0, total: int = 0):
+        """Accumulate frames from independent pieces (scenes/chunks) of one render."""
+        with self._lock:
+            self.frames_rendered += rendered
+            self.frames_encoded += encoded
+            self.frames_total = max(self.frames_total, total)
+        self._update_throughput()
+
+    def _set_frames(self, rendered: Optional[int] = None, encoded: Optional[int] = None, total: Optional[int] = None):
+        with self._lock:
+            if not self._progress_seen:
+                # Throughput is measured from the first progress report, so bundling and browser
+                # startup before it (one-shot CLI) never count as render time
+                self._progress_seen = True
+                self._render_started = time.perf_counter()
+                self._frames_at_render_start = max(rendered or 0, encoded or 0)
+            if rendered is not None:
+                self.frames_rendered = max(self.frames_rendered, rendered)
+            if encoded is not None:
+                self.frames_encoded = max(self.frames_encoded, encoded)
+            if total:
+                self.frames_total = max(self.frames_total, total)
+        self._update_throughput()
+
+    def _update_throughput(self):
+        with self._lock:
+            elapsed = time.perf_counter() - self._render_started if self._render_started else 0
+            done = max(self.frames_rendered, self.frames_encoded)
+            measured = done - self._frames_at_render_start
+            if elapsed > 0 and measured > 0:
+                self.fps = measured / elapsed
+                if self.frames_total:
+                    self.eta_sec = max(0.0, (self.frames_total - done) / self.fps)
+        self.persist()
+
+    # ----------------- PARSERS -----------------
+
+    def feed_line(self, line: str):
+        """Parse one line of `npx remotion render` output."""
+        match = RENDERED_RE.search(line)
+        if match:
+            self.enter_stage('render')
+            self._set_frames(rendered=int(match.group(1)), total=int(match.group(2)))
+            return
+        match = ENCODED_RE.search(line)
+        if match:
+            self.enter_stage('encode')
+            self._set_frames(encoded=int(match.group(1)), total=int(match.group(2)))
+            return
+        if BUNDLE_RE.search(line):
+            self.enter_stage('bundle')
+        elif COMPOSITION_RE.search(line):
+            self.enter_stage('select')
+        elif STITCH_RE.search(line):
+            self.enter_stage('stitch')
+
+    def feed_service_progress(self, message: Dict[str, Any]):
+        """Parse a render-service `progress` message (renderMedia onProgress)."""
+        stitch_stage = message.get('stitchStage')
+        if stitch_stage == 'muxing':
+            self.enter_stage('stitch')
+        elif message.get('encodedFrames', 0) >= message.get('renderedFrames', 0) > 0:
+            self.enter_stage('encode')
+        else:
+            self.enter_stage('render')
+        self._set_frames(rendered=message.get('renderedFrames'), encoded=message.get('encodedFrames'))
+
+    # ----------------- MEMORY -----------------
+
+    def _sample_memory(self):
+        """Peak RSS of this process plus its children (Node/Chromium/ffmpeg) while the render runs."""
+        while not self._stop.is_set():
+            rss = 0
+            if psutil is not None:
+                try:
+                    proc = psutil.Process()
+                    for p in [proc] + proc.children(recursive=True):
+                        try:
+                            rss += p.memory_info().rss
+                        except psutil.Error:
+                            pass
+                except psutil.Error:
+                    pass
+            else:
+                try:
+                    import resource
+                    # ru_maxrss is KB on Linux; only covers children that have exited
+                    rss = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss +
+                           resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) * 1024
+                except (ImportError, AttributeError):
+                    return
+            with self._lock:
+                self.peak_rss_mb = max(self.peak_rss_mb, rss / 1024 / 1024)
+            self._stop.wait(MEMORY_SAMPLE_INTERVAL_SEC)
+
+    # ----------------- PERSISTENCE -----------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stages = dict(self.stages)
+            if self.stage:
+                stages[self.stage] = stages.get(self.stage, 0.0) + (time.perf_counter() - self._stage_started)
+            return {
+                "stages_ms": {k: round(v * 1000) for k, v in stages.items()},
+                "frames_total": self.frames_total,
+                "frames_rendered": self.frames_rendered,
+                "frames_encoded": self.frames_encoded,
+                "fps": round(self.fps, 2),
+                "eta_sec": round(self.eta_sec, 1) if self.eta_sec is not None else None,
+                "peak_rss_mb": round(self.peak_rss_mb, 1),
+                "total_ms": round((time.perf_counter() - self.started) * 1000),
+                "extra": dict(self.extra),
+            }
+
+    def _insert(self) -> Optional[int]:
+        conn = get_db_connection()
+        try:
+            cursor = conn.execute('''
+                INSERT INTO render_metrics (job_id, kind, backend, status) VALUES (?, ?, ?, 'RUNNING')
+            ''', (self.job_id, self.kind, self.backend))
+            conn.commit()
+            return cursor.lastrowid
+        except sqlite3.Error as e:
+            # Metrics must never break a render (e.g. migrate_v6.py not applied yet)
+            print(f"   [Render Metrics] ⚠️ Not recording metrics: {e}")
+            return None
+        finally:
+            conn.close()
+
+    def persist(self, status: str = 'RUNNING', force: bool = False):
+        now = time.perf_counter()
+        if self.row_id is None:
+            return
+        if not force and now - self._last_persist < PERSIST_INTERVAL_SEC:
+            return
+        self._last_persist = now
+        snap = self.snapshot()
+        conn = get_db_connection()
+        try:
+            conn.execute('''
+                UPDATE render_metrics SET
+                    status = ?, backend = ?, stage = ?, total_ms = ?, stages_json = ?,
+                    frames_total = ?, frames_rendered = ?, frames_encoded = ?,
+                    fps = ?, eta_sec = ?, peak_rss_mb = ?, extra_json = ?,
+                    finished_at = CASE WHEN ? = 'RUNNING' THEN NULL ELSE CURRENT_TIMESTAMP END
+                WHERE id = ?
+            ''', (
+                status, self.backend, self.stage, snap['total_ms'], json.dumps(snap['stages_ms']),
+                snap['frames_total'], snap['frames_rendered'], snap['frames_encoded'],
+                snap['fps'], snap['eta_sec'], snap['peak_rss_mb'], json.dumps(snap['extra'], ensure_ascii=False),
+                status, self.row_id,
+            ))
+            conn.commit()
+        except sqlite3.Error as e:
+            print(f"   [Render Metrics] ⚠️ Could not persist metrics: {e}")
+        finally:
+            conn.close()
+
+    def finish(self, success: bool):
+        self.enter_stage(None)
+        self._stop.set()
+        self.persist('COMPLETE' if success else 'ERROR', force=True)
+        snap = self.snapshot()
+        stages = ", ".join(f"{k} {v / 1000:.1f}s" for k, v in snap['stages_ms'].items())
+        print(f"   [Render Metrics] 📊 {snap['frames_total']} frames, {snap['fps']} fps, "
+              f"peak {snap['peak_rss_mb']} MB, total {snap['total_ms'] / 1000:.1f}s ({stages})")
@@ -0,0 +1,267 @@
+import os
+import sys
+import json
+import time
+import queue
+import shutil
+import hashlib
+import threading
+import subprocess
+from typing import Dict, Any, Optional, Callable
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+import asset_store
+
+ROOT_DIR = os.path.join(SCRIPT_DIR, "..", "..")
+REMOTION_DIR = os.path.join(ROOT_DIR, "video-generator")
+SERVICE_SCRIPT = os.path.join(REMOTION_DIR, "render-service.mjs")
+BUNDLE_ROOT = os.path.join(REMOTION_DIR, "build", "bundles")
+KEEP_BUNDLES = 3
+
+MESSAGE_PREFIX = "@@render-service "
+
+# Everything that ends up inside the webpack bundle. A change to any of these means a rebuild.
+BUNDLE_INPUTS = ["src", "package.json", "remotion.config.ts", "render-service.mjs"]
+
+def source_fingerprint() -> str:
+    """Hash of the composition sources; the cached bundle is keyed on it."""
+    sha = hashlib.sha256()
+    for entry in BUNDLE_INPUTS:
+        full = os.path.join(REMOTION_DIR, entry)
+        paths = [full]
+        if os.path.isdir(full):
+            paths = sorted(
+                os.path.join(dirpath, name)
+                for dirpath, _, names in os.walk(full)
+                for name in names
+            )
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            sha.update(os.path.relpath(path, REMOTION_DIR).replace(os.sep, "/").encode("utf-8"))
+            with open(path, "rb") as f:
+                sha.update(f.read())
+    return sha.hexdigest()
+
+class RenderServiceError(Exception):
+    pass
+
+class RenderService:
+    """
+    Python handle on render-service.mjs: one Node process holding the webpack bundle, the
+    serve URL and a warm Chromium, shared by every render (and every render-pool thread).
+    """
+
+    def __init__(self):
+        self.process: Optional[subprocess.Popen] = None
+        self.fingerprint: Optional[str] = None
+        self.static_url: Optional[str] = None
+        self.startup_stats: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._pending: Dict[str, queue.Queue] = {}
+        self._counter = 0
+
+    def ensure_started(self):
+        fingerprint = source_fingerprint()
+        with self._lock:
+            running = self.process is not None and self.process.poll() is None
+            if running and (fingerprint == self.fingerprint or self._pending):
+                # Never restart under in-flight renders; the new bundle is picked up once idle
+                return
+            self._stop_locked()
+            self._start_locked(fingerprint)
+
+    def _start_locked(self, fingerprint: str):
+        bundle_dir = os.path.join(BUNDLE_ROOT, fingerprint[:16])
+        cached = os.path.exists(os.path.join(bundle_dir, "index.html"))
+        print(f"   [Render Service] {'♻️ Reusing' if cached else '📦 Building'} bundle {fingerprint[:16]}...")
+
+        t_start = time.perf_counter()
+        self.process = subprocess.Popen(
+            ["node", SERVICE_SCRIPT, "--bundle-dir", bundle_dir, "--static-root", asset_store.STAGING_DIR],
+            cwd=REMOTION_DIR,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding="utf-8",
+            errors="replace",
+        )
+
+        # Wait for the ready handshake, echoing bundler logs meanwhile
+        for line in self.process.stdout:
+            message = self._parse(line)
+            if message is None:
+                sys.stdout.write(f"     [Render Service] {line}")
+                continue
+            if message["type"] == "ready":
+                self.fingerprint = fingerprint
+                self.static_url = message["staticUrl"]
+                self.startup_stats = {**message, "startupMs": round((time.perf_counter() - t_start) * 1000)}
+                break
+            raise RenderServiceError(message.get("message", "render service failed to start"))
+        else:
+            raise RenderServiceError(f"render service exited with code {self.process.wait()}")
+
+        threading.Thread(target=self._read_loop, args=(self.process,), daemon=True).start()
+        print(f"   [Render Service] ✅ Ready in {self.startup_stats['startupMs']}ms "
+              f"(bundle {self.startup_stats['bundleMs']}ms, browser {self.startup_stats['browserMs']}ms)")
+        self._prune_bundles(keep=os.path.basename(bundle_dir))
+
+    def _prune_bundles(self, keep: str):
+        if not os.path.isdir(BUNDLE_ROOT):
+            return
+        bundles = [
+            os.path.join(BUNDLE_ROOT, name) for name in os.listdir(BUNDLE_ROOT)
+            if name not in (keep, "empty-public") and os.path.isdir(os.path.join(BUNDLE_ROOT, name))
+        ]
+        bundles.sort(key=os.path.getmtime, reverse=True)
+        for stale in bundles[KEEP_BUNDLES - 1:]:
+            shutil.rmtree(stale, ignore_errors=True)
+
+    @staticmethod
+    def _parse(line: str) -> Optional[Dict[str, Any]]:
+        if not line.startswith(MESSAGE_PREFIX):
+            return None
+        return json.loads(line[len(MESSAGE_PREFIX):])
+
+    def _read_loop(self, process: subprocess.Popen):
+        for line in process.stdout:
+            message = self._parse(line)
+            if message is None:
+                sys.stdout.write(f"     [Render Service] {line}")
+                continue
+            target = self._pending.get(message.get("id"))
+            if target:
+                target.put(message)
+        # Process died: fail whatever was still waiting on it
+        for target in list(self._pending.values()):
+            target.put({"type": "error", "message": f"render service exited with code {process.wait()}"})
+
+    def render(self, input_props: Dict[str, Any], output_location: str,
+               on_progress: Optional[Callable[[Dict[str, Any]], None]] = None, **options) -> Dict[str, Any]:
+        """
+        Render one composition through the warm service. Blocks until the file is written.
+        `options` are passed through to renderMedia (concurrency, frameRange, muted, ...).
+        Returns the service's timing report.
+        """
+        self.ensure_started()
+        with self._lock:
+            self._counter += 1
+            request_id = f"req_{self._counter}"
+            inbox: queue.Queue = queue.Queue()
+            self._pending[request_id] = inbox
+
+        request = {
+            "id": request_id,
+            "compositionId": options.pop("composition_id", "IT-History-Today-Xerox-Alto"),
+            "inputProps": input_props,
+            "outputLocation": os.path.abspath(output_location),
+            **options,
+        }
+        try:
+            with self._write_lock:
+                self.process.stdin.write(json.dumps(request, ensure_ascii=False) + "\n")
+                self.process.stdin.flush()
+            while True:
+                message = inbox.get()
+                if message["type"] == "progress":
+                    if on_progress:
+                        on_progress(message)
+                elif message["type"] == "done":
+                    return message
+                else:
+                    raise RenderServiceError(message.get("message", "unknown render error"))
+        finally:
+            with self._lock:
+                self._pending.pop(request_id, None)
+
+    def asset_base_url(self, staging_name: str) -> str:
+        return f"{self.static_url}/{staging_name}/"
+
+    def _stop_locked(self):
+        if self.process and self.process.poll() is None:
+            self.process.stdin.close()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        self.process = None
+
+    def stop(self):
+        with self._lock:
+            self._stop_locked()
+
+_service: Optional[RenderService] = None
+_service_lock = threading.Lock()
+
+def get_render_service() -> RenderService:
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = RenderService()
+        return _service
+
+def benchmark_overhead(job_id: int, runs: int = 3):
+    """
+    Per-job fixed overhead = wall time to render a single frame, which is all
+    npx resolution + bundling + browser launch + composition selection.
+    Compares the old one-shot CLI against the warm service.
+    """
+    sys.path.append(os.path.join(SCRIPT_DIR, "..", "db"))
+    from storage import get_db_connection
+    conn = get_db_connection()
+    job = conn.execute('SELECT script_json FROM video_jobs WHERE id = ?', (job_id,)).fetchone()
+    conn.close()
+    if not job or not job['script_json']:
+        print(f"❌ Job {job_id} has no script_json to benchmark with.")
+        return
+
+    script_data = json.loads(job['script_json'])
+    staging_name = f"bench_{job_id}"
+    public_dir = asset_store.stage_public_dir(job_id, script_data, name=staging_name)
+    props_path = os.path.join(REMOTION_DIR, "out", "props", f"{staging_name}.json")
+    os.makedirs(os.path.dirname(props_path), exist_ok=True)
+    with open(props_path, "w", encoding="utf-8") as f:
+        json.dump(script_data, f, ensure_ascii=False)
+    out_file = os.path.join(REMOTION_DIR, "out", f"{staging_name}.mp4")
+
+    try:
+        cli_times = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            subprocess.run(
+                ["npx.cmd" if os.name == "nt" else "npx", "remotion", "render", "src/index.ts",
+                 "IT-History-Today-Xerox-Alto", out_file, f"--props={props_path}",
+                 f"--public-dir={public_dir}", "--frames=0-0"],
+                cwd=REMOTION_DIR, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            cli_times.append(time.perf_counter() - t0)
+
+        service = get_render_service()
+        service.ensure_started()
+        props = {**script_data, "assetBaseUrl": service.asset_base_url(staging_name)}
+        service_times = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            service.render(props, out_file, frameRange=[0, 0])
+            service_times.append(time.perf_counter() - t0)
+        service.stop()
+
+        print(f"\n📊 Per-job fixed overhead (1-frame render, {runs} runs):")
+        print(f"   npx remotion render : {sum(cli_times) / runs:6.2f}s avg  {[round(t, 2) for t in cli_times]}")
+        print(f"   render service      : {sum(service_times) / runs:6.2f}s avg  {[round(t, 2) for t in service_times]}")
+        print(f"   (one-time service startup: {service.startup_stats.get('startupMs', 0) / 1000:.2f}s)")
+    finally:
+        asset_store.release_staging(job_id, name=staging_name)
+        for leftover in (props_path, out_file):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+
+if __name__ == "__main__":
+    if len(sys.argv) > 2 and sys.argv[1] == "--benchmark":
+        benchmark_overhead(int(sys.argv[2]), runs=int(sys.argv[3]) if len(sys.argv) > 3 else 3)
+    else:
+        print("Usage: python render_service.py --benchmark <job_id> [runs]")
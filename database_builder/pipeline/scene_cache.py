@@ -0,0 +1,150 @@
+import os
+import sys
+import json
+import time
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Tuple, Callable
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(SCRIPT_DIR)
+import asset_store
+import ffmpeg_tools
+import render_chunks
+
+ROOT_DIR = os.path.join(SCRIPT_DIR, "..", "..")
+# Content-addressed, shared by all jobs: two jobs with an identical scene reuse the same segment
+SCENE_CACHE_DIR = os.path.join(ROOT_DIR, "data", "scene_cache")
+WORK_DIR = os.path.join(ROOT_DIR, "video-generator", "out", "scene_work")
+
+SCENE_WORKERS = int(os.environ.get("SCENE_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+DEFAULT_RETENTION_DAYS = 14
+
+# render_scene(index, frame_range, output_path, concurrency) renders one muted scene to output_path
+SceneRenderer = Callable[[int, Tuple[int, int], str, int], None]
+
+def scene_fingerprint(scene: Dict[str, Any], index: int, filter_style: str, public_dir: str, backend_key: str) -> str:
+    """
+    Everything that changes the pixels of one scene: image content, caption, length, colour
+    filter, the index%4 Ken Burns motion, and the renderer (backend + its source version + output size).
+    """
+    image_path = os.path.join(public_dir, scene['imageUrl']) if scene.get('imageUrl') else None
+    image_digest = asset_store.file_digest(image_path) if image_path and os.path.exists(image_path) else None
+    payload = {
+        "image": image_digest,
+        "text": scene.get('text', ''),
+        "duration": int(scene.get('durationInFrames') or 150),
+        "filter": filter_style,
+        "motion": index % 4,
+        "backend": backend_key,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def _cache_path(fingerprint: str) -> str:
+    return os.path.join(SCENE_CACHE_DIR, fingerprint[:2], f"{fingerprint}.mp4")
+
+def scene_ranges(script_data: Dict[str, Any]) -> List[Tuple[int, int]]:
+    """Inclusive frame range of every scene on the full timeline."""
+    ranges = []
+    cursor = 0
+    for scene in script_data.get('scenes', []):
+        duration = int(scene.get('durationInFrames') or 150)
+        ranges.append((cursor, cursor + duration - 1))
+        cursor += duration
+    return ranges
+
+def _render_into_cache(render_scene: SceneRenderer, index: int, frame_range: Tuple[int, int], fingerprint: str,
+                       concurrency: int, job_id: int) -> str:
+    path = _cache_path(fingerprint)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Per-job temp name, so two jobs missing the same scene never write the same file
+    job_path = f"{path}.job{job_id}.mp4"
+    try:
+        # Same retry/backoff as the chunked renderer: one flaky scene must not fail the whole job
+        render_chunks._render_chunk_with_retries(
+            lambda scene_range, out_path, scene_concurrency: render_scene(index, scene_range, out_path, scene_concurrency),
+            frame_range, job_path, concurrency, f"Scene {index + 1}",
+        )
+        os.replace(job_path, path)
+    finally:
+        for leftover in (job_path, job_path.replace(".mp4", ".part.mp4")):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    return path
+
+def render_scenes_cached(job_id: int, script_data: Dict[str, Any], public_dir: str, render_scene: SceneRenderer,
+                         backend_key: str, output_path: str, metrics=None) -> Dict[str, int]:
+    """
+    Render a job scene by scene through the on-disk cache: only scenes whose fingerprint changed are
+    rendered, then all segments are concatenated (stream copy) and the narration + BGM are re-muxed.
+    Returns hit/miss counts. `metrics` (a RenderMetrics) is moved to the stitch stage before muxing.
+    """
+    scenes = script_data.get('scenes', [])
+    filter_style = script_data.get('filterStyle', '')
+    ranges = scene_ranges(script_data)
+    fingerprints = [
+        scene_fingerprint(scene, i, filter_style, public_dir, backend_key) for i, scene in enumerate(scenes)
+    ]
+
+    missing = [i for i, fp in enumerate(fingerprints) if not os.path.exists(_cache_path(fp))]
+    print(f"   [Scene Cache] ♻️ {len(scenes) - len(missing)}/{len(scenes)} scenes cached, rendering {len(missing)}")
+
+    # A scene that appears twice in one job (same fingerprint) is only rendered once
+    unique_missing = list({fingerprints[i]: i for i in missing}.values())
+    if unique_missing:
+        workers = max(1, min(SCENE_WORKERS, len(unique_missing)))
+        concurrency = max(1, (os.cpu_count() or 2) // workers)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            list(pool.map(
+                lambda i: _render_into_cache(render_scene, i, ranges[i], fingerprints[i], concurrency, job_id),
+                unique_missing,
+            ))
+
+    segment_paths = [_cache_path(fp) for fp in fingerprints]
+    for path in segment_paths:
+        os.utime(path)  # Last-used time drives garbage collection
+
+    if metrics:
+        metrics.enter_stage('stitch')
+    work_dir = os.path.join(WORK_DIR, f"job_{job_id}")
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        silent_path = os.path.join(work_dir, "stitched_silent.mp4")
+        ffmpeg_tools.concat_copy(segment_paths, silent_path)
+
+        def staged(url):
+            path = os.path.join(public_dir, url) if url else None
+            return path if path and os.path.exists(path) else None
+
+        ffmpeg_tools.mux_audio(silent_path, staged(script_data.get('audioUrl')), staged(script_data.get('bgmUrl')), output_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {"hits": len(scenes) - len(missing), "misses": len(missing)}
+
+def collect_garbage(retention_days: int = DEFAULT_RETENTION_DAYS, dry_run: bool = False) -> Dict[str, int]:
+    """Delete cached scene segments that no render has used for `retention_days`."""
+    removed, freed = 0, 0
+    cutoff = time.time() - retention_days * 86400
+    if not os.path.isdir(SCENE_CACHE_DIR):
+        return {"removed": 0, "freed_bytes": 0}
+    for dirpath, _, names in os.walk(SCENE_CACHE_DIR):
+        for name in names:
+            path = os.path.join(dirpath, name)
+            if os.path.getmtime(path) < cutoff:
+                freed += os.path.getsize(path)
+                removed += 1
+                if not dry_run:
+                    os.remove(path)
+    print(f"🧹 [Scene Cache] {'Would remove' if dry_run else 'Removed'} {removed} segments ({freed / 1024 / 1024:.1f} MB)")
+    return {"removed": removed, "freed_bytes": freed}
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "gc":
+        days = DEFAULT_RETENTION_DAYS
+        if "--retention-days" in sys.argv:
+            days = int(sys.argv[sys.argv.index("--retention-days") + 1])
+        collect_garbage(days, dry_run="--dry-run" in sys.argv)
+    else:
+        print("Usage: python scene_cache.py gc [--retention-days N] [--dry-run]")
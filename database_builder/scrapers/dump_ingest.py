@@ -0,0 +1,320 @@
+"""
+Offline bulk event extraction from a downloaded Wikipedia or Wikidata dump.
+
+  Wikipedia  pages-articles*.xml[.bz2]: streamed with ElementTree.iterparse (each page is
+             cleared once read, so memory stays flat over a 20 GB dump). "Month Day" pages
+             contribute their == Events == lines, "Timeline of ..." articles every bullet that
+             starts with a day and month; the year comes from the line or its section heading.
+  Wikidata   latest-all.json[.bz2|.gz] (one entity per line): items with a day-precision
+             point in time (P585), inception (P571) or publication date (P577), an English label,
+             an enwiki article and an instance-of (P31) class in WIKIDATA_CLASSES. Without those
+             filters every dated paper, book and registered company in Wikidata would be an event.
+
+The parent process only decompresses and picks candidate pages; wikitext cleaning and date
+extraction run on a process pool, a bounded number of chunks in flight. Events go straight to
+storage.insert_events_bulk, so no LLM or API call is involved.
+
+    python dump_ingest.py <dump> --channel <slug> [--workers N] [--limit PAGES] [--dry-run]
+"""
+import os
+import re
+import sys
+import bz2
+import gzip
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import xml.etree.ElementTree as ET
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(SCRIPT_DIR, "..", "db"))
+import storage
+
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+CHUNK_PAGES = 200        # pages per pool task
+CHUNKS_IN_FLIGHT = 4     # per worker; bounds memory no matter how fast the dump decompresses
+DUMP_IMPORTANCE = 3      # no LLM scoring here: dump events start as routine candidates
+MIN_EVENT_CHARS = 20
+
+MONTHS = ["January", "February", "March", "April", "May", "June", "July",
+          "August", "September", "October", "November", "December"]
+MONTH_NUM = {m.lower(): i + 1 for i, m in enumerate(MONTHS)}
+MONTH_NUM.update({m[:3].lower(): i + 1 for i, m in enumerate(MONTHS)})
+MONTH_ALT = "|".join(sorted(MONTH_NUM, key=len, reverse=True))
+
+DAY_PAGE_RE = re.compile(rf'^({"|".join(MONTHS)}) ([1-9]|[12]\d|3[01])$')
+TIMELINE_PAGE_RE = re.compile(r'^(Timeline|Chronology) of ')
+HEADING_RE = re.compile(r'^(=+)\s*(.*?)\s*\1\s*$')
+YEAR_RE = re.compile(r'^(?:AD\s*)?(\d{1,4})(?:\s*(BC|BCE))?$')
+HEADING_YEAR_RE = re.compile(r'\b(\d{3,4})s?\b')
+# Bullets of a timeline line: "* March 6, 1998 – ...", "* 6 March 1998: ...", "* March 6 – ..."
+MONTH_DAY_RE = re.compile(rf'^({MONTH_ALT})\.?\s+(\d{{1,2}})(?:,?\s+(\d{{3,4}}))?\s*[–—:\-,]?\s*(.*)$', re.IGNORECASE)
+DAY_MONTH_RE = re.compile(rf'^(\d{{1,2}})\s+({MONTH_ALT})\.?(?:,?\s+(\d{{3,4}}))?\s*[–—:\-,]?\s*(.*)$', re.IGNORECASE)
+# Bullets of a "Month Day" page: "* [[1998]] – ...", "* 44 BC – ..."
+DAY_PAGE_LINE_RE = re.compile(r'^(AD\s*)?(\d{1,4})(\s*(?:BC|BCE))?\s*[–—:\-]\s*(.+)$')
+
+REF_RE = re.compile(r'<ref[^>/]*/>|<ref[^>]*>.*?</ref>', re.DOTALL | re.IGNORECASE)
+COMMENT_RE = re.compile(r'<!--.*?-->', re.DOTALL)
+TEMPLATE_RE = re.compile(r'\{\{[^{}]*\}\}')
+FILE_LINK_RE = re.compile(r'\[\[(?:File|Image):[^\[\]]*(?:\[\[[^\[\]]*\]\][^\[\]]*)*\]\]', re.IGNORECASE)
+LINK_RE = re.compile(r'\[\[(?:[^|\[\]]*\|)?([^\[\]]*)\]\]')
+EXT_LINK_RE = re.compile(r'\[https?://\S+\s*([^\]]*)\]')
+TAG_RE = re.compile(r'<[^>]+>')
+
+WIKIDATA_DATE_PROPS = {"P585": "Event", "P571": "Founded", "P577": "Release"}
+WIKIDATA_DAY_PRECISION = 11
+# Direct P31 classes an item must have (the dump has no subclass closure); WIKIDATA_CLASSES=Q1,Q2 overrides
+WIKIDATA_CLASSES = set(filter(None, os.environ.get("WIKIDATA_CLASSES", ",".join([
+    "Q1190554", "Q1656682", "Q178561", "Q3839081", "Q131569", "Q40231",  # occurrence, event, battle, disaster, treaty, election
+    "Q7397", "Q341", "Q9135", "Q9143", "Q7889", "Q35127",  # software, free software, OS, programming language, video game, website
+    "Q68", "Q5300", "Q783794", "Q891723", "Q4830453",  # computer, CPU, company, public company, business
+])).split(",")))
+
+def open_dump(path: str):
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")
+
+def strip_wikitext(text: str) -> str:
+    text = COMMENT_RE.sub("", REF_RE.sub("", text))
+    previous = None
+    while previous != text:  # nested templates, innermost first
+        previous, text = text, TEMPLATE_RE.sub("", text)
+    text = FILE_LINK_RE.sub("", text)
+    text = LINK_RE.sub(r"\1", text)
+    text = EXT_LINK_RE.sub(r"\1", text)
+    text = TAG_RE.sub("", text).replace("'''", "").replace("''", "").replace("&nbsp;", " ")
+    return " ".join(text.split())
+
+def _year(text: str) -> Optional[int]:
+    match = YEAR_RE.match(text.strip())
+    if not match:
+        return None
+    year = int(match.group(1))
+    return -year if match.group(2) else year
+
+def _event(month: int, day: int, year: int, text: str, category: str) -> Optional[Dict[str, Any]]:
+    text = text.strip(" –—:-")
+    if not (1 <= month <= 12 and 1 <= day <= 31) or len(text) < MIN_EVENT_CHARS:
+        return None
+    title = text.split(". ")[0]
+    return {"month": month, "day": day, "year": year, "title": title[:100], "summary": text,
+            "category": category, "importance_score": DUMP_IMPORTANCE}
+
+def extract_day_page(title: str, wikitext: str) -> List[Dict[str, Any]]:
+    """'March 6' page -> its == Events == bullets (nested bullets inherit the parent's year)."""
+    month_name, day = DAY_PAGE_RE.match(title).groups()
+    month = MONTH_NUM[month_name.lower()]
+    events, in_events, parent_year = [], False, None
+    for raw in wikitext.splitlines():
+        heading = HEADING_RE.match(raw.strip())
+        if heading:
+            level = len(heading.group(1))
+            if level == 2:
+                in_events = heading.group(2).strip().lower() == "events"
+            continue
+        if not in_events or not raw.startswith("*"):
+            continue
+        depth = len(raw) - len(raw.lstrip("*"))
+        line = strip_wikitext(raw.lstrip("*"))
+        match = DAY_PAGE_LINE_RE.match(line)
+        if match:
+            year = int(match.group(2)) * (-1 if match.group(3) else 1)
+            parent_year = year if depth == 1 else parent_year
+            event = _event(month, int(day), year, match.group(4), "Event")
+        elif depth > 1 and parent_year is not None:
+            event = _event(month, int(day), parent_year, line, "Event")
+        else:
+            parent_year = _year(line.rstrip(":")) if depth == 1 else parent_year
+            continue
+        if event:
+            events.append(event)
+    return events
+
+def extract_timeline(title: str, wikitext: str) -> List[Dict[str, Any]]:
+    """'Timeline of ...' article -> bullets that start with a day and month; year from the line or the nearest heading."""
+    category = title.split(" of ", 1)[1][:40]
+    events, heading_year = [], None
+    for raw in wikitext.splitlines():
+        heading = HEADING_RE.match(raw.strip())
+        if heading:
+            found = HEADING_YEAR_RE.search(strip_wikitext(heading.group(2)))
+            heading_year = int(found.group(1)) if found and not found.group(0).endswith("s") else None
+            continue
+        if not raw.startswith("*"):
+            continue
+        line = strip_wikitext(raw.lstrip("*"))
+        match = MONTH_DAY_RE.match(line)
+        if match:
+            month, day, year, text = MONTH_NUM[match.group(1).lower()], int(match.group(2)), match.group(3), match.group(4)
+        else:
+            match = DAY_MONTH_RE.match(line)
+            if not match:
+                continue
+            day, month, year, text = int(match.group(1)), MONTH_NUM[match.group(2).lower()], match.group(3), match.group(4)
+        year = int(year) if year else heading_year
+        if year is not None:
+            event = _event(month, day, year, text, category)
+            if event:
+                events.append(event)
+    return events
+
+def extract_pages(pages: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    """Pool task: a chunk of (title, wikitext) -> events."""
+    events = []
+    for title, wikitext in pages:
+        if DAY_PAGE_RE.match(title):
+            events.extend(extract_day_page(title, wikitext))
+        else:
+            events.extend(extract_timeline(title, wikitext))
+    return events
+
+def extract_entities(lines: List[bytes]) -> List[Dict[str, Any]]:
+    """Pool task: a chunk of Wikidata JSON lines -> events."""
+    events = []
+    for raw in lines:
+        raw = raw.strip().rstrip(b",")
+        if not raw.startswith(b"{"):
+            continue
+        entity = json.loads(raw)
+        label = entity.get("labels", {}).get("en", {}).get("value")
+        if not label or "enwiki" not in entity.get("sitelinks", {}):
+            continue
+        classes = {claim.get("mainsnak", {}).get("datavalue", {}).get("value", {}).get("id")
+                   for claim in entity.get("claims", {}).get("P31", [])}
+        if not classes & WIKIDATA_CLASSES:
+            continue
+        description = entity.get("descriptions", {}).get("en", {}).get("value", "")
+        for prop, category in WIKIDATA_DATE_PROPS.items():
+            for claim in entity.get("claims", {}).get(prop, []):
+                value = claim.get("mainsnak", {}).get("datavalue", {}).get("value", {})
+                if value.get("precision") != WIKIDATA_DAY_PRECISION:
+                    continue
+                match = re.match(r'^([+-])(\d+)-(\d\d)-(\d\d)', value.get("time", ""))
+                if not match:
+                    continue
+                year = int(match.group(2)) * (-1 if match.group(1) == "-" else 1)
+                summary = f"{label}: {description}" if description else label
+                events.append({"month": int(match.group(3)), "day": int(match.group(4)), "year": year,
+                               "title": label[:100], "summary": summary, "category": category,
+                               "importance_score": DUMP_IMPORTANCE})
+                break
+    return events
+
+def iter_xml_pages(path: str, stats: Dict[str, int]) -> Iterator[Tuple[str, str]]:
+    """Stream (title, wikitext) of candidate main-namespace pages, clearing every page after reading it."""
+    with open_dump(path) as f:
+        context = ET.iterparse(f, events=("start", "end"))
+        _, root = next(context)
+        title = ns = text = None
+        redirect = False
+        for event, elem in context:
+            if event != "end":
+                continue
+            tag = elem.tag.rsplit("}", 1)[-1]
+            if tag == "title":
+                title = elem.text or ""
+            elif tag == "ns":
+                ns = elem.text
+            elif tag == "redirect":
+                redirect = True
+            elif tag == "text":
+                text = elem.text or ""
+            elif tag == "page":
+                stats["pages"] += 1
+                if ns == "0" and not redirect and (DAY_PAGE_RE.match(title) or TIMELINE_PAGE_RE.match(title)):
+                    stats["candidates"] += 1
+                    yield title, text
+                title = ns = text = None
+                redirect = False
+                root.clear()
+
+def iter_chunks(path: str, stats: Dict[str, int], limit: Optional[int] = None):
+    """(pool task, chunk) pairs for either dump format."""
+    if path.endswith((".json", ".jsonl", ".json.bz2", ".jsonl.bz2", ".json.gz", ".jsonl.gz")):
+        task, items = extract_entities, _iter_lines(path, stats)
+    else:
+        task, items = extract_pages, iter_xml_pages(path, stats)
+    chunk = []
+    for n, item in enumerate(items):
+        if limit and n >= limit:
+            break
+        chunk.append(item)
+        if len(chunk) >= CHUNK_PAGES:
+            yield task, chunk
+            chunk = []
+    if chunk:
+        yield task, chunk
+
+def _iter_lines(path: str, stats: Dict[str, int]) -> Iterator[bytes]:
+    with open_dump(path) as f:
+        for line in f:
+            stats["pages"] += 1
+            stats["candidates"] += 1
+            yield line
+
+def extract_events(path: str, workers: int = INGEST_WORKERS, limit: Optional[int] = None,
+                   stats: Optional[Dict[str, int]] = None) -> Iterator[Dict[str, Any]]:
+    """Stream events out of a dump; at most workers * CHUNKS_IN_FLIGHT chunks are queued at once."""
+    stats = stats if stats is not None else {}
+    stats.update({"pages": 0, "candidates": 0, "events": 0})
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for task, chunk in iter_chunks(path, stats, limit):
+            pending.add(pool.submit(task, chunk))
+            if len(pending) >= workers * CHUNKS_IN_FLIGHT:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    events = future.result()
+                    stats["events"] += len(events)
+                    yield from events
+        for future in pending:
+            events = future.result()
+            stats["events"] += len(events)
+            yield from events
+
+def channel_id_for(slug: str) -> int:
+    conn = storage.get_db_connection()
+    row = conn.execute('SELECT id FROM channels WHERE slug = ?', (slug,)).fetchone()
+    conn.close()
+    if not row:
+        raise ValueError(f"Unknown channel '{slug}'")
+    return row["id"]
+
+def ingest(path: str, channel: str, workers: int = INGEST_WORKERS,
+           limit: Optional[int] = None, dry_run: bool = False) -> Dict[str, int]:
+    t_start = time.perf_counter()
+    source = "wikidata_dump" if ".json" in os.path.basename(path) else "wikipedia_dump"
+    print(f"📦 Ingesting {path} ({source}, {workers} workers) -> channel {channel}")
+    stats: Dict[str, int] = {}
+    events = extract_events(path, workers, limit, stats)
+    if dry_run:
+        for n, event in enumerate(events):
+            if n < 20:
+                print(f"  {event['year']}-{event['month']:02d}-{event['day']:02d} [{event['category']}] {event['title'][:70]}")
+        inserted = duplicates = 0
+    else:
+        storage.init_db()
+        inserted, duplicates = storage.insert_events_bulk(events, source=source, channel_id=channel_id_for(channel))
+    elapsed = time.perf_counter() - t_start
+    stats.update({"inserted": inserted, "duplicates": duplicates})
+    print(f"✅ {stats['pages']} pages read, {stats['candidates']} candidates, {stats['events']} events "
+          f"({inserted} new, {duplicates} duplicates) in {elapsed:.1f}s")
+    return stats
+
+def _arg(name: str) -> Optional[str]:
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv[:-1] else None
+
+if __name__ == "__main__":
+    # No default channel: a dump holds every kind of history, the operator says where it goes
+    if len(sys.argv) < 2 or sys.argv[1].startswith("--") or not _arg("--channel"):
+        print("Usage: python dump_ingest.py <dump.xml[.bz2] | dump.json[l][.bz2|.gz]> "
+              "--channel <slug> [--workers N] [--limit PAGES] [--dry-run]")
+        sys.exit(1)
+    ingest(sys.argv[1], channel=_arg("--channel"),
+           workers=int(_arg("--workers") or INGEST_WORKERS),
+           limit=int(_arg("--limit")) if _arg("--limit") else None,
+           dry_run="--dry-run" in sys.argv)
@@ -0,0 +1,216 @@
+"""
+HTML -> content blocks for the Wikipedia scraper, behind interchangeable parser backends.
+
+A block is the stripped text of every p/li/h2/h3 element in document order (nested ones
+included, script/style/template content left out), kept when longer than 15 characters.
+Every backend produces exactly the same blocks for the balanced HTML the parse API returns
+(on tag soup like an unclosed <li>, html.parser does not apply the HTML5 implicit-close rules
+that lxml and lexbor do):
+
+  bs4         BeautifulSoup + html.parser, pure Python (the original implementation)
+  lxml        libxml2 via lxml.html, text collected with one tree walk per block
+  selectolax  lexbor (HTML5 parser) via selectolax, the fastest when installed
+
+The default is the fastest backend installed (WIKI_HTML_BACKEND overrides it).
+
+    python html_extract.py --bench <dir> [--repeat 3]
+        parse every saved page in <dir> (wikipedia_scraper.py --record responses or .html
+        files) with each installed backend, in a fresh process each, and report pages/s,
+        MB/s, peak RSS growth and whether the blocks match bs4's
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import subprocess
+from typing import Callable, Dict, List, Optional
+
+BLOCK_TAGS = ("p", "li", "h2", "h3")
+SKIP_TAGS = {"script", "style", "template"}  # bs4's get_text() leaves their strings out
+MIN_BLOCK_CHARS = 15
+PREFERENCE = ("selectolax", "lxml", "bs4")
+
+def _keep(text: str) -> bool:
+    # Filter out very short strings to reduce token usage
+    return len(text) > MIN_BLOCK_CHARS
+
+def blocks_bs4(raw_html: str) -> List[str]:
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(raw_html, "html.parser")
+    blocks = []
+    for element in soup.find_all(list(BLOCK_TAGS)):
+        text = element.get_text().strip()
+        if _keep(text):
+            blocks.append(text)
+    return blocks
+
+def _lxml_text(element, parts: List[str]):
+    # Comments and processing instructions have a non-string tag; their tail still counts
+    if isinstance(element.tag, str) and element.tag not in SKIP_TAGS:
+        if element.text:
+            parts.append(element.text)
+        for child in element:
+            _lxml_text(child, parts)
+            if child.tail:
+                parts.append(child.tail)
+
+def blocks_lxml(raw_html: str) -> List[str]:
+    import lxml.html
+    if not raw_html.strip():
+        return []
+    root = lxml.html.fromstring(raw_html)
+    # A <p> inside a <template> is still found by find_all, but its text is empty there
+    for element in list(root.iter(*SKIP_TAGS)):
+        if element is not root:
+            element.drop_tree()
+    blocks = []
+    for element in root.iter(*BLOCK_TAGS):
+        parts: List[str] = []
+        _lxml_text(element, parts)
+        text = "".join(parts).strip()
+        if _keep(text):
+            blocks.append(text)
+    return blocks
+
+def blocks_selectolax(raw_html: str) -> List[str]:
+    from selectolax.lexbor import LexborHTMLParser
+    tree = LexborHTMLParser(raw_html)
+    if tree.root is None:
+        return []
+    tree.strip_tags(list(SKIP_TAGS))
+    blocks = []
+    # traverse() walks in document order, like find_all (a css() selector list need not)
+    for node in tree.root.traverse():
+        if node.tag in BLOCK_TAGS:
+            text = node.text(deep=True, separator="", strip=False).strip()
+            if _keep(text):
+                blocks.append(text)
+    return blocks
+
+BACKENDS: Dict[str, Callable[[str], List[str]]] = {
+    "bs4": blocks_bs4,
+    "lxml": blocks_lxml,
+    "selectolax": blocks_selectolax,
+}
+_MODULES = {"bs4": "bs4", "lxml": "lxml.html", "selectolax": "selectolax.lexbor"}
+
+def available_backends() -> List[str]:
+    names = []
+    for name in PREFERENCE:
+        try:
+            __import__(_MODULES[name])
+            names.append(name)
+        except ImportError:
+            pass
+    return names
+
+def default_backend() -> str:
+    requested = os.environ.get("WIKI_HTML_BACKEND")
+    if requested:
+        if requested not in BACKENDS:
+            raise ValueError(f"Unknown HTML backend '{requested}' (choose from {', '.join(BACKENDS)})")
+        return requested
+    available = available_backends()
+    if not available:
+        raise ImportError("No HTML parser installed: pip install selectolax, lxml or beautifulsoup4")
+    return available[0]
+
+def extract_blocks(raw_html: str, backend: Optional[str] = None) -> List[str]:
+    return BACKENDS[backend or default_backend()](raw_html)
+
+def extract_text(raw_html: str, backend: Optional[str] = None) -> str:
+    return "\n".join(extract_blocks(raw_html, backend))
+
+# ----------------- BENCHMARK -----------------
+
+def load_fixture_pages(fixture_dir: str) -> Dict[str, str]:
+    """{name: html} from recorded parse responses (*.json) and plain *.html files."""
+    pages = {}
+    for name in sorted(os.listdir(fixture_dir)):
+        path = os.path.join(fixture_dir, name)
+        if name.endswith(".html"):
+            with open(path, "r", encoding="utf-8") as f:
+                pages[name] = f.read()
+        elif name.endswith(".json"):
+            with open(path, "r", encoding="utf-8") as f:
+                response = json.load(f).get("response", {})
+            if "parse" in response:
+                text = response["parse"]["text"]
+                pages[name] = text["*"] if isinstance(text, dict) else text
+    return pages
+
+def _rss_mb() -> Optional[float]:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1024 / 1024
+    except ImportError:
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+    except ImportError:
+        return None
+
+def _digest(blocks: List[str]) -> str:
+    return hashlib.sha1("\x00".join(blocks).encode("utf-8")).hexdigest()
+
+def bench_one(backend: str, fixture_dir: str, repeat: int) -> Dict[str, object]:
+    """Runs in its own process so the RSS figure belongs to this backend alone."""
+    pages = load_fixture_pages(fixture_dir)
+    extract = BACKENDS[backend]
+    extract(next(iter(pages.values()), ""))  # import + warm up outside the timing
+    base_rss = _rss_mb()
+    peak_rss = base_rss
+    digests = {}
+    t_start = time.perf_counter()
+    for _ in range(repeat):
+        for name, html in pages.items():
+            digests[name] = _digest(extract(html))
+            rss = _rss_mb()
+            if rss is not None:
+                peak_rss = max(peak_rss, rss)
+    elapsed = time.perf_counter() - t_start
+    megabytes = sum(len(html.encode("utf-8")) for html in pages.values()) * repeat / 1024 / 1024
+    return {"backend": backend, "seconds": elapsed, "pages_per_sec": len(pages) * repeat / elapsed if elapsed else 0.0,
+            "mb_per_sec": megabytes / elapsed if elapsed else 0.0,
+            "rss_growth_mb": None if base_rss is None else peak_rss - base_rss, "digests": digests}
+
+def benchmark(fixture_dir: str, repeat: int = 3):
+    pages = load_fixture_pages(fixture_dir)
+    if not pages:
+        print(f"No saved pages in {fixture_dir} (record some with wikipedia_scraper.py --record {fixture_dir})")
+        return
+    backends = available_backends()
+    size_mb = sum(len(html.encode("utf-8")) for html in pages.values()) / 1024 / 1024
+    print(f"🏁 {len(pages)} pages ({size_mb:.1f} MB) x {repeat}, backends: {', '.join(backends)}\n")
+
+    results = []
+    for backend in backends:
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--bench-one", backend, fixture_dir, str(repeat)],
+                              capture_output=True, text=True, encoding="utf-8")
+        if proc.returncode != 0:
+            print(f"⚠️ {backend} failed: {proc.stderr.strip()[-300:]}")
+            continue
+        results.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    reference = next((r for r in results if r["backend"] == "bs4"), results[0] if results else None)
+    print(f"{'backend':<12}{'seconds':>9}{'pages/s':>10}{'MB/s':>8}{'RSS +MB':>9}  output")
+    for r in results:
+        mismatched = [n for n, d in r["digests"].items() if d != reference["digests"].get(n)]
+        rss = "n/a" if r["rss_growth_mb"] is None else f"{r['rss_growth_mb']:.1f}"
+        verdict = "reference" if r is reference else ("identical" if not mismatched else f"{len(mismatched)} pages differ")
+        print(f"{r['backend']:<12}{r['seconds']:>9.2f}{r['pages_per_sec']:>10.1f}{r['mb_per_sec']:>8.2f}{rss:>9}  {verdict}")
+        for name in mismatched[:3]:
+            ours, theirs = extract_blocks(pages[name], r["backend"]), extract_blocks(pages[name], reference["backend"])
+            first = next((i for i, (a, b) in enumerate(zip(ours, theirs)) if a != b), min(len(ours), len(theirs)))
+            print(f"    {name}: block {first}: {(ours[first:first + 1] or ['<none>'])[0][:60]!r} "
+                  f"vs {(theirs[first:first + 1] or ['<none>'])[0][:60]!r}")
+
+if __name__ == "__main__":
+    if len(sys.argv) > 4 and sys.argv[1] == "--bench-one":
+        print(json.dumps(bench_one(sys.argv[2], sys.argv[3], int(sys.argv[4]))))
+    elif len(sys.argv) > 2 and sys.argv[1] == "--bench":
+        benchmark(sys.argv[2], int(sys.argv[sys.argv.index("--repeat") + 1]) if "--repeat" in sys.argv[:-1] else 3)
+    else:
+        print("Usage: python html_extract.py --bench <fixture_dir> [--repeat 3]")
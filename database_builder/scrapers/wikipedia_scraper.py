@@ -1,88 +1,291 @@
-import requests
-from bs4 import BeautifulSoup
+"""
+Wikipedia timeline scraper.
+
+Pages are listed per channel in wikipedia_pages.json. One batched query (50 titles per
+request) asks for the latest revision id of every page; only pages whose revision changed
+since the last run are downloaded again, so a re-scrape with nothing new costs a single
+API call. Downloads run concurrently over one pooled session, with all requests spaced by a
+shared rate limit (WIKI_RATE per second) and 429/5xx/maxlag answers retried with backoff.
+
+The page HTML is reduced to text blocks by html_extract.py and stored in the raw corpus
+(db/corpus_store.py) as collection wikipedia_<channel>, one document per page with its
+revision id in the document meta; llm_processor reads it from there.
+
+    python wikipedia_scraper.py                         # it_history
+    python wikipedia_scraper.py --channel stock_replay  # or --all for every listed channel
+    python wikipedia_scraper.py --force                 # ignore stored revision ids
+    python wikipedia_scraper.py --record <dir>          # also save every API response to <dir>
+    python wikipedia_scraper.py --replay <dir>          # answer from saved responses, no network
+    python wikipedia_scraper.py --check-replay [<dir>]  # offline check against fixtures/wikipedia
+"""
+import os
+import sys
 import json
 import time
-import os
+import random
+import shutil
+import hashlib
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
 
 # Set up paths relative to the script location
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-RAW_DATA_DIR = os.path.join(SCRIPT_DIR, "..", "data", "raw")
-os.makedirs(RAW_DATA_DIR, exist_ok=True)
+sys.path.append(SCRIPT_DIR)
+sys.path.append(os.path.join(SCRIPT_DIR, "..", "db"))
+from html_extract import extract_text, default_backend
+from corpus_store import CorpusStore
 
+PAGES_FILE = os.path.join(SCRIPT_DIR, "wikipedia_pages.json")
+# Recorded API responses plus a manifest.json naming the channel and pages they answer for
+FIXTURE_DIR = os.path.join(SCRIPT_DIR, "fixtures", "wikipedia")
+
+API_URL = "https://en.wikipedia.org/w/api.php"
 USER_AGENT = "IT_History_Bot/1.0 (test@example.com)"
+WIKI_CONCURRENCY = int(os.environ.get("WIKI_CONCURRENCY", "4"))
+WIKI_RATE = float(os.environ.get("WIKI_RATE", "5"))  # requests per second, all threads together
+MAXLAG = 5  # let the API turn us away while its replicas lag (answered as a retryable error)
+MAX_RETRIES = 4
+BACKOFF_BASE = 2.0
+TIMEOUT = (5, 60)
+TITLES_PER_QUERY = 50  # API limit for titles= on a non-bot account
+DEFAULT_CHANNEL = "it_history"
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class WikiError(Exception):
+    pass
+
+class RateLimiter:
+    """At most `rate` calls per second across all threads: every caller gets the next free slot."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+def fixture_name(params: Dict[str, Any]) -> str:
+    """Recorded responses are stored under the hash of their request parameters."""
+    canonical = json.dumps(params, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()[:16] + ".json"
+
+class WikiClient:
+    """
+    MediaWiki API client: pooled keep-alive session, shared rate limit, retries.
+    With `replay_dir` every answer comes from responses saved earlier with `record_dir`.
+    """
+
+    def __init__(self, concurrency: int = WIKI_CONCURRENCY, rate: float = WIKI_RATE,
+                 record_dir: Optional[str] = None, replay_dir: Optional[str] = None):
+        self.concurrency = max(1, concurrency)
+        self.limiter = RateLimiter(rate)
+        self.record_dir = record_dir
+        self.replay_dir = replay_dir
+        self.session = None
+        if not replay_dir:
+            self.session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+            self.session.mount("https://", adapter)
+            self.session.headers.update({"User-Agent": USER_AGENT})
+        if record_dir:
+            os.makedirs(record_dir, exist_ok=True)
+        self.stats = {"requests": 0, "retries": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def get(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        params = {"format": "json", "formatversion": 2, **params}
+        if self.replay_dir:
+            path = os.path.join(self.replay_dir, fixture_name(params))
+            if not os.path.exists(path):
+                raise WikiError(f"No recorded response for {params}")
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)["response"]
+
+        last_error = None
+        for attempt in range(MAX_RETRIES + 1):
+            if attempt:
+                self._count("retries")
+            self.limiter.wait()
+            self._count("requests")
+            try:
+                resp = self.session.get(API_URL, params={**params, "maxlag": MAXLAG}, timeout=TIMEOUT)
+            except requests.RequestException as e:
+                last_error = f"{type(e).__name__}: {e}"
+                time.sleep(BACKOFF_BASE * (2 ** attempt) * (0.5 + random.random() / 2))
+                continue
+            if resp.status_code == 200:
+                try:
+                    data = resp.json()
+                except ValueError:
+                    # A 200 carrying an HTML error page from a proxy / overloaded app server
+                    last_error = "non-JSON response"
+                    time.sleep(BACKOFF_BASE * (2 ** attempt))
+                    continue
+                code = data.get("error", {}).get("code")
+                if code != "maxlag":
+                    if code:
+                        raise WikiError(f"{code}: {data['error'].get('info', '')}")
+                    if self.record_dir:
+                        path = os.path.join(self.record_dir, fixture_name(params))
+                        with open(path, "w", encoding="utf-8") as f:
+                            json.dump({"params": params, "response": data}, f, ensure_ascii=False)
+                    return data
+                last_error = "maxlag"
+            else:
+                last_error = f"HTTP {resp.status_code}"
+                if resp.status_code not in RETRY_STATUSES:
+                    break
+            retry_after = resp.headers.get("Retry-After", "")
+            time.sleep(float(retry_after) if retry_after.isdigit() else BACKOFF_BASE * (2 ** attempt))
+        raise WikiError(last_error)
+
+    def latest_revisions(self, titles: List[str]) -> Dict[str, Optional[int]]:
+        """{title as requested: latest revision id, None if the page does not exist} - one request per 50 titles."""
+        revisions: Dict[str, Optional[int]] = {}
+        for start in range(0, len(titles), TITLES_PER_QUERY):
+            batch = titles[start:start + TITLES_PER_QUERY]
+            query = self.get({"action": "query", "prop": "revisions", "rvprop": "ids",
+                              "titles": "|".join(batch), "redirects": 1})["query"]
+            # The API answers under normalized / redirect-target titles; map them back
+            renamed = {}
+            for item in query.get("normalized", []) + query.get("redirects", []):
+                renamed[item["from"]] = item["to"]
+            by_title = {page["title"]: page for page in query.get("pages", [])}
+            for title in batch:
+                resolved = title
+                while resolved in renamed:
+                    resolved = renamed[resolved]
+                page = by_title.get(resolved, {})
+                revisions[title] = None if page.get("missing") or not page.get("revisions") else page["revisions"][0]["revid"]
+        return revisions
+
+    def fetch_html(self, revid: int) -> str:
+        """Rendered HTML of exactly that revision (so the text always matches the stored revid)."""
+        return self.get({"action": "parse", "oldid": revid, "prop": "text"})["parse"]["text"]
+
+    def close(self):
+        if self.session:
+            self.session.close()
+
+def collection_name(channel: str) -> str:
+    return f"wikipedia_{channel}"
+
+def load_page_lists() -> Dict[str, List[str]]:
+    with open(PAGES_FILE, "r", encoding="utf-8") as f:
+        return {k: v for k, v in json.load(f).items() if not k.startswith("_")}
+
+def scrape_channel(client: WikiClient, store: CorpusStore, channel: str, pages: List[str],
+                   force: bool = False) -> Dict[str, int]:
+    """Refresh one channel's corpus collection: download pages whose revision changed, keep the rest."""
+    t_start = time.perf_counter()
+    collection = collection_name(channel)
+    known = store.index(collection)
+
+    print(f"📚 [{channel}] Checking {len(pages)} pages for new revisions (HTML backend: {default_backend()})...")
+    revisions = client.latest_revisions(pages)
+    todo = [p for p in pages if revisions[p] and (force or known.get(p, {}).get("meta", {}).get("revid") != revisions[p])]
+    missing = [p for p in pages if not revisions[p]]
+    for page in missing:
+        print(f"⚠️ {page}: no such page")
+
+    fetched, failed = 0, 0
+    with ThreadPoolExecutor(max_workers=client.concurrency) as pool:
+        futures = {pool.submit(client.fetch_html, revisions[page]): page for page in todo}
+        for future in as_completed(futures):
+            page = futures[future]
+            try:
+                raw_text = extract_text(future.result())
+            except Exception as e:
+                failed += 1
+                print(f"Exception while fetching {page}: {e}")
+                continue
+            # A new revision may only touch markup; then the text (and its sha1) stays as it was
+            changed = store.put(collection, page, raw_text, source="wikipedia", meta={"revid": revisions[page]})
+            fetched += 1
+            print(f"-> {page} (rev {revisions[page]}): {len(raw_text)} characters{'' if changed else ', text unchanged'}.")
+
+    stats = {"pages": len(pages) - len(missing), "unchanged": len(pages) - len(todo) - len(missing),
+             "fetched": fetched, "failed": failed, "missing": len(missing)}
+    print(f"✅ [{channel}] {stats['fetched']} fetched, {stats['unchanged']} unchanged, "
+          f"{stats['failed']} failed in {time.perf_counter() - t_start:.1f}s -> corpus/{collection}")
+    return stats
+
+def check_replay(fixture_dir: str = FIXTURE_DIR) -> bool:
+    """
+    Scrape the fixture pages three times from recorded responses into a throwaway corpus:
+    the first run fetches every existing page, the second (nothing changed) fetches none, and
+    after one stored revid is made stale the third fetches exactly that page.
+    """
+    with open(os.path.join(fixture_dir, "manifest.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    channel, pages = manifest["channel"], manifest["pages"]
+    corpus_dir = tempfile.mkdtemp(prefix="wiki_replay_")
+    client = WikiClient(replay_dir=fixture_dir)
+    failures = []
+
+    def expect(label, stats, **wanted):
+        got = {k: stats[k] for k in wanted}
+        if got != wanted:
+            failures.append(f"{label}: expected {wanted}, got {got}")
 
-def get_wikipedia_timeline(page_title):
-    print(f"Fetching {page_title}...")
-    url = f"https://en.wikipedia.org/w/api.php"
-    params = {
-        "action": "parse",
-        "page": page_title,
-        "format": "json",
-        "prop": "text"
-    }
-    headers = {"User-Agent": USER_AGENT}
-    
     try:
-        response = requests.get(url, params=params, headers=headers)
-        if response.status_code != 200:
-            print(f"Failed to fetch {page_title}: HTTP {response.status_code}")
-            return None
-            
-        data = response.json()
-        if "parse" not in data:
-            print(f"Error parsing {page_title}: {data}")
-            return None
-            
-        raw_html = data["parse"]["text"]["*"]
-        soup = BeautifulSoup(raw_html, "html.parser")
-        
-        # We don't want to over-clean because the LLM is smart.
-        # But we do want to strip navigation menus, styling, and javascript.
-        # Let's extracttext from paragraphs and lists, which contain the timeline facts.
-        content_blocks = []
-        for element in soup.find_all(['p', 'li', 'h2', 'h3']):
-            text = element.get_text().strip()
-            # Filter out very short strings to reduce token usage
-            if text and len(text) > 15: 
-                content_blocks.append(text)
-                
-        raw_text = "\n".join(content_blocks)
-        print(f"-> Successfully extracted {len(raw_text)} characters.")
-        return raw_text
-        
-    except Exception as e:
-        print(f"Exception while fetching {page_title}: {e}")
-        return None
+        store = CorpusStore(corpus_dir)
+        first = scrape_channel(client, store, channel, pages)
+        existing = first["pages"]
+        expect("first run", first, fetched=existing, failed=0)
+        expect("second run", scrape_channel(client, store, channel, pages), fetched=0, unchanged=existing, failed=0)
+
+        collection = collection_name(channel)
+        page, row = next(iter(store.index(collection).items()))
+        doc = store.get(collection, page)
+        store.put(collection, page, doc["text"], source="wikipedia", meta={"revid": row["meta"]["revid"] - 1})
+        expect("stale revid", scrape_channel(client, store, channel, pages), fetched=1, unchanged=existing - 1)
+    finally:
+        client.close()
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print(f"\n✅ Replay check passed: unchanged revisions cost 0 page fetches ({fixture_dir})")
+    return not failures
+
+def _arg(name: str) -> Optional[str]:
+    return sys.argv[sys.argv.index(name) + 1] if name in sys.argv[:-1] else None
 
 if __name__ == "__main__":
-    pages_to_scrape = [
-        "Timeline_of_computing",
-        "Timeline_of_computing_1950–1979",
-        "Timeline_of_computing_1980–1989",
-        "Timeline_of_computing_1990–1999",
-        "Timeline_of_computing_2000–2009",
-        "Timeline_of_computing_2010–2019",
-        "Timeline_of_computing_2020–present",
-        "Timeline_of_programming_languages",
-        "List_of_software_bugs",
-        "Timeline_of_artificial_intelligence"
-    ]
-
-    all_raw_data = {}
-
-    for page in pages_to_scrape:
-        raw_text = get_wikipedia_timeline(page)
-        if raw_text:
-            all_raw_data[page] = raw_text
-        # Respect Wikipedia's API rate limits
-        time.sleep(2) 
-
-    output_file = os.path.join(RAW_DATA_DIR, "wikipedia_timelines_raw.json")
-    with open(output_file, "w", encoding="utf-8") as f:
-        json.dump(all_raw_data, f, ensure_ascii=False, indent=2)
-
-    print(f"\n✅ Successfully scraped {len(all_raw_data)} pages.")
-    print(f"💾 Saved raw dataset to {output_file}")
-    
-    total_chars = sum(len(text) for text in all_raw_data.values())
-    print(f"📊 Total characters collected for LLM processing: {total_chars}")
+    if "--check-replay" in sys.argv:
+        sys.exit(0 if check_replay(_arg("--check-replay") or FIXTURE_DIR) else 1)
+
+    page_lists = load_page_lists()
+    channels = list(page_lists) if "--all" in sys.argv else [_arg("--channel") or DEFAULT_CHANNEL]
+    unknown = [c for c in channels if c not in page_lists]
+    if unknown:
+        print(f"No pages listed for {unknown} in {PAGES_FILE}")
+        sys.exit(1)
+
+    client = WikiClient(record_dir=_arg("--record"), replay_dir=_arg("--replay"))
+    store = CorpusStore()
+    try:
+        totals = [scrape_channel(client, store, c, page_lists[c], force="--force" in sys.argv) for c in channels]
+    finally:
+        client.close()
+
+    print(f"\n📊 {sum(t['pages'] for t in totals)} pages across {len(channels)} channel(s), "
+          f"{client.stats['requests']} API requests ({client.stats['retries']} retries)")
@@ -1,7 +1,8 @@
 import sqlite3
 import os
 import sys
-from flask import Flask, render_template, request, jsonify
+import json
+from flask import Flask, render_template, request, jsonify, send_file
 from google import genai
 from dotenv import load_dotenv
 
@@ -58,14 +59,15 @@ def create_channel():
     try:
         conn = get_db_connection()
         conn.execute('''
-            INSERT INTO channels (slug, display_name, system_prompt, review_prompt, tts_voice, css_filter, color_accent)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
+            INSERT INTO channels (slug, display_name, system_prompt, review_prompt, tts_voice, css_filter, color_accent, renderer)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             data['slug'], data['display_name'], data['system_prompt'],
             data.get('review_prompt', ''),
             data.get('tts_voice', 'zh-CN-YunxiNeural'),
             data.get('css_filter', 'sepia(0.3) contrast(1.1) brightness(0.9) grayscale(0.2)'),
             data.get('color_accent', '#00d4ff'),
+            data.get('renderer', 'remotion'),
         ))
         conn.commit()
         conn.close()
@@ -85,13 +87,14 @@ def update_channel(channel_id):
                 review_prompt = ?,
                 tts_voice = COALESCE(?, tts_voice),
                 css_filter = COALESCE(?, css_filter),
-                color_accent = COALESCE(?, color_accent)
+                color_accent = COALESCE(?, color_accent),
+                renderer = COALESCE(?, renderer)
             WHERE id = ?
         ''', (
             data.get('display_name'), data.get('system_prompt'),
             data.get('review_prompt', ''),
             data.get('tts_voice'), data.get('css_filter'),
-            data.get('color_accent'), channel_id
+            data.get('color_accent'), data.get('renderer'), channel_id
         ))
         conn.commit()
         conn.close()
@@ -137,12 +140,26 @@ def pipeline_view(job_id):
     ''', (job_id,)).fetchone()
     
     metrics = conn.execute('SELECT * FROM publish_metrics WHERE job_id = ?', (job_id,)).fetchall()
+    try:
+        exports = conn.execute(
+            'SELECT * FROM video_exports WHERE job_id = ? ORDER BY platform, width DESC', (job_id,)
+        ).fetchall()
+    except sqlite3.OperationalError:
+        exports = []  # migrate_v8.py not applied yet
+    try:
+        podcast = conn.execute(
+            'SELECT id, status, output_path, duration_sec, lines_total, lines_done, error_log FROM podcast_jobs '
+            'WHERE event_id = (SELECT event_id FROM video_jobs WHERE id = ?)', (job_id,)
+        ).fetchone()
+    except sqlite3.OperationalError:
+        podcast = None  # migrate_v9.py not applied yet
     conn.close()
     
     if not job:
         return "Job not found", 404
         
-    return render_template('pipeline.html', job=dict(job), metrics=[dict(m) for m in metrics])
+    return render_template('pipeline.html', job=dict(job), metrics=[dict(m) for m in metrics],
+                           exports=[dict(x) for x in exports], podcast=dict(podcast) if podcast else None)
 
 @app.route('/api/jobs/<int:job_id>/enrich', methods=['POST'])
 def enrich_node(job_id):
@@ -228,9 +245,51 @@ def generate_assets_node(job_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/jobs/<int:job_id>/preview', methods=['POST'])
+def render_preview_node(job_id):
+    from pipeline.node_preview import render_preview_for_job
+    try:
+        preview_path = render_preview_for_job(job_id, force=bool((request.json or {}).get('force')))
+        if preview_path:
+            return jsonify({"success": True, "message": "Preview rendered", "preview_path": preview_path})
+        else:
+            return jsonify({"error": "Preview rendering failed"}), 500
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/jobs/<int:job_id>/preview.mp4')
+def serve_preview(job_id):
+    conn = get_db_connection()
+    job = conn.execute('SELECT preview_path FROM video_jobs WHERE id = ?', (job_id,)).fetchone()
+    conn.close()
+    if not job or not job['preview_path']:
+        return "Preview not found", 404
+    path = os.path.join(SCRIPT_DIR, "..", "..", "video-generator", job['preview_path'])
+    if not os.path.exists(path):
+        return "Preview not found", 404
+    return send_file(os.path.abspath(path), mimetype='video/mp4')
+
+@app.route('/api/jobs/<int:job_id>/approve_preview', methods=['POST'])
+def approve_preview_node(job_id):
+    """Approval gate: sign off the current preview, then queue the full-quality render in the background."""
+    from pipeline.node_preview import approve_preview
+    from pipeline.node_render import queue_render
+    try:
+        if not approve_preview(job_id):
+            return jsonify({"error": "Preview is missing or out of date, render a new preview first"}), 400
+        if queue_render(job_id):
+            return jsonify({"success": True, "message": "Preview approved, final render queued"}), 202
+        else:
+            return jsonify({"success": True, "message": "Preview approved, final render already in progress"}), 202
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/jobs/<int:job_id>/render', methods=['POST'])
 def render_video_node(job_id):
     from pipeline.node_render import render_video_for_job
+    from pipeline.node_preview import REQUIRE_PREVIEW_APPROVAL, is_approved
+    if REQUIRE_PREVIEW_APPROVAL and not is_approved(job_id):
+        return jsonify({"error": "Final render requires an approved preview"}), 400
     try:
         success = render_video_for_job(job_id)
         if success:
@@ -240,15 +299,81 @@ def render_video_node(job_id):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/jobs/<int:job_id>/render_metrics')
+def get_render_metrics(job_id):
+    """Latest render attempts for a job (the first one may still be RUNNING, with live fps/ETA)."""
+    try:
+        conn = get_db_connection()
+        rows = conn.execute(
+            'SELECT * FROM render_metrics WHERE job_id = ? ORDER BY id DESC LIMIT 10', (job_id,)
+        ).fetchall()
+        conn.close()
+    except sqlite3.OperationalError:
+        return jsonify([])  # migrate_v6.py not applied yet
+
+    runs = []
+    for row in rows:
+        run = dict(row)
+        run['stages_ms'] = json.loads(run.pop('stages_json') or '{}')
+        run['extra'] = json.loads(run.pop('extra_json') or '{}')
+        runs.append(run)
+    return jsonify(runs)
+
+@app.route('/api/render_metrics/summary')
+def render_metrics_summary():
+    """Per-backend throughput over recent completed renders, for capacity planning and regression spotting."""
+    try:
+        conn = get_db_connection()
+        rows = conn.execute('''
+            SELECT backend, kind, COUNT(*) as renders,
+                   ROUND(AVG(fps), 2) as avg_fps,
+                   ROUND(AVG(total_ms) / 1000.0, 1) as avg_total_sec,
+                   ROUND(AVG(frames_total), 0) as avg_frames,
+                   ROUND(MAX(peak_rss_mb), 1) as max_peak_rss_mb
+            FROM (SELECT * FROM render_metrics WHERE status = 'COMPLETE' ORDER BY id DESC LIMIT 200)
+            GROUP BY backend, kind
+            ORDER BY renders DESC
+        ''').fetchall()
+        conn.close()
+    except sqlite3.OperationalError:
+        return jsonify([])
+    return jsonify([dict(r) for r in rows])
+
+def _awaiting_preview_approval(job_id):
+    """True when the pipeline stopped at the approval gate: assets done, preview rendered, not yet approved."""
+    from pipeline.node_preview import REQUIRE_PREVIEW_APPROVAL, is_approved
+    if not REQUIRE_PREVIEW_APPROVAL:
+        return False
+    conn = get_db_connection()
+    job = conn.execute('SELECT status, preview_path FROM video_jobs WHERE id = ?', (job_id,)).fetchone()
+    conn.close()
+    return bool(job and job['status'] == 'AUDIO_GEN' and job['preview_path'] and not is_approved(job_id))
+
 @app.route('/api/jobs/<int:job_id>/run_all', methods=['POST'])
 def run_all_nodes(job_id):
     from pipeline.automation_orchestrator import run_full_pipeline
+    # Finished stages are skipped; {"force": true} regenerates everything (the dashboard posts no body)
+    force = bool((request.get_json(silent=True) or {}).get('force'))
     try:
-        success = run_full_pipeline(job_id)
+        success = run_full_pipeline(job_id, force=force)
         if success:
             return jsonify({"success": True, "message": "全自动流水线执行完毕！视频已生成。"})
+        if _awaiting_preview_approval(job_id):
+            return jsonify({"success": True, "message": "预览已生成，审核通过后将自动排队正式渲染。"})
+        return jsonify({"error": "流水线执行失败，请检查报错日志"}), 500
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/jobs/<int:job_id>/export', methods=['POST'])
+def export_node(job_id):
+    from pipeline.node_export import export_job
+    platforms = (request.json or {}).get('platforms') or None
+    try:
+        success = export_job(job_id, platforms)
+        if success:
+            return jsonify({"success": True, "message": "Platform exports generated"})
         else:
-            return jsonify({"error": "流水线执行失败，请检查报错日志"}), 500
+            return jsonify({"error": "Export failed"}), 500
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -275,6 +400,101 @@ def add_publish_metric(job_id):
         conn.close()
     return jsonify({"success": True, "message": f"Published to {platform}"})
 
+@app.route('/api/podcast_jobs', methods=['GET'])
+def list_podcast_jobs():
+    try:
+        conn = get_db_connection()
+        rows = conn.execute('''
+            SELECT pj.id, pj.event_id, pj.video_job_id, pj.status, pj.output_path, pj.duration_sec,
+                   pj.lines_total, pj.lines_done, pj.error_log, pj.updated_at, e.title
+            FROM podcast_jobs pj
+            JOIN historical_events e ON pj.event_id = e.id
+            ORDER BY pj.updated_at DESC
+        ''').fetchall()
+        conn.close()
+    except sqlite3.OperationalError:
+        return jsonify([])
+    return jsonify([dict(r) for r in rows])
+
+@app.route('/api/create_podcast_job', methods=['POST'])
+def create_podcast_job():
+    data = request.json
+    event_id = data.get('event_id')
+
+    if not event_id:
+        return jsonify({"error": "No event_id provided"}), 400
+
+    try:
+        conn = get_db_connection()
+        event = conn.execute('SELECT channel_id FROM historical_events WHERE id = ?', (event_id,)).fetchone()
+        if not event:
+            return jsonify({"error": "Event not found"}), 404
+        video_job = conn.execute('SELECT id FROM video_jobs WHERE event_id = ?', (event_id,)).fetchone()
+        cursor = conn.execute(
+            "INSERT INTO podcast_jobs (event_id, channel_id, video_job_id, status) VALUES (?, ?, ?, 'PENDING')",
+            (event_id, event['channel_id'], video_job['id'] if video_job else None)
+        )
+        conn.commit()
+        podcast_job_id = cursor.lastrowid
+    except sqlite3.IntegrityError:
+        return jsonify({"error": "Podcast job already exists for this event"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        conn.close()
+
+    return jsonify({"success": True, "message": "Podcast job initialized", "podcast_job_id": podcast_job_id})
+
+@app.route('/api/podcast_jobs/<int:podcast_job_id>/<stage>', methods=['POST'])
+def run_podcast_stage(podcast_job_id, stage):
+    from pipeline.node_podcast import run_podcast_draft, run_podcast_tts, run_podcast_assembly
+    from pipeline.automation_orchestrator import run_podcast_pipeline
+    stages = {
+        'run_draft': (run_podcast_draft, "播客对白草稿已生成"),
+        'run_tts': (run_podcast_tts, "全部台词配音完成"),
+        'assemble': (run_podcast_assembly, "播客成品已混音导出"),
+        'run_all': (run_podcast_pipeline, "播客流水线执行完毕！节目已生成。"),
+    }
+    if stage not in stages:
+        return jsonify({"error": f"Unknown podcast stage: {stage}"}), 404
+    fn, message = stages[stage]
+    try:
+        if fn(podcast_job_id):
+            return jsonify({"success": True, "message": message})
+        else:
+            return jsonify({"error": "播客节点执行失败，请检查报错日志"}), 500
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/podcast_jobs/<int:podcast_job_id>/audio.mp3')
+def serve_podcast_audio(podcast_job_id):
+    conn = get_db_connection()
+    job = conn.execute('SELECT output_path FROM podcast_jobs WHERE id = ?', (podcast_job_id,)).fetchone()
+    conn.close()
+    if not job or not job['output_path']:
+        return "Episode not found", 404
+    path = os.path.join(SCRIPT_DIR, "..", "..", job['output_path'])
+    if not os.path.exists(path):
+        return "Episode not found", 404
+    return send_file(os.path.abspath(path), mimetype='audio/mpeg')
+
+@app.route('/api/batch_run', methods=['POST'])
+def batch_run():
+    """Queue a video (and, for podcast channels or with_podcast, an episode) per event and run them in parallel."""
+    from pipeline.automation_orchestrator import run_event_batch
+    data = request.json or {}
+    event_ids = data.get('event_ids') or []
+    if not event_ids:
+        return jsonify({"error": "No event_ids provided"}), 400
+    try:
+        results = run_event_batch([int(e) for e in event_ids], with_podcast=data.get('with_podcast'),
+                                  force=bool(data.get('force')))
+        failed = sum(not ok for jobs in results.values() for ok in jobs.values())
+        return jsonify({"success": not failed, "results": results,
+                        "message": f"批量执行完毕，{failed} 个任务失败" if failed else "批量执行完毕，全部成功"})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/events')
 def get_events():
     search = request.args.get('search', '').strip()
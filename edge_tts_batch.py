@@ -0,0 +1,194 @@
+"""
+In-process batched Edge-TTS.
+
+One event loop synthesizes many lines concurrently (bounded by EDGE_TTS_CONCURRENCY),
+with per-line voice / rate / pitch and a few retries, instead of spawning
+`python -m edge_tts` once per line. Shared by generate_audio.generate_audio (video
+narration) and the podcast_engine scripts.
+
+Texts go through text_segmenter first: inline SSML breaks/prosody are honoured, and long
+texts are cut at sentence punctuation into pieces that are synthesized concurrently (same
+limiter) and stitched back with short pauses.
+
+    python edge_tts_batch.py --bench 12              # in-process throughput at several concurrency levels
+    python edge_tts_batch.py --bench 12 --subprocess # plus the old one-subprocess-per-line baseline
+    python edge_tts_batch.py --bench-long <file.txt> # one long narration: single request vs segmented
+"""
+import os
+import sys
+import time
+import asyncio
+import weakref
+import tempfile
+import subprocess
+from typing import Any, Callable, Dict, List, Optional
+
+import edge_tts
+
+from text_segmenter import segment_text, edge_settings, SEGMENT_MAX_CHARS
+
+DEFAULT_VOICE = 'zh-CN-YunxiNeural'
+EDGE_TTS_CONCURRENCY = int(os.environ.get("EDGE_TTS_CONCURRENCY", "4"))
+EDGE_SAMPLE_RATE = 24000  # what Edge-TTS voices are delivered at
+MAX_RETRIES = 3
+BACKOFF_BASE = 1.0
+
+# One limiter per event loop, so every caller in the same loop shares the concurrency budget
+_SEMAPHORES: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+def _semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    semaphore = _SEMAPHORES.get(loop)
+    if semaphore is None:
+        semaphore = _SEMAPHORES[loop] = asyncio.Semaphore(EDGE_TTS_CONCURRENCY)
+    return semaphore
+
+async def synthesize_line(text: str, output_file: str, voice: str = DEFAULT_VOICE,
+                          rate: str = "+0%", pitch: str = "+0Hz", volume: str = "+0%") -> None:
+    """Synthesize one line to an MP3 file. Raises the last error if every retry fails."""
+    tmp_file = f"{output_file}.part"
+    last_error: Optional[Exception] = None
+    async with _semaphore():
+        for attempt in range(MAX_RETRIES + 1):
+            if attempt:
+                await asyncio.sleep(BACKOFF_BASE * (2 ** (attempt - 1)))
+            try:
+                communicate = edge_tts.Communicate(text, voice, rate=rate, pitch=pitch, volume=volume)
+                await communicate.save(tmp_file)
+                os.replace(tmp_file, output_file)
+                return
+            except Exception as e:  # websocket drops, throttling, NoAudioReceived
+                last_error = e
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+    raise last_error
+
+def _stitch_pieces(piece_files: List[str], pauses: List[float], output_file: str, lead_sec: float = 0.0,
+                   target_lufs: Optional[float] = None) -> None:
+    from audio_mixer import decode_audio, stitch, clip_event, mix_timeline
+    samples = stitch([decode_audio(path, EDGE_SAMPLE_RATE) for path in piece_files], pauses, EDGE_SAMPLE_RATE,
+                     lead_sec=lead_sec)
+    tmp_file = f"{output_file}.part.mp3"
+    mix_timeline([clip_event(samples, duck=False, label="stitched")], tmp_file, EDGE_SAMPLE_RATE,
+                 encoder_args=["-b:a", "96k"], target_lufs=target_lufs)
+    os.replace(tmp_file, output_file)
+
+async def synthesize_text(text: str, output_file: str, voice: str = DEFAULT_VOICE, rate: str = "+0%",
+                          pitch: str = "+0Hz", volume: str = "+0%", max_chars: int = SEGMENT_MAX_CHARS,
+                          target_lufs: Optional[float] = None) -> None:
+    """
+    Like synthesize_line, but for text of any length with inline SSML. A text that is one plain
+    piece is a single request; otherwise every piece is synthesized concurrently and stitched
+    (also a single piece after a leading <break>, to put the silence in front).
+    `target_lufs` levels stitched output in the same encode; a single piece is saved as Edge sent it.
+    """
+    pieces = segment_text(text, max_chars)
+    if not pieces:
+        raise ValueError(f"Nothing to synthesize in {text[:40]!r}")
+    lead_sec = pieces[0]["pause_before_sec"]
+    if len(pieces) == 1 and not lead_sec:
+        await synthesize_line(pieces[0]["text"], output_file, voice=voice,
+                              **edge_settings(pieces[0], rate, pitch, volume))
+        return
+
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(output_file))) as piece_dir:
+        piece_files = [os.path.join(piece_dir, f"{i:04d}.mp3") for i in range(len(pieces))]
+        results = await asyncio.gather(*(
+            synthesize_line(piece["text"], path, voice=voice, **edge_settings(piece, rate, pitch, volume))
+            for piece, path in zip(pieces, piece_files)
+        ), return_exceptions=True)
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            raise errors[0]
+        await asyncio.to_thread(_stitch_pieces, piece_files, [p["pause_after_sec"] for p in pieces], output_file,
+                                lead_sec, target_lufs)
+
+async def synthesize_batch(items: List[Dict[str, Any]],
+                           on_done: Optional[Callable[[int, Optional[str]], None]] = None) -> List[bool]:
+    """
+    Each item is a dict of synthesize_text() kwargs (text, output_file, voice, rate, pitch).
+    Returns success flags in input order; `on_done(index, error)` fires as each line finishes.
+    """
+    async def run(index: int) -> bool:
+        try:
+            await synthesize_text(**items[index])
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        if on_done:
+            on_done(index, error)
+        return error is None
+
+    return list(await asyncio.gather(*(run(i) for i in range(len(items)))))
+
+def run_batch(items: List[Dict[str, Any]],
+              on_done: Optional[Callable[[int, Optional[str]], None]] = None) -> List[bool]:
+    """Blocking wrapper for scripts without their own event loop."""
+    return asyncio.run(synthesize_batch(items, on_done))
+
+# ----------------- BENCHMARK -----------------
+
+def _bench_lines(count: int) -> List[Dict[str, str]]:
+    import re
+    import json
+    draft_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "podcast_engine", "podcast_draft.json")
+    with open(draft_path, 'r', encoding='utf-8') as f:
+        dialogues = [d for d in json.load(f) if d.get("role") in ("host", "guest")]
+    return [{
+        "text": re.sub(r'<[^>]+>', '', d["text"]),
+        "voice": d.get("voice_profile", DEFAULT_VOICE),
+        "rate": d.get("rate", "+0%"),
+        "pitch": d.get("pitch", "+0Hz"),
+    } for d in dialogues[:count]]
+
+def benchmark(count: int, levels: List[int], include_subprocess: bool = False):
+    global EDGE_TTS_CONCURRENCY
+    lines = _bench_lines(count)
+    chars = sum(len(line["text"]) for line in lines)
+    print(f"=== Edge-TTS throughput: {len(lines)} lines, {chars} chars ===")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if include_subprocess:
+            t0 = time.perf_counter()
+            for i, line in enumerate(lines):
+                subprocess.run([
+                    sys.executable, "-m", "edge_tts", "--voice", line["voice"], "--rate", line["rate"],
+                    "--pitch", line["pitch"], "--text", line["text"],
+                    "--write-media", os.path.join(tmp_dir, f"sub_{i}.mp3"),
+                ], check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            elapsed = time.perf_counter() - t0
+            print(f"  subprocess/line  : {elapsed:6.1f}s  {len(lines) / elapsed:5.2f} lines/s  {chars / elapsed:6.1f} chars/s")
+
+        for level in levels:
+            EDGE_TTS_CONCURRENCY = level
+            items = [{**line, "output_file": os.path.join(tmp_dir, f"c{level}_{i}.mp3")} for i, line in enumerate(lines)]
+            t0 = time.perf_counter()
+            ok = run_batch(items)
+            elapsed = time.perf_counter() - t0
+            print(f"  in-process x{level:<3}: {elapsed:6.1f}s  {len(lines) / elapsed:5.2f} lines/s  "
+                  f"{chars / elapsed:6.1f} chars/s  ({sum(ok)}/{len(ok)} ok)")
+
+def benchmark_long(path: str, voice: str = DEFAULT_VOICE):
+    """Wall time of one long narration as a single request vs segmented and synthesized concurrently."""
+    from text_segmenter import clean_ssml
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    pieces = segment_text(text)
+    print(f"=== Long narration: {len(text)} chars, {len(pieces)} pieces, {EDGE_TTS_CONCURRENCY} concurrent ===")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        t0 = time.perf_counter()
+        asyncio.run(synthesize_line(clean_ssml(text), os.path.join(tmp_dir, "whole.mp3"), voice=voice))
+        print(f"  single request : {time.perf_counter() - t0:6.1f}s")
+        t0 = time.perf_counter()
+        asyncio.run(synthesize_text(text, os.path.join(tmp_dir, "segmented.mp3"), voice=voice))
+        print(f"  segmented      : {time.perf_counter() - t0:6.1f}s")
+
+if __name__ == "__main__":
+    if "--bench-long" in sys.argv and len(sys.argv) > sys.argv.index("--bench-long") + 1:
+        benchmark_long(sys.argv[sys.argv.index("--bench-long") + 1])
+    elif "--bench" in sys.argv:
+        args = sys.argv[sys.argv.index("--bench") + 1:]
+        count = int(args[0]) if args and args[0].isdigit() else 12
+        benchmark(count, [1, 2, 4, 8], include_subprocess="--subprocess" in sys.argv)
+    else:
+        print("Usage: python edge_tts_batch.py --bench [lines] [--subprocess]")
+        print("       python edge_tts_batch.py --bench-long <file.txt>")
@@ -1,12 +1,14 @@
 import json
 import asyncio
-import edge_tts
+from edge_tts_batch import synthesize_text
 
-async def generate_audio(text: str, output_file: str, voice: str = 'zh-CN-YunxiNeural') -> bool:
+async def generate_audio(text: str, output_file: str, voice: str = 'zh-CN-YunxiNeural',
+                         rate: str = "+0%", pitch: str = "+0Hz", target_lufs: float = None) -> bool:
     try:
         print(f"Generating cloud TTS audio for '{voice}'...")
-        communicate = edge_tts.Communicate(text, voice)
-        await communicate.save(output_file)
+        # Same in-process limiter/retries as the batch synthesizer (see edge_tts_batch.py);
+        # long narrations are split at sentence punctuation and synthesized piece-parallel
+        await synthesize_text(text, output_file, voice=voice, rate=rate, pitch=pitch, target_lufs=target_lufs)
         print(f"Successfully saved to {output_file}")
         return True
     except Exception as e:
@@ -63,9 +63,9 @@ def generate_assets_only():
         return False
         
     print(f"\n🎉 SUCCESS! All assets generated for Job #{job_id}. Skipping Remotion Video Render.")
-    print(f"You can find the assets in: c:\\work\\code\\todayInHistory\\video-generator\\public\\assets\\")
-    print(f"- MP3 Audio: job_{job_id}_narration.mp3")
-    print(f"- PNG Images: job_{job_id}_scene_*.png")
+    print(f"Assets are in the content-addressed store, listed in: data/asset_store/manifests/job_{job_id}.json")
+    print(f"- MP3 Audio: assets/job_{job_id}_narration.mp3")
+    print(f"- PNG Images: assets/job_{job_id}_scene_*.png")
     
 if __name__ == "__main__":
     generate_assets_only()
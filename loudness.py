@@ -0,0 +1,237 @@
+"""
+EBU R128 / ITU-R BS.1770 loudness in NumPy: K-weighting, gated integrated loudness,
+true peak, and a true-peak limiter.
+
+K-weighting is applied in the frequency domain on 100 ms sub-blocks (|H(f)|^2 of the two
+BS.1770 biquads against each sub-block's spectrum), so measuring is a handful of batched
+FFTs instead of a per-sample IIR loop. 400 ms gating blocks with 75% overlap are means of
+four consecutive sub-blocks. True peak uses a 4x polyphase FIR interpolator (BS.1770 Annex 2)
+that carries its input history from block to block, so block edges never add peaks.
+
+    python loudness.py a.mp3 b.mp3 ...     # measure files across a process pool
+"""
+import os
+import sys
+import math
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+TARGET_LUFS = float(os.environ.get("LOUDNESS_TARGET_LUFS", "-16"))
+TRUE_PEAK_CEILING_DBTP = -1.0
+OVERSAMPLE = 4
+TRUE_PEAK_TAPS_PER_PHASE = 12  # 48-tap interpolation filter at 4x, as in BS.1770
+SUBBLOCK_SEC = 0.1
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+LOUDNESS_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+def _biquad_power(b: List[float], a: List[float], freqs: np.ndarray, sample_rate: int) -> np.ndarray:
+    z = np.exp(-1j * 2 * np.pi * freqs / sample_rate)
+    return np.abs((b[0] + b[1] * z + b[2] * z * z) / (a[0] + a[1] * z + a[2] * z * z)) ** 2
+
+def k_weighting_power(freqs: np.ndarray, sample_rate: int) -> np.ndarray:
+    """|H(f)|^2 of the BS.1770 pre-filter (high shelf) followed by the RLB high-pass, at any sample rate."""
+    # Stage 1: +4 dB high shelf around 1.7 kHz (head effects)
+    gain_db, q, fc = 3.99984385397, 0.7071752369554193, 1681.974450955533
+    k = math.tan(math.pi * fc / sample_rate)
+    vh = 10 ** (gain_db / 20)
+    vb = vh ** 0.499666774155
+    a0 = 1 + k / q + k * k
+    shelf = _biquad_power(
+        [(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0],
+        [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0], freqs, sample_rate)
+    # Stage 2: RLB high-pass at ~38 Hz
+    q, fc = 0.5003270373253953, 38.13547087613982
+    k = math.tan(math.pi * fc / sample_rate)
+    a0 = 1 + k / q + k * k
+    highpass = _biquad_power([1.0, -2.0, 1.0], [1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0],
+                             freqs, sample_rate)
+    return shelf * highpass
+
+def power_to_lufs(power: float) -> float:
+    return -0.691 + 10 * math.log10(power) if power > 0 else float("-inf")
+
+def interpolation_phases(factor: int = OVERSAMPLE, taps_per_phase: int = TRUE_PEAK_TAPS_PER_PHASE) -> np.ndarray:
+    """
+    Kaiser-windowed sinc low-pass at the input Nyquist, split into `factor` polyphase branches
+    (rows). Each branch has unity DC gain; branch 0 is the identity, so real samples are kept exactly.
+    """
+    size = factor * taps_per_phase
+    t = (np.arange(size) - factor * (taps_per_phase // 2)) / factor
+    taps = np.sinc(t) * np.kaiser(size, 6.0)
+    phases = taps.reshape(taps_per_phase, factor).T
+    return phases / phases.sum(axis=1, keepdims=True)
+
+class TruePeakInterpolator:
+    """
+    |x| interpolated OVERSAMPLE times, block by block. The filter reaches `taps_per_phase // 2`
+    samples into the past (kept from the previous block) and as many into the future (`lookahead`).
+    """
+
+    def __init__(self, factor: int = OVERSAMPLE, taps_per_phase: int = TRUE_PEAK_TAPS_PER_PHASE):
+        self.factor = factor
+        self.phases = interpolation_phases(factor, taps_per_phase)
+        self.lookahead = taps_per_phase // 2
+        self._history = np.zeros(taps_per_phase - self.lookahead - 1)
+
+    def process(self, samples: np.ndarray, lookahead: np.ndarray, advance: bool = True) -> np.ndarray:
+        """
+        Interpolated magnitudes at samples[n] + p/factor, flattened to n * factor + p. `lookahead`
+        holds the samples that follow the block (fewer means silence after them).
+        """
+        if not samples.size:
+            return np.zeros(0, dtype=np.float32)
+        future = np.zeros(self.lookahead)
+        future[:min(lookahead.size, self.lookahead)] = lookahead[:self.lookahead]
+        data = np.concatenate([self._history, samples.astype(np.float64), future])
+        windows = np.lib.stride_tricks.sliding_window_view(data, self.phases.shape[1])[:samples.size]
+        if advance:
+            self._history = data[samples.size:samples.size + self._history.size]
+        # Row n of `windows` ends `lookahead` samples after samples[n]; taps run newest-first
+        return np.abs(windows[:, ::-1] @ self.phases.T).astype(np.float32).reshape(-1)
+
+def oversampled_peak(samples: np.ndarray, factor: int = OVERSAMPLE) -> np.ndarray:
+    """|x| of a whole signal (silence before and after) interpolated `factor` times (true-peak estimate)."""
+    return TruePeakInterpolator(factor).process(samples, np.zeros(0))
+
+class LoudnessMeter:
+    """Streaming integrated loudness + true peak. feed() blocks of mono float samples, then read the results."""
+
+    def __init__(self, sample_rate: int):
+        self.sample_rate = sample_rate
+        self.subblock = int(SUBBLOCK_SEC * sample_rate)
+        freqs = np.fft.rfftfreq(self.subblock, 1 / sample_rate)
+        weights = np.full(freqs.size, 2.0)
+        weights[0] = 1.0
+        if self.subblock % 2 == 0:
+            weights[-1] = 1.0
+        # Parseval: mean square of the K-weighted sub-block = sum(w |X|^2 |H|^2) / N^2
+        self._weights = weights * k_weighting_power(freqs, sample_rate) / (self.subblock ** 2)
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._powers: List[np.ndarray] = []
+        self._interpolator = TruePeakInterpolator()
+        # The last few samples wait for the next block, which is their interpolation lookahead
+        self._peak_pending = np.zeros(0, dtype=np.float32)
+        self._peak = 0.0
+
+    def feed(self, samples: np.ndarray):
+        if not samples.size:
+            return
+        pending = np.concatenate([self._peak_pending, samples.astype(np.float32)])
+        ready = max(0, pending.size - self._interpolator.lookahead)
+        if ready:
+            peaks = self._interpolator.process(pending[:ready], pending[ready:])
+            self._peak = max(self._peak, float(peaks.max()))
+        self._peak_pending = pending[ready:]
+        data = np.concatenate([self._remainder, samples.astype(np.float32)])
+        usable = data.size - data.size % self.subblock
+        self._remainder = data[usable:]
+        if usable:
+            spectra = np.fft.rfft(data[:usable].reshape(-1, self.subblock), axis=1)
+            self._powers.append((np.abs(spectra) ** 2) @ self._weights)
+
+    @property
+    def integrated_lufs(self) -> Optional[float]:
+        """Gated integrated loudness, or None if the signal is shorter than one 400 ms block or silent."""
+        powers = np.concatenate(self._powers) if self._powers else np.zeros(0)
+        if powers.size < 4:
+            return None
+        blocks = np.convolve(powers, np.ones(4) / 4, mode="valid")
+        gated = blocks[blocks > 10 ** ((ABSOLUTE_GATE_LUFS + 0.691) / 10)]
+        if not gated.size:
+            return None
+        relative_gate = power_to_lufs(float(gated.mean())) + RELATIVE_GATE_LU
+        gated = gated[gated > 10 ** ((relative_gate + 0.691) / 10)]
+        return power_to_lufs(float(gated.mean())) if gated.size else None
+
+    @property
+    def peak(self) -> float:
+        """True peak so far; the samples still waiting for lookahead are measured as the end of the signal."""
+        tail = self._interpolator.process(self._peak_pending, np.zeros(0), advance=False)
+        return max(self._peak, float(tail.max())) if tail.size else self._peak
+
+    @property
+    def true_peak_dbtp(self) -> float:
+        peak = self.peak
+        return 20 * math.log10(peak) if peak > 0 else float("-inf")
+
+def measure(samples: np.ndarray, sample_rate: int, block_sec: float = 10.0) -> Dict[str, Optional[float]]:
+    meter = LoudnessMeter(sample_rate)
+    # Blocks give the same result as one feed (all state carries over) with bounded memory
+    step = max(1, int(block_sec * sample_rate))
+    for start in range(0, samples.size, step):
+        meter.feed(samples[start:start + step])
+    return {"integrated_lufs": meter.integrated_lufs, "true_peak_dbtp": meter.true_peak_dbtp}
+
+def normalization_gain_db(samples: np.ndarray, sample_rate: int, target_lufs: float = TARGET_LUFS) -> float:
+    """Gain that brings a clip to target_lufs (0 for clips too short/quiet to measure)."""
+    loudness = measure(samples, sample_rate)["integrated_lufs"]
+    return 0.0 if loudness is None else target_lufs - loudness
+
+def _gain_worker(args) -> float:
+    samples, sample_rate, target_lufs = args
+    if samples.dtype == np.int16:
+        samples = samples.astype(np.float32) / 32768.0
+    return normalization_gain_db(samples, sample_rate, target_lufs)
+
+def clip_gains_db(clips: List[np.ndarray], sample_rate: int, target_lufs: float = TARGET_LUFS,
+                  workers: int = LOUDNESS_WORKERS) -> List[float]:
+    """Normalization gains for many clips (int16 or float), measured across a process pool."""
+    jobs = [(clip, sample_rate, target_lufs) for clip in clips]
+    if workers <= 1 or len(jobs) < 4:
+        return [_gain_worker(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_gain_worker, jobs, chunksize=max(1, len(jobs) // (workers * 4))))
+
+class TruePeakLimiter:
+    """
+    Block-wise true-peak limiter: per 1 ms hop, the gain that keeps the oversampled peak under
+    the ceiling, held for `release_sec` (carried across blocks) and smoothed without ever
+    exceeding the required reduction. The interpolator keeps the previous block as context; the
+    next block is not known yet, so the last few samples are interpolated against their mirror image.
+    """
+
+    def __init__(self, sample_rate: int, ceiling_dbtp: float = TRUE_PEAK_CEILING_DBTP, release_sec: float = 0.08):
+        self.ceiling = 10 ** (ceiling_dbtp / 20)
+        self.hop = max(1, sample_rate // 1000)
+        self.hold = max(1, int(release_sec * 1000))
+        self._context = np.ones(self.hold - 1, dtype=np.float32)
+        self._interpolator = TruePeakInterpolator()
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if not samples.size:
+            return samples
+        hops = math.ceil(samples.size / self.hop)
+        # Mirroring continues the waveform without the step a zero or circular extension would add
+        mirror = samples[-2::-1][:self._interpolator.lookahead]
+        padded = np.zeros(hops * self.hop * OVERSAMPLE, dtype=np.float32)
+        padded[:samples.size * OVERSAMPLE] = self._interpolator.process(samples, mirror)
+        peaks = padded.reshape(hops, self.hop * OVERSAMPLE).max(axis=1)
+        required = np.minimum(1.0, self.ceiling / np.maximum(peaks, 1e-9)).astype(np.float32)
+
+        # Backward-looking moving minimum = hold each reduction for the release time
+        extended = np.concatenate([self._context, required])
+        held = np.lib.stride_tricks.sliding_window_view(extended, self.hold).min(axis=1)
+        self._context = extended[extended.size - (self.hold - 1):] if self.hold > 1 else self._context
+
+        stepped = np.repeat(held, self.hop)[:samples.size]
+        ramped = np.interp(np.arange(samples.size), np.arange(hops) * self.hop + self.hop // 2, held)
+        return samples * np.minimum(stepped, ramped).astype(np.float32)
+
+def _measure_file(path: str) -> Dict[str, Optional[float]]:
+    from audio_mixer import decode_audio, SAMPLE_RATE
+    return {"path": path, **measure(decode_audio(path, SAMPLE_RATE), SAMPLE_RATE)}
+
+def measure_files(paths: List[str], workers: int = LOUDNESS_WORKERS) -> List[Dict[str, Optional[float]]]:
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(paths)))) as pool:
+        return list(pool.map(_measure_file, paths))
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python loudness.py <audio file> [...]")
+        sys.exit(1)
+    for result in measure_files(sys.argv[1:]):
+        lufs = result["integrated_lufs"]
+        print(f"{'n/a' if lufs is None else f'{lufs:6.1f}'} LUFS  {result['true_peak_dbtp']:6.1f} dBTP  {result['path']}")
@@ -0,0 +1,130 @@
+"""
+Per-line TTS clip cache shared by the podcast synthesizers.
+
+A clip is stored under the hash of everything that determines its audio:
+(engine, voice_id, cleaned text, speed_factor, seed, sample_rate). A manifest maps each
+key back to its file and a short description, so editing one line of podcast_draft.json
+costs one TTS call on the next run and every unchanged line is reused.
+
+    python clip_cache.py            # summary
+    python clip_cache.py prune      # drop clips the manifest no longer references
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("PODCAST_CLIP_CACHE", os.path.join(SCRIPT_DIR, "clip_cache"))
+MANIFEST_NAME = "manifest.json"
+
+def clip_key(engine: str, voice_id: str, text: str, speed_factor: Any = 1.0,
+             seed: Optional[int] = None, sample_rate: Optional[int] = None,
+             extra: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Content address of one synthesized line. Whitespace differences don't change the key.
+    `extra` carries engine-specific knobs (e.g. edge-tts pitch).
+    """
+    payload = {
+        "engine": engine,
+        "voice_id": voice_id,
+        "text": " ".join(text.split()),
+        "speed_factor": speed_factor,
+        "seed": seed,
+        "sample_rate": sample_rate,
+    }
+    if extra:
+        payload["extra"] = extra
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+class ClipCache:
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.manifest_path = os.path.join(cache_dir, MANIFEST_NAME)
+        self.stats = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.manifest: Dict[str, Dict[str, Any]] = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.manifest = {}
+
+    def _path(self, key: str, ext: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.{ext}")
+
+    def lookup(self, key: str, ext: Optional[str] = None) -> Optional[str]:
+        """
+        Path of the cached clip, or None. Counts a hit/miss. Given the expected `ext`, a clip file
+        written by a run that died before saving the manifest is adopted instead of re-synthesized.
+        """
+        with self._lock:
+            entry = self.manifest.get(key)
+            if entry is None and ext and os.path.exists(self._path(key, ext)):
+                entry = self.manifest[key] = {"ext": ext, "bytes": os.path.getsize(self._path(key, ext)),
+                                              "created_at": time.time()}
+            path = self._path(key, entry["ext"]) if entry else None
+            if path and os.path.exists(path):
+                self.stats["hits"] += 1
+                entry["used_at"] = time.time()
+                return path
+            self.stats["misses"] += 1
+            return None
+
+    def get_bytes(self, key: str, ext: Optional[str] = None) -> Optional[bytes]:
+        path = self.lookup(key, ext)
+        if not path:
+            return None
+        with open(path, "rb") as f:
+            return f.read()
+
+    def put(self, key: str, data: bytes, ext: str, **meta) -> str:
+        """Store a clip atomically (safe from worker threads) and record it in the manifest."""
+        path = self._path(key, ext)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.manifest[key] = {"ext": ext, "bytes": len(data), "created_at": time.time(),
+                                  "used_at": time.time(), **meta}
+        return path
+
+    def put_file(self, key: str, source_path: str, **meta) -> str:
+        with open(source_path, "rb") as f:
+            return self.put(key, f.read(), os.path.splitext(source_path)[1].lstrip(".") or "bin", **meta)
+
+    def save(self):
+        with self._lock:
+            tmp_path = self.manifest_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.manifest, f, ensure_ascii=False, indent=1)
+            os.replace(tmp_path, self.manifest_path)
+
+    def prune(self) -> int:
+        """Delete clip files the manifest doesn't know about (e.g. after a crash mid-write)."""
+        known = {os.path.basename(self._path(k, e["ext"])) for k, e in self.manifest.items()}
+        removed = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name != MANIFEST_NAME and name not in known:
+                    os.remove(os.path.join(root, name))
+                    removed += 1
+        return removed
+
+if __name__ == "__main__":
+    cache = ClipCache()
+    if len(sys.argv) > 1 and sys.argv[1] == "prune":
+        print(f"Removed {cache.prune()} orphaned clip files")
+    else:
+        size_mb = sum(e.get("bytes", 0) for e in cache.manifest.values()) / (1024 * 1024)
+        engines: Dict[str, int] = {}
+        for entry in cache.manifest.values():
+            engines[entry.get("engine", "?")] = engines.get(entry.get("engine", "?"), 0) + 1
+        print(f"{len(cache.manifest)} cached clips ({size_mb:.1f} MB) in {cache.cache_dir}")
+        for engine, count in sorted(engines.items()):
+            print(f"    {engine}: {count}")
@@ -2,8 +2,30 @@
 Full Podcast Synthesizer
 ========================
 Reads podcast_draft.json (58 lines of dialogue) and calls the custom TTS API
-to generate individual WAV clips per line, then uses ffmpeg to concatenate
-them into one final podcast MP3 file.
+for every line (concurrently, over a pooled session with retries, see tts_client.py).
+Lines are split at their <break> tags, <prosody> spans and, when long, at sentence
+punctuation (see text_segmenter.py); all pieces share the same request pool and are stitched
+back per line with the pauses. Each piece comes back as raw streaming PCM.
+By default the lines are laid out on a timeline with the sys_inject_* assets spliced in and optional ducked BGM, and mixed
+straight into the MP3 encoder (see podcast_timeline.py / audio_mixer.py).
+With --no-mix, lines are fed in script order straight into one ffmpeg encoder as they
+arrive (see pcm_stream.py).
+With --hls, the timeline is mixed incrementally while lines are still being synthesized and
+encoded in the same pass to fMP4/AAC HLS segments next to the MP3 (podcast_final_hls/,
+see hls_stream.py), so playback can start after the first lines; chapters.json marks every
+sys_inject_* splice. Lines are leveled one by one there and a true-peak limiter replaces the
+whole-episode loudness pass.
+
+Progress is checkpointed per line (see synth_checkpoint.py): if the TTS server drops
+halfway, rerunning synthesizes only the missing/failed lines. A run with failures still
+exports what it has to podcast_final.partial.mp3.
+
+`python full_podcast_synth.py --stub` runs against a local synthetic-audio server.
+`python full_podcast_synth.py --status` shows the checkpoint of the last run.
+
+The TTS and assembly stages are also callable on their own (synthesize_lines /
+assemble_from_cache) with any draft and output path; database_builder/pipeline/node_podcast.py
+runs them as stages of a podcast job.
 
 Voice Selection:
   Host  = zhoukai
@@ -11,26 +33,42 @@ Voice Selection:
 """
 import json
 import os
-import re
-import requests
-import subprocess
 import sys
 import io
 import time
+import threading
+
+import numpy as np
 
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from tts_client import TTSClient, TTS_URL, TTS_CONCURRENCY, DEFAULT_PAYLOAD
+from pcm_stream import StreamingEncoder, OrderedPCMWriter, pcm_to_array, SAMPLE_RATE
+from clip_cache import ClipCache, clip_key
+from synth_checkpoint import SynthCheckpoint, print_status, STATUS_DONE, STATUS_FAILED, STATUS_PENDING
+from podcast_timeline import SpeechCollector, TimelineStreamer, build_timeline
+from audio_mixer import mix_timeline, stitch, pcm16_to_float, decode_audio, StreamingMixer
+from hls_stream import HLSEncoder, write_chapters
+from text_segmenter import segment_text, clean_ssml, SEGMENT_MAX_CHARS
+from loudness import clip_gains_db, TruePeakLimiter, TARGET_LUFS
 
 # --- Config ---
-TTS_URL = "http://101.227.82.130:13002/tts"
+# TTS endpoint and concurrency come from tts_client (PODCAST_TTS_URL / PODCAST_TTS_CONCURRENCY)
 VOICE_MAP = {
     "host": "zhoukai",
     "guest": "zsy",
 }
-DRAFT_FILE = r"c:\work\code\todayInHistory\podcast_engine\podcast_draft.json"
-CLIPS_DIR = r"c:\work\code\todayInHistory\podcast_engine\full_clips"
-OUTPUT_MP3 = r"c:\work\code\todayInHistory\podcast_engine\podcast_final.mp3"
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DRAFT_FILE = os.path.join(SCRIPT_DIR, "podcast_draft.json")
+OUTPUT_MP3 = os.path.join(SCRIPT_DIR, "podcast_final.mp3")
+LINE_GAP_SEC = 0.25  # silence between consecutive lines
+PODCAST_BGM = os.environ.get("PODCAST_BGM")  # optional music bed, ducked under speech
+TTS_ENGINE = "gpt-sovits"  # part of every clip cache key; bump when the server model/reference voice changes
 
-os.makedirs(CLIPS_DIR, exist_ok=True)
+def partial_path(output_mp3):
+    return output_mp3[:-len(".mp3")] + ".partial.mp3"
+
+def checkpoint_path(output_mp3):
+    return output_mp3[:-len(".mp3")] + ".manifest.json"
 
 def rate_to_speed_factor(rate_str):
     """Convert SSML rate like '+15%' or '-10%' to a speed_factor float."""
@@ -40,61 +78,10 @@ def rate_to_speed_factor(rate_str):
     except:
         return 1.0
 
-def clean_ssml(text):
-    """Strip embedded SSML tags from text, keeping only the spoken content."""
-    return re.sub(r'<[^>]+>', '', text)
-
-def generate_clip(voice_id, text, speed_factor, output_path):
-    """Call the custom TTS API and save the result as a WAV file."""
-    payload = {
-        "text": text,
-        "text_lang": "zh",
-        "ref_audio_path": "voice/张舒怡.wav",
-        "prompt_lang": "zh",
-        "aux_ref_audio_paths": [],
-        "top_k": 30,
-        "top_p": 1,
-        "temperature": 1,
-        "text_split_method": "cut5",
-        "batch_size": 32,
-        "batch_threshold": 0.75,
-        "split_bucket": True,
-        "speed_factor": speed_factor,
-        "media_type": "wav",
-        "streaming_mode": False,
-        "seed": 100,
-        "parallel_infer": True,
-        "repetition_penalty": 1.35,
-        "sample_steps": 32,
-        "super_sampling": False,
-        "sample_rate": 32000,
-        "fragment_interval": 0.01,
-        "voice_id": voice_id,
-    }
-    headers = {"Content-Type": "application/json"}
-    
-    resp = requests.post(TTS_URL, headers=headers, json=payload, timeout=60)
-    if resp.status_code == 200:
-        with open(output_path, "wb") as f:
-            f.write(resp.content)
-        return True
-    else:
-        print(f"    ERROR {resp.status_code}: {resp.text[:80]}")
-        return False
-
-def main():
-    with open(DRAFT_FILE, 'r', encoding='utf-8') as f:
-        dialogues = json.load(f)
-
+def collect_line_requests(dialogues):
+    """Turn the draft into TTS requests (host/guest lines only), remembering each line's draft position."""
+    lines = []
     total = len(dialogues)
-    print(f"=== Full Podcast Synthesis: {total} lines ===")
-    print(f"    Host voice:  zhoukai")
-    print(f"    Guest voice: zsy")
-    print()
-
-    valid_clips = []
-    t_start = time.perf_counter()
-
     for i, line in enumerate(dialogues):
         role = line.get("role", "")
         text = line.get("text", "")
@@ -112,53 +99,263 @@ def main():
             print(f"  [{i+1:02d}/{total}] SKIP unknown role: {role}")
             continue
 
-        clean_text = clean_ssml(text)
-        speed = rate_to_speed_factor(rate)
-        clip_path = os.path.join(CLIPS_DIR, f"{i+1:03d}_{role}.wav")
+        # <break>/<prosody> and long lines become pieces synthesized in parallel (see text_segmenter.py)
+        speed_factor = rate_to_speed_factor(rate)
+        pieces = segment_text(text)
+        if not pieces:
+            print(f"  [{i+1:02d}/{total}] SKIP nothing to say: {text[:40]}")
+            continue
+        lines.append({
+            "index": i,
+            "role": role,
+            "ssml": text,
+            "request": {
+                "voice_id": voice_id,
+                "text": clean_ssml(text),
+                "speed_factor": speed_factor,
+            },
+            "pieces": [{"voice_id": voice_id, "text": piece["text"],
+                        "speed_factor": round(speed_factor * piece["rate"], 2)} for piece in pieces],
+            "pauses": [piece["pause_after_sec"] for piece in pieces],
+            "lead_pause": pieces[0]["pause_before_sec"],
+        })
+    return lines
 
-        print(f"  [{i+1:02d}/{total}] {role} (speed={speed}): {clean_text[:35]}...", end="", flush=True)
-        
-        if generate_clip(voice_id, clean_text, speed, clip_path):
-            print(" OK")
-            valid_clips.append(clip_path)
+def stitch_pieces(pieces, pauses, lead_sec=0.0):
+    """
+    Raw PCM of a line's pieces -> raw PCM of the line, with the SSML/sentence pauses between them
+    (and lead_sec of silence first when the line opens with a <break>).
+    """
+    if len(pieces) == 1 and not lead_sec:
+        return pieces[0]
+    samples = stitch([pcm16_to_float(pcm_to_array(audio)) for audio in pieces], pauses, SAMPLE_RATE,
+                     lead_sec=lead_sec)
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+def plan_lines(dialogues, engine=TTS_ENGINE):
+    """TTS requests for the draft, each with the clip cache key of the audio it should produce."""
+    lines = collect_line_requests(dialogues)
+    for line in lines:
+        req = line["request"]
+        line["cache_key"] = clip_key(engine, req["voice_id"], line["ssml"], req["speed_factor"],
+                                     DEFAULT_PAYLOAD["seed"], SAMPLE_RATE,
+                                     extra={"segment_max_chars": SEGMENT_MAX_CHARS,
+                                            # Only lines opening with a <break> change: clips cached before
+                                            # the leading pause was kept must not be reused for them
+                                            **({"lead_pause_sec": line["lead_pause"]} if line["lead_pause"] else {})})
+    return lines
+
+def synthesize_lines(lines, checkpoint, cache, tts_url=TTS_URL, concurrency=TTS_CONCURRENCY,
+                     engine=TTS_ENGINE, sink=None):
+    """
+    Make sure every line's clip is in the cache. Unchanged lines are reused, only new/edited/failed
+    lines go to the TTS server. `sink(k, samples)` (k = position in `lines`, samples None on failure)
+    receives every line as soon as it is available, cached ones first. Returns the client stats
+    plus how many lines came from the cache.
+    """
+    total = len(lines)
+    checkpoint.retain(line["index"] for line in lines)
+    resumed = 0
+    for line in lines:
+        resumed += checkpoint.is_done(line["index"], line["cache_key"])
+        line["cached"] = cache.get_bytes(line["cache_key"], ext="pcm")
+        if line["cached"] is not None:
+            checkpoint.mark(line["index"], STATUS_DONE, line["cache_key"], line["role"],
+                            duration_sec=len(line["cached"]) / 2 / SAMPLE_RATE)
         else:
-            print(" FAILED")
+            checkpoint.mark(line["index"], STATUS_PENDING, line["cache_key"], line["role"])
+    pending = [k for k, line in enumerate(lines) if line["cached"] is None]
+    print(f"    Clip cache: {total - len(pending)} reused ({resumed} resumed from the last run), "
+          f"{len(pending)} to synthesize")
+
+    # Every piece of every pending line goes into one pool; a line is done when its last piece is
+    piece_jobs = [(k, p) for k in pending for p in range(len(lines[k]["pieces"]))]
+    lock = threading.Lock()
+    for k in pending:
+        lines[k]["piece_audio"] = [None] * len(lines[k]["pieces"])
+        lines[k]["pieces_left"] = len(lines[k]["pieces"])
+
+    def on_piece_done(j, audio, error):
+        k, p = piece_jobs[j]
+        line = lines[k]
+        with lock:
+            line["piece_audio"][p] = audio
+            line["piece_error"] = line.get("piece_error") or error
+            line["pieces_left"] -= 1
+            if line["pieces_left"]:
+                return
+        piece_audio = line.pop("piece_audio")
+        if all(piece_audio):
+            on_done(k, stitch_pieces(piece_audio, line["pauses"], line["lead_pause"]), None)
+        else:
+            on_done(k, None, line["piece_error"])
+
+    def on_done(k, audio, error):
+        line = lines[k]
+        status = "OK" if audio else f"FAILED ({error})"
+        print(f"  [{line['index']+1:02d}] {line['role']} (speed={line['request']['speed_factor']}): "
+              f"{line['request']['text'][:35]}... {status}")
+        if audio:
+            cache.put(line["cache_key"], audio, "pcm", engine=engine, voice_id=line["request"]["voice_id"],
+                      sample_rate=SAMPLE_RATE, text=line["request"]["text"][:60])
+            checkpoint.mark(line["index"], STATUS_DONE, line["cache_key"], duration_sec=len(audio) / 2 / SAMPLE_RATE)
+        else:
+            checkpoint.mark(line["index"], STATUS_FAILED, line["cache_key"], error=error)
+        if sink:
+            sink(k, pcm_to_array(audio) if audio else None)
+
+    client = TTSClient(tts_url, concurrency=concurrency)
+    try:
+        for k, line in enumerate(lines):
+            cached = line.pop("cached")
+            if cached is not None and sink:
+                sink(k, pcm_to_array(cached))
+        requests_list = [{**lines[k]["pieces"][p], "raw": True, "sample_rate": SAMPLE_RATE} for k, p in piece_jobs]
+        client.synthesize_many(requests_list, on_done=on_piece_done)
+    finally:
+        client.close()
+        cache.save()
+    return {**client.stats, "reused": total - len(pending)}
+
+def mix_episode(dialogues, clips, output_path):
+    """Level every line, splice in the sys_inject assets and mix to `output_path`. Returns seconds."""
+    # Voices come out of the TTS at different levels: level every line to the target first
+    indices = sorted(clips)
+    gains = clip_gains_db([clips[i] for i in indices], SAMPLE_RATE, TARGET_LUFS)
+    print(f"\nLeveled {len(indices)} lines to {TARGET_LUFS} LUFS "
+          f"(gains {min(gains, default=0):+.1f} .. {max(gains, default=0):+.1f} dB)")
+    print(f"Mixing timeline{' over BGM ' + PODCAST_BGM if PODCAST_BGM else ''}...")
+    events = build_timeline(dialogues, clips, SAMPLE_RATE, settings={"speech_gap_sec": LINE_GAP_SEC},
+                            speech_gain_db=dict(zip(indices, gains)), target_lufs=TARGET_LUFS)
+    return mix_timeline(events, output_path, SAMPLE_RATE, bgm_path=PODCAST_BGM, target_lufs=TARGET_LUFS)
+
+def finalize_output(encoding_path, output_mp3, checkpoint, lines_total, duration):
+    """Publish the encode as the final episode if every line made it, else as the .partial file."""
+    counts = checkpoint.counts()
+    complete = counts[STATUS_DONE] == lines_total
+    output_path = output_mp3 if complete else partial_path(output_mp3)
+    os.replace(encoding_path, output_path)
+    if complete and os.path.exists(partial_path(output_mp3)):
+        os.remove(partial_path(output_mp3))
+    checkpoint.set_output(output_path, complete, duration)
+
+    file_size_mb = os.path.getsize(output_path) / (1024 * 1024)
+    if complete:
+        print(f"\n=== DONE! ===")
+        print(f"    Final podcast: {output_path} ({duration / 60:.1f} min)")
+    else:
+        print(f"\n=== PARTIAL: {lines_total - counts[STATUS_DONE]} of {lines_total} lines missing ===")
+        print(f"    Partial podcast: {output_path} ({duration / 60:.1f} min)")
+        print(f"    Rerun to synthesize only the missing lines (checkpoint: {checkpoint.path})")
+    print(f"    File size: {file_size_mb:.1f} MB")
+    return {"output_path": output_path, "complete": complete, "duration_sec": duration,
+            "lines_total": lines_total, "lines_done": counts[STATUS_DONE]}
+
+def assemble_from_cache(draft_file=DRAFT_FILE, output_mp3=OUTPUT_MP3, engine=TTS_ENGINE):
+    """
+    Assembly stage on its own: mix whatever lines the clip cache holds for this draft, without
+    calling the TTS server. Returns the same result dict as main(), or None if no line is voiced.
+    """
+    with open(draft_file, 'r', encoding='utf-8') as f:
+        dialogues = json.load(f)
+    lines = plan_lines(dialogues, engine)
+    cache = ClipCache()
+    checkpoint = SynthCheckpoint(checkpoint_path(output_mp3), draft_file)
+    clips = {}
+    for line in lines:
+        audio = cache.get_bytes(line["cache_key"], ext="pcm")
+        if audio:
+            clips[line["index"]] = pcm_to_array(audio)
+        elif checkpoint.is_done(line["index"], line["cache_key"]):
+            # Clip was pruned from the cache since the TTS stage ran
+            checkpoint.mark(line["index"], STATUS_PENDING, line["cache_key"], line["role"])
+    if not clips:
+        print("No audio to encode!")
+        return None
+    encoding_path = output_mp3[:-len(".mp3")] + ".encoding.mp3"
+    duration = mix_episode(dialogues, clips, encoding_path)
+    return finalize_output(encoding_path, output_mp3, checkpoint, len(lines), duration)
+
+def main(draft_file=DRAFT_FILE, output_mp3=OUTPUT_MP3, tts_url=TTS_URL, concurrency=TTS_CONCURRENCY,
+         engine=TTS_ENGINE, mix=True, hls_dir=None):
+    with open(draft_file, 'r', encoding='utf-8') as f:
+        dialogues = json.load(f)
+
+    total = len(dialogues)
+    print(f"=== Full Podcast Synthesis: {total} lines ===")
+    print(f"    Host voice:  zhoukai")
+    print(f"    Guest voice: zsy")
+    print(f"    TTS server:  {tts_url} ({concurrency} concurrent)")
+    print()
+
+    lines = plan_lines(dialogues, engine)
+    t_start = time.perf_counter()
+    cache = ClipCache()
+    checkpoint = SynthCheckpoint(checkpoint_path(output_mp3), draft_file)
+
+    # Mixing needs every line laid out first; the plain path pushes raw PCM into a single ffmpeg
+    # encoder as soon as every earlier line is in. Either way: no per-line files, one encode pass.
+    # Encode to a scratch name; it becomes the final or the .partial file once we know if every line made it
+    encoding_path = output_mp3[:-len(".mp3")] + ".encoding.mp3"
+    encoder = None
+    if hls_dir:
+        print(f"Streaming HLS to {hls_dir}{' over BGM ' + PODCAST_BGM if PODCAST_BGM else ''}")
+        encoder = HLSEncoder(hls_dir, SAMPLE_RATE, mp3_path=encoding_path)
+        mixer = StreamingMixer(encoder.write, SAMPLE_RATE,
+                               bgm=decode_audio(PODCAST_BGM, SAMPLE_RATE) if PODCAST_BGM else None,
+                               settings={"speech_gap_sec": LINE_GAP_SEC}, limiter=TruePeakLimiter(SAMPLE_RATE))
+        writer = TimelineStreamer(dialogues, {line["index"] for line in lines}, mixer, SAMPLE_RATE,
+                                  settings={"speech_gap_sec": LINE_GAP_SEC}, target_lufs=TARGET_LUFS,
+                                  on_chapters=lambda chapters: write_chapters(hls_dir, chapters))
+        sink = lambda k, samples: writer.submit(lines[k]["index"], samples)
+    elif mix:
+        writer = SpeechCollector()
+        sink = lambda k, samples: writer.submit(lines[k]["index"], samples)
+    else:
+        encoder = StreamingEncoder(encoding_path, sample_rate=SAMPLE_RATE)
+        writer = OrderedPCMWriter(encoder, total=len(lines), gap_sec=LINE_GAP_SEC)
+        sink = writer.submit
+
+    try:
+        stats = synthesize_lines(lines, checkpoint, cache, tts_url, concurrency, engine, sink=sink)
+    except BaseException:
+        if encoder:
+            encoder.abort()
+        raise
 
     elapsed = time.perf_counter() - t_start
     print(f"\n--- TTS generation complete in {elapsed:.1f}s ---")
-    print(f"    {len(valid_clips)} clips generated, {total - len(valid_clips)} skipped/failed")
-
-    # --- Concatenate with ffmpeg ---
-    if not valid_clips:
-        print("No clips to concatenate!")
-        return
-
-    import imageio_ffmpeg
-    ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
-
-    concat_file = os.path.join(CLIPS_DIR, "concat_list.txt")
-    with open(concat_file, "w", encoding="utf-8") as f:
-        for clip in valid_clips:
-            f.write(f"file '{clip.replace(os.sep, '/')}'\n")
-
-    print(f"\nConcatenating {len(valid_clips)} clips into final MP3...")
-    cmd = [
-        ffmpeg_exe,
-        "-f", "concat",
-        "-safe", "0",
-        "-i", concat_file,
-        "-ac", "1",
-        "-ar", "32000",
-        "-b:a", "192k",
-        OUTPUT_MP3,
-        "-y"
-    ]
-    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    
-    file_size_mb = os.path.getsize(OUTPUT_MP3) / (1024 * 1024)
-    print(f"\n=== DONE! ===")
-    print(f"    Final podcast: {OUTPUT_MP3}")
-    print(f"    File size: {file_size_mb:.1f} MB")
+    print(f"    {writer.written} lines voiced, {total - writer.written} skipped/failed")
+    print(f"    {stats['reused']} from clip cache, {stats['requests']} requests, {stats['retries']} retries, {stats['failures']} failures")
+
+    if not writer.written:
+        if encoder:
+            encoder.abort()
+        print("No audio to encode!")
+        return None
+
+    if hls_dir:
+        duration = mixer.close()
+        encoder.close()
+        write_chapters(hls_dir, writer.chapters, duration)
+        print(f"HLS playlist: {os.path.join(hls_dir, 'master.m3u8')} ({len(writer.chapters)} chapters)")
+    elif mix:
+        duration = mix_episode(dialogues, writer.clips, encoding_path)
+    else:
+        encoder.close()
+        duration = encoder.duration
+    return finalize_output(encoding_path, output_mp3, checkpoint, len(lines), duration)
 
 if __name__ == "__main__":
-    main()
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    hls_dir = OUTPUT_MP3[:-len(".mp3")] + "_hls" if "--hls" in sys.argv else None
+    if "--status" in sys.argv:
+        print_status(checkpoint_path(OUTPUT_MP3))
+    elif "--stub" in sys.argv:
+        # Dry run against a local synthetic-audio server instead of the GPU box
+        from stub_tts_server import start_server
+        stub = start_server(latency=0.5)
+        main(tts_url=f"http://127.0.0.1:{stub.server_address[1]}/tts", engine="stub", mix="--no-mix" not in sys.argv,
+             hls_dir=hls_dir)
+    else:
+        main(mix="--no-mix" not in sys.argv, hls_dir=hls_dir)
@@ -0,0 +1,107 @@
+"""
+Incremental HLS output for podcast episodes.
+
+One ffmpeg process reads the mixed float PCM over stdin and writes, in the same pass:
+  - fMP4/AAC HLS: init.mp4 + seg_00000.m4s ... and episode.m3u8, an EVENT playlist that
+    gains a segment every HLS_SEGMENT_SEC, so a player can start on the first lines while later
+    ones are still being synthesized (#EXT-X-ENDLIST is appended on close);
+  - optionally the classic MP3 of the whole episode.
+
+master.m3u8 points at the media playlist and, through EXT-X-SESSION-DATA, at chapters.json
+(Apple HLS chapter JSON), which is rewritten every time a chapter is added.
+"""
+import os
+import json
+import glob
+import subprocess
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from database_builder.pipeline.ffmpeg_tools import get_ffmpeg_exe
+from pcm_stream import SAMPLE_RATE, MP3_BITRATE
+
+HLS_SEGMENT_SEC = float(os.environ.get("PODCAST_HLS_SEGMENT_SEC", "6"))
+AAC_BITRATE = "128k"
+MEDIA_PLAYLIST = "episode.m3u8"
+MASTER_PLAYLIST = "master.m3u8"
+CHAPTERS_FILE = "chapters.json"
+INIT_SEGMENT = "init.mp4"
+CHAPTER_LANGUAGE = "zh"
+
+def _atomic_write(path: str, text: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def write_master_playlist(out_dir: str, bitrate: str = AAC_BITRATE):
+    bandwidth = int(bitrate.rstrip("k")) * 1000 + 8000  # + fMP4 container overhead
+    _atomic_write(os.path.join(out_dir, MASTER_PLAYLIST), "\n".join([
+        "#EXTM3U",
+        "#EXT-X-VERSION:7",
+        "#EXT-X-INDEPENDENT-SEGMENTS",
+        f'#EXT-X-SESSION-DATA:DATA-ID="com.apple.hls.chapters",URI="{CHAPTERS_FILE}"',
+        f'#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},CODECS="mp4a.40.2"',
+        MEDIA_PLAYLIST,
+        "",
+    ]))
+
+def write_chapters(out_dir: str, chapters: List[Dict[str, Any]], total_sec: Optional[float] = None):
+    """[{title, start_sec}] -> chapters.json. The last chapter gets a duration once the total is known."""
+    entries = []
+    for n, chapter in enumerate(chapters):
+        end = chapters[n + 1]["start_sec"] if n + 1 < len(chapters) else total_sec
+        entry = {"chapter": n + 1, "start-time": chapter["start_sec"],
+                 "titles": [{"language": CHAPTER_LANGUAGE, "title": chapter["title"]}]}
+        if end is not None:
+            entry["duration"] = round(end - chapter["start_sec"], 3)
+        entries.append(entry)
+    _atomic_write(os.path.join(out_dir, CHAPTERS_FILE), json.dumps(entries, ensure_ascii=False, indent=1))
+
+class HLSEncoder:
+    """write() float32 mono blocks; segments and the playlist appear on disk as they are encoded."""
+
+    def __init__(self, out_dir: str, sample_rate: int = SAMPLE_RATE, mp3_path: Optional[str] = None,
+                 segment_sec: float = HLS_SEGMENT_SEC, bitrate: str = AAC_BITRATE):
+        self.out_dir = out_dir
+        self.sample_rate = sample_rate
+        self.samples_written = 0
+        os.makedirs(out_dir, exist_ok=True)
+        # Stale segments from an earlier run would otherwise sit next to the new playlist
+        for pattern in ("seg_*.m4s", INIT_SEGMENT, MEDIA_PLAYLIST, CHAPTERS_FILE):
+            for path in glob.glob(os.path.join(out_dir, pattern)):
+                os.remove(path)
+
+        cmd = [get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y",
+               "-f", "f32le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+               "-map", "0:a", "-c:a", "aac", "-b:a", bitrate,
+               "-f", "hls", "-hls_time", str(segment_sec), "-hls_playlist_type", "event",
+               "-hls_segment_type", "fmp4", "-hls_fmp4_init_filename", INIT_SEGMENT,
+               "-hls_flags", "independent_segments",
+               "-hls_segment_filename", os.path.join(out_dir, "seg_%05d.m4s"),
+               os.path.join(out_dir, MEDIA_PLAYLIST)]
+        if mp3_path:
+            cmd += ["-map", "0:a", "-c:a", "libmp3lame", "-b:a", MP3_BITRATE, mp3_path]
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        write_master_playlist(out_dir, bitrate)
+        write_chapters(out_dir, [])
+
+    def write(self, samples: np.ndarray):
+        if samples.size:
+            self.process.stdin.write(samples.astype("<f4").tobytes())
+            self.samples_written += samples.size
+
+    @property
+    def duration(self) -> float:
+        return self.samples_written / self.sample_rate
+
+    def close(self):
+        self.process.stdin.close()
+        stderr = self.process.stderr.read().decode("utf-8", errors="replace")
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg HLS encoder failed: {stderr.strip()[-300:]}")
+
+    def abort(self):
+        self.process.kill()
+        self.process.wait()
@@ -0,0 +1,117 @@
+"""
+Streaming PCM assembly: raw TTS audio goes straight into one ffmpeg encoder over stdin.
+
+The TTS server's `media_type: raw` output is headerless s16le mono PCM. Lines finish out of
+order when synthesized concurrently, so `OrderedPCMWriter` holds finished lines only until every
+earlier line has arrived, then pushes the contiguous prefix into the encoder. No per-line WAV,
+no concat list, one encode pass.
+"""
+import io
+import wave
+import threading
+import subprocess
+from typing import Dict, Optional
+
+import numpy as np
+
+# Importers put the repo root on sys.path (see full_podcast_synth.py)
+from database_builder.pipeline.ffmpeg_tools import get_ffmpeg_exe
+
+SAMPLE_RATE = 32000
+MP3_BITRATE = "192k"
+
+def pcm_to_array(data: bytes) -> np.ndarray:
+    """Raw s16le bytes -> int16 samples (a trailing odd byte from a cut stream is dropped)."""
+    usable = len(data) - (len(data) % 2)
+    return np.frombuffer(data[:usable], dtype="<i2")
+
+def wav_to_array(data: bytes) -> tuple:
+    """WAV bytes -> (int16 mono samples, sample_rate). Stereo is folded to mono."""
+    with wave.open(io.BytesIO(data), "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"expected 16-bit WAV, got {wav.getsampwidth() * 8}-bit")
+        channels = wav.getnchannels()
+        rate = wav.getframerate()
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype="<i2")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1).astype(np.int16)
+    return samples, rate
+
+class StreamingEncoder:
+    """One ffmpeg process reading s16le mono PCM from stdin and writing the final file."""
+
+    def __init__(self, output_path: str, sample_rate: int = SAMPLE_RATE, bitrate: str = MP3_BITRATE):
+        self.output_path = output_path
+        self.sample_rate = sample_rate
+        self.samples_written = 0
+        cmd = [
+            get_ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error",
+            "-f", "s16le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+            "-b:a", bitrate, output_path,
+        ]
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def write(self, samples: np.ndarray):
+        if samples.size:
+            self.process.stdin.write(np.ascontiguousarray(samples, dtype="<i2").tobytes())
+            self.samples_written += samples.size
+
+    def write_silence(self, seconds: float):
+        if seconds > 0:
+            self.write(np.zeros(int(seconds * self.sample_rate), dtype=np.int16))
+
+    @property
+    def duration(self) -> float:
+        return self.samples_written / self.sample_rate
+
+    def close(self):
+        self.process.stdin.close()
+        stderr = self.process.stderr.read().decode("utf-8", errors="replace")
+        if self.process.wait() != 0:
+            raise RuntimeError(f"ffmpeg encoder failed: {stderr.strip()[-300:]}")
+
+    def abort(self):
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+class OrderedPCMWriter:
+    """
+    Accepts lines in completion order (from worker threads), writes them to the encoder in script order.
+    A failed line is submitted as None and simply leaves no audio behind.
+    """
+
+    def __init__(self, encoder: StreamingEncoder, total: int, gap_sec: float = 0.0):
+        self.encoder = encoder
+        self.total = total
+        self.gap_sec = gap_sec
+        self.next_index = 0
+        self.written = 0
+        self._pending: Dict[int, Optional[np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, index: int, samples: Optional[np.ndarray]):
+        with self._lock:
+            self._pending[index] = samples
+            while self.next_index in self._pending:
+                chunk = self._pending.pop(self.next_index)
+                self.next_index += 1
+                if chunk is None or not chunk.size:
+                    continue
+                if self.written:
+                    self.encoder.write_silence(self.gap_sec)
+                self.encoder.write(chunk)
+                self.written += 1
+
+    @property
+    def complete(self) -> bool:
+        return self.next_index >= self.total
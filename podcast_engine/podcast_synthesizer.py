@@ -1,67 +1,99 @@
 import json
 import os
-import subprocess
 import sys
 import io
+import shutil
+
+from clip_cache import ClipCache, clip_key
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(SCRIPT_DIR, ".."))
+from edge_tts_batch import run_batch
+from text_segmenter import SEGMENT_MAX_CHARS
 
 # Force utf-8 for terminal output
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
 VOICE_HOST = "zh-CN-YunjianNeural"
 VOICE_GUEST = "zh-CN-XiaoxiaoNeural"
+TTS_ENGINE = "edge-tts"
 
-def generate_podcast_audio(json_file):
+def generate_podcast_audio(json_file, out_dir=os.path.join(SCRIPT_DIR, "audio_clips")):
     with open(json_file, 'r', encoding='utf-8') as f:
         dialogues = json.load(f)
 
-    out_dir = r"c:\work\code\todayInHistory\podcast_engine\audio_clips"
     os.makedirs(out_dir, exist_ok=True)
-    
+
+    # Unchanged lines are copied from the clip cache instead of calling edge-tts again
+    cache = ClipCache()
+
+    clips = []
+    print(f"=== Synthesizing {len(dialogues)} clips ===")
+    for i, line in enumerate(dialogues):
+        role = line["role"]
+        text = line["text"]
+        emotion = line["emotion"]
+        rate = line.get("rate", "+0%")
+        pitch = line.get("pitch", "+0Hz")
+
+        idx = f"{i+1:03d}"
+
+        if role == "host":
+            voice = VOICE_HOST
+        elif role == "guest":
+            voice = VOICE_GUEST
+        elif role.startswith("sys_inject_"):
+            voice = "zh-CN-YunxiNeural"
+            text = f"【系统提示：此处接入外挂模块。{text}】"
+            rate, pitch = "+0%", "+0Hz"
+        else:
+            continue
+
+        file_name = f"{idx}_{role}_{emotion}.mp3"
+        clip = {
+            "idx": idx, "role": role, "file_name": file_name,
+            "key": clip_key(TTS_ENGINE, voice, text, rate, extra={"pitch": pitch, "segment_max_chars": SEGMENT_MAX_CHARS}),
+            "request": {"text": text, "output_file": os.path.join(out_dir, file_name),
+                        "voice": voice, "rate": rate, "pitch": pitch},
+        }
+        cached_path = cache.lookup(clip["key"])
+        if cached_path:
+            shutil.copyfile(cached_path, clip["request"]["output_file"])
+            clip["ok"] = True
+            print(f"[{idx}/{len(dialogues)}] Cached {role}: {text[:30]}...")
+        clips.append(clip)
+
+    # Everything not cached is synthesized in-process, several lines at a time
+    pending = [clip for clip in clips if not clip.get("ok")]
+
+    def on_done(k, error):
+        clip = pending[k]
+        if error:
+            print(f"Failed edge-tts on clip {clip['idx']}: {error}")
+            return
+        clip["ok"] = True
+        request = clip["request"]
+        cache.put_file(clip["key"], request["output_file"], engine=TTS_ENGINE, voice_id=request["voice"],
+                       text=request["text"][:60])
+        print(f"[{clip['idx']}/{len(dialogues)}] Generated {clip['role']}: {request['text'][:30]}...")
+
+    if pending:
+        run_batch([clip["request"] for clip in pending], on_done=on_done)
+    cache.save()
+
     playlist_path = os.path.join(out_dir, "00_PLAYLIST.m3u")
     with open(playlist_path, 'w', encoding='utf-8') as m3u:
         m3u.write("#EXTM3U\n")
+        for clip in clips:
+            if clip.get("ok"):
+                m3u.write(f"{clip['file_name']}\n")
 
-        print(f"=== Synthesizing {len(dialogues)} clips ===")
-        for i, line in enumerate(dialogues):
-            role = line["role"]
-            text = line["text"]
-            emotion = line["emotion"]
-            
-            idx = f"{i+1:03d}"
-            
-            if role == "host":
-                voice = VOICE_HOST
-            elif role == "guest":
-                voice = VOICE_GUEST
-            elif role.startswith("sys_inject_"):
-                voice = "zh-CN-YunxiNeural"
-                text = f"【系统提示：此处接入外挂模块。{text}】"
-            else:
-                continue
-
-            file_name = f"{idx}_{role}_{emotion}.mp3"
-            file_path = os.path.join(out_dir, file_name)
-            
-            print(f"[{idx}/{len(dialogues)}] Generating {role}: {text[:30]}...")
-            
-            cmd = [
-                "python", "-m", "edge_tts",
-                "--voice", voice,
-                "--text", text,
-                "--write-media", file_path
-            ]
-            
-            try:
-                subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                m3u.write(f"{file_name}\n")
-            except Exception as e:
-                print(f"Failed edge-tts on clip {idx}: {e}")
-
-    print(f"\nAll Audio Clips Synthesized in {out_dir}")
+    print(f"\nAll Audio Clips Synthesized in {out_dir} "
+          f"({cache.stats['hits']} from clip cache, {len(pending)} synthesized)")
     print(f"You can double-click {os.path.abspath(playlist_path)} in VLC/Windows Media Player to hear the full conversation flow!")
 
 if __name__ == "__main__":
-    draft_file = r"c:\work\code\todayInHistory\podcast_engine\podcast_draft.json"
+    draft_file = os.path.join(SCRIPT_DIR, "podcast_draft.json")
     if os.path.exists(draft_file):
         generate_podcast_audio(draft_file)
     else:
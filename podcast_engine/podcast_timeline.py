@@ -0,0 +1,174 @@
+"""
+Turns podcast_draft.json plus synthesized speech into an audio_mixer timeline.
+
+Dialogue lines become ducking speech clips separated by a short gap. sys_inject_* lines
+are replaced by the asset their placeholder names in inject_assets.json: songs are
+crossfaded in and out, ads and Q&A segments get a longer pause around them. A placeholder
+without an asset on disk is skipped with a warning, as before.
+
+build_timeline works on a finished set of lines (whole-episode mix); TimelineStreamer puts
+lines on a StreamingMixer as they arrive (incremental HLS output, see hls_stream.py).
+"""
+import os
+import re
+import sys
+import json
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set
+
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(SCRIPT_DIR, ".."))
+from audio_mixer import clip_event, decode_audio, pcm16_to_float, DEFAULT_SETTINGS
+from loudness import normalization_gain_db
+
+INJECT_ASSETS_FILE = os.path.join(SCRIPT_DIR, "inject_assets.json")
+PLACEHOLDER_RE = re.compile(r'\[([A-Z0-9_]+)\]')
+
+def load_inject_assets(path: str = INJECT_ASSETS_FILE) -> Dict[str, Dict[str, Any]]:
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return {k: v for k, v in json.load(f).items() if not k.startswith("_")}
+
+class SpeechCollector:
+    """Same submit() interface as pcm_stream.OrderedPCMWriter, but keeps every line for mixing."""
+
+    def __init__(self):
+        self.clips: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, index: int, samples: Optional[np.ndarray]):
+        if samples is not None and samples.size:
+            with self._lock:
+                self.clips[index] = samples
+
+    @property
+    def written(self) -> int:
+        return len(self.clips)
+
+def speech_event(index: int, role: str, samples: np.ndarray, prev_kind: Optional[str],
+                 s: Dict[str, float], gain_db: float = 0.0) -> Dict[str, Any]:
+    return clip_event(
+        pcm16_to_float(samples), kind="speech", duck=True, label=f"{index+1:03d}_{role}", gain_db=gain_db,
+        gap_sec=s["asset_gap_sec"] if prev_kind in ("ad", "qa") else s["speech_gap_sec"],
+        crossfade_sec=s["crossfade_sec"] if prev_kind == "song" else 0.0,
+    )
+
+def inject_event(index: int, line: Dict[str, Any], sample_rate: int, s: Dict[str, float],
+                 assets: Dict[str, Dict[str, Any]], target_lufs: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """The asset a sys_inject_* line stands for, as a timeline event (None if it has no asset on disk)."""
+    role = line.get("role", "")
+    kind = role[len("sys_inject_"):]
+    match = PLACEHOLDER_RE.search(line.get("text", ""))
+    spec = assets.get(match.group(1)) if match else None
+    path = os.path.join(SCRIPT_DIR, spec["path"]) if spec else None
+    if not path or not os.path.exists(path):
+        print(f"  [{index+1:02d}] ⚠️ No asset for {line.get('text', role)}, skipping injection")
+        return None
+
+    samples = decode_audio(path, sample_rate, spec.get("max_seconds"))
+    gain_db = spec.get("gain_db", 0.0)
+    if target_lufs is not None:
+        gain_db += normalization_gain_db(samples, sample_rate, target_lufs)
+    print(f"  [{index+1:02d}] 🎵 Spliced {kind} asset {spec['path']}")
+    event = clip_event(
+        samples, kind=kind, duck=kind != "song", gain_db=gain_db, label=f"{index+1:03d}_{role}",
+        gap_sec=s["asset_gap_sec"], crossfade_sec=s["crossfade_sec"] if kind == "song" else 0.0,
+    )
+    event["title"] = spec.get("title", match.group(1))
+    return event
+
+def build_timeline(dialogues: List[Dict[str, Any]], speech: Dict[int, np.ndarray], sample_rate: int,
+                   settings: Optional[Dict[str, float]] = None,
+                   inject_assets: Optional[Dict[str, Dict[str, Any]]] = None,
+                   speech_gain_db: Optional[Dict[int, float]] = None,
+                   target_lufs: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    `speech` maps draft line index -> int16 PCM of that line, `speech_gain_db` its loudness
+    normalization gain. With `target_lufs`, injected assets are normalized to it too (their
+    `gain_db` then offsets from the target). Returns timeline events in draft order.
+    """
+    speech_gain_db = speech_gain_db or {}
+    s = {**DEFAULT_SETTINGS, **(settings or {})}
+    assets = load_inject_assets() if inject_assets is None else inject_assets
+    events = []
+    prev_kind = None
+    for i, line in enumerate(dialogues):
+        role = line.get("role", "")
+        if i in speech:
+            events.append(speech_event(i, role, speech[i], prev_kind, s, speech_gain_db.get(i, 0.0)))
+            prev_kind = "speech"
+        elif role.startswith("sys_inject_"):
+            event = inject_event(i, line, sample_rate, s, assets, target_lufs)
+            if event:
+                events.append(event)
+                prev_kind = event["kind"]
+    return events
+
+class TimelineStreamer:
+    """
+    Same submit() interface as SpeechCollector, but feeds a StreamingMixer: as soon as every
+    earlier voiced line has arrived (or failed), the next lines and sys_inject assets go onto the
+    timeline, leveled one by one to `target_lufs`. Lines are dropped once mixed.
+
+    Chapters ({title, start_sec}) open at the first line, at every spliced asset and at the
+    line that follows it; `on_chapters(chapters)` fires whenever one is added.
+    """
+
+    def __init__(self, dialogues: List[Dict[str, Any]], voiced: Set[int], mixer, sample_rate: int,
+                 settings: Optional[Dict[str, float]] = None,
+                 inject_assets: Optional[Dict[str, Dict[str, Any]]] = None,
+                 target_lufs: Optional[float] = None,
+                 on_chapters: Optional[Callable[[List[Dict[str, Any]]], None]] = None):
+        self.dialogues = dialogues
+        self.voiced = voiced
+        self.mixer = mixer
+        self.sample_rate = sample_rate
+        self.s = {**DEFAULT_SETTINGS, **(settings or {})}
+        self.assets = load_inject_assets() if inject_assets is None else inject_assets
+        self.target_lufs = target_lufs
+        self.on_chapters = on_chapters
+        self.chapters: List[Dict[str, Any]] = []
+        self.written = 0
+        self._arrived: Dict[int, Optional[np.ndarray]] = {}
+        self._next = 0
+        self._prev_kind: Optional[str] = None
+        self._parts = 0
+        self._lock = threading.Lock()
+
+    def submit(self, index: int, samples: Optional[np.ndarray]):
+        with self._lock:
+            self._arrived[index] = samples
+            self._advance()
+
+    def _chapter(self, title: str, start_sec: float):
+        self.chapters.append({"title": title, "start_sec": round(start_sec, 3)})
+        if self.on_chapters:
+            self.on_chapters(self.chapters)
+
+    def _advance(self):
+        while self._next < len(self.dialogues):
+            i, line = self._next, self.dialogues[self._next]
+            role = line.get("role", "")
+            if i in self.voiced:
+                if i not in self._arrived:
+                    return
+                samples = self._arrived.pop(i)
+                if samples is not None and samples.size:
+                    gain_db = normalization_gain_db(pcm16_to_float(samples), self.sample_rate, self.target_lufs) \
+                        if self.target_lufs is not None else 0.0
+                    start = self.mixer.add(speech_event(i, role, samples, self._prev_kind, self.s, gain_db))
+                    if start is not None and (not self.chapters or self._prev_kind not in (None, "speech")):
+                        self._parts += 1
+                        self._chapter(f"第{self._parts}部分", start)
+                    self._prev_kind = "speech"
+                    self.written += 1
+            elif role.startswith("sys_inject_"):
+                event = inject_event(i, line, self.sample_rate, self.s, self.assets, self.target_lufs)
+                start = self.mixer.add(event) if event else None
+                if start is not None:
+                    self._chapter(event["title"], start)
+                    self._prev_kind = event["kind"]
+            self._next += 1
@@ -5,15 +5,15 @@ import json
 import google.generativeai as genai
 from dotenv import load_dotenv
 
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.join(SCRIPT_DIR, "..")
+DRAFT_FILE = os.path.join(SCRIPT_DIR, "podcast_draft.json")
 
-load_dotenv(r'c:\work\code\todayInHistory\.env')
+load_dotenv(os.path.join(ROOT_DIR, '.env'))
 genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
 
-def generate_podcast_script(raw_text_path):
-    with open(raw_text_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-
+def generate_podcast_draft(content):
+    """Long-form source text -> list of podcast lines ({role, voice_profile, pitch, rate, text})."""
     system_prompt = """
     You are an elite podcast producer and scriptwriter.
     Your task is to take a long, dry factual text about a historical stock market legend and adapt it into a highly engaging, interactive, and thrilling TWO-PERSON podcast script.
@@ -48,22 +48,31 @@ def generate_podcast_script(raw_text_path):
         )
     )
 
-    out_file = r'c:\work\code\todayInHistory\podcast_engine\podcast_draft.json'
-    
     # Clean possible markdown JSON wrappers
     final_text = response.text.strip()
     if final_text.startswith('```json'):
         final_text = final_text[7:]
     if final_text.endswith('```'):
         final_text = final_text[:-3]
-        
+
+    dialogues = json.loads(final_text)
+    if not isinstance(dialogues, list) or not dialogues:
+        raise ValueError("Gemini did not return a JSON list of podcast lines")
+    return dialogues
+
+def generate_podcast_script(raw_text_path, out_file=DRAFT_FILE):
+    with open(raw_text_path, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    dialogues = generate_podcast_draft(content)
     with open(out_file, 'w', encoding='utf-8') as f:
-        f.write(final_text)
+        json.dump(dialogues, f, ensure_ascii=False, indent=4)
     
     print(f'Success! Generated structured podcast script at {os.path.abspath(out_file)}')
 
 if __name__ == "__main__":
-    test_file = r'c:\work\code\todayInHistory\data\final_scripts_stocks\赵老哥_八年一万倍的股市传奇.txt'
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    test_file = os.path.join(ROOT_DIR, 'data', 'final_scripts_stocks', '赵老哥_八年一万倍的股市传奇.txt')
     if os.path.exists(test_file):
         generate_podcast_script(test_file)
     else:
@@ -0,0 +1,130 @@
+"""
+Local stand-in for the remote /tts server, for exercising the podcast synthesis pipeline offline.
+
+Returns a synthetic mono 16-bit WAV (or, for `media_type: raw`, chunked headerless PCM)
+whose length follows the text length (and speed_factor),
+with a tone pitched per voice_id. Latency and a random failure rate can be injected to test
+concurrency, retries and ordering.
+
+    python stub_tts_server.py --port 13002 --latency 0.8 --fail-rate 0.1
+    set PODCAST_TTS_URL=http://127.0.0.1:13002/tts
+"""
+import io
+import sys
+import json
+import math
+import time
+import wave
+import struct
+import random
+import zlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CHARS_PER_SECOND = 4.5
+
+def synth_pcm(text: str, voice_id: str, speed_factor: float = 1.0, sample_rate: int = 32000) -> bytes:
+    """Deterministic tone as raw s16le mono PCM: same request, same bytes (handy for cache tests)."""
+    seconds = max(0.3, len(text) / CHARS_PER_SECOND / max(speed_factor, 0.1))
+    frequency = 180 + zlib.crc32(voice_id.encode("utf-8")) % 220
+    frames = int(seconds * sample_rate)
+    samples = (
+        int(6000 * math.sin(2 * math.pi * frequency * n / sample_rate) * min(1.0, n / 800, (frames - n) / 800))
+        for n in range(frames)
+    )
+    return struct.pack(f"<{frames}h", *samples)
+
+def synth_wav(text: str, voice_id: str, speed_factor: float = 1.0, sample_rate: int = 32000) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(synth_pcm(text, voice_id, speed_factor, sample_rate))
+    return buf.getvalue()
+
+class StubTTSHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive + chunked transfer, like the real server
+    latency = 0.0
+    fail_rate = 0.0
+    stats = {"requests": 0, "in_flight": 0, "max_in_flight": 0}
+    stats_lock = threading.Lock()
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_chunked(self, pcm: bytes, streaming: bool, chunk_size: int = 8000):
+        """Raw PCM as a chunked body; in streaming mode chunks trickle out like real-time inference."""
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/L16")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for start in range(0, len(pcm), chunk_size):
+            chunk = pcm[start:start + chunk_size]
+            self.wfile.write(f"{len(chunk):X}\r\n".encode("ascii") + chunk + b"\r\n")
+            if streaming:
+                time.sleep(0.002)
+        self.wfile.write(b"0\r\n\r\n")
+
+    def do_POST(self):
+        if self.path.rstrip("/") != "/tts":
+            self.send_error(404)
+            return
+        with self.stats_lock:
+            self.stats["requests"] += 1
+            self.stats["in_flight"] += 1
+            self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.stats["in_flight"])
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            if self.latency:
+                time.sleep(self.latency * (0.5 + random.random()))
+            if random.random() < self.fail_rate:
+                self.send_error(503, "stub: injected failure")
+                return
+            args = (
+                payload.get("text", ""),
+                payload.get("voice_id", ""),
+                float(payload.get("speed_factor", 1.0)),
+                int(payload.get("sample_rate", 32000)),
+            )
+            if payload.get("media_type") == "raw":
+                self._send_chunked(synth_pcm(*args), streaming=bool(payload.get("streaming_mode")))
+                return
+            body = synth_wav(*args)
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/wav")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with self.stats_lock:
+                self.stats["in_flight"] -= 1
+
+def start_server(port: int = 0, latency: float = 0.0, fail_rate: float = 0.0) -> ThreadingHTTPServer:
+    """Start the stub on a background thread (port 0 = any free port). Returns the server."""
+    StubTTSHandler.latency = latency
+    StubTTSHandler.fail_rate = fail_rate
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubTTSHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stub TTS server returning synthetic WAV")
+    parser.add_argument("--port", type=int, default=13002)
+    parser.add_argument("--latency", type=float, default=0.5, help="mean seconds per request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    args = parser.parse_args()
+
+    server = start_server(args.port, args.latency, args.fail_rate)
+    print(f"Stub TTS listening on http://127.0.0.1:{server.server_address[1]}/tts "
+          f"(latency ~{args.latency}s, fail rate {args.fail_rate:.0%})")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print(f"\nServed {StubTTSHandler.stats['requests']} requests "
+              f"(max {StubTTSHandler.stats['max_in_flight']} concurrent)")
+        server.shutdown()
+        sys.exit(0)
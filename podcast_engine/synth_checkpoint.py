@@ -0,0 +1,111 @@
+"""
+Checkpoint manifest for one podcast synthesis run.
+
+Records, per draft line, its status (pending / done / failed), clip hash (the clip_cache key),
+duration and last error, rewritten atomically after every line. The audio itself lives in
+the clip cache, so a run that dies halfway loses nothing: the next run reuses every `done`
+line, synthesizes only the missing/failed ones and reassembles.
+
+    python synth_checkpoint.py <manifest.json>     # print a run's status
+"""
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+def file_sha256(path: str) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+class SynthCheckpoint:
+    def __init__(self, path: str, draft_path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self.data: Dict[str, Any] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.data = json.load(f)
+            except json.JSONDecodeError:
+                self.data = {}
+        self.data.setdefault("lines", {})
+        self.data["draft"] = os.path.abspath(draft_path)
+        self.data["draft_sha256"] = file_sha256(draft_path)
+
+    def get(self, index: int) -> Optional[Dict[str, Any]]:
+        return self.data["lines"].get(str(index))
+
+    def is_done(self, index: int, clip_key: str) -> bool:
+        """True if this line already finished with exactly this clip (an edited line has a new key)."""
+        entry = self.get(index)
+        return bool(entry and entry["status"] == STATUS_DONE and entry["clip_key"] == clip_key)
+
+    def mark(self, index: int, status: str, clip_key: str, role: str = "", duration_sec: Optional[float] = None,
+             error: Optional[str] = None):
+        with self._lock:
+            previous = self.data["lines"].get(str(index)) or {}
+            self.data["lines"][str(index)] = {
+                "role": role or previous.get("role", ""),
+                "status": status,
+                "clip_key": clip_key,
+                "duration_sec": round(duration_sec, 3) if duration_sec is not None else None,
+                "error": error,
+                "attempts": previous.get("attempts", 0) + (status != STATUS_PENDING),
+                "updated_at": time.time(),
+            }
+            self._save()
+
+    def retain(self, indices):
+        """Forget lines that are no longer in the draft (e.g. deleted lines)."""
+        keep = {str(i) for i in indices}
+        with self._lock:
+            self.data["lines"] = {k: v for k, v in self.data["lines"].items() if k in keep}
+            self._save()
+
+    def set_output(self, output_path: str, complete: bool, duration_sec: float):
+        with self._lock:
+            self.data["output"] = {"path": output_path, "complete": complete,
+                                   "duration_sec": round(duration_sec, 3), "written_at": time.time()}
+            self._save()
+
+    def counts(self) -> Dict[str, int]:
+        counts = {STATUS_PENDING: 0, STATUS_DONE: 0, STATUS_FAILED: 0}
+        for entry in self.data["lines"].values():
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        return counts
+
+    def _save(self):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+def print_status(path: str):
+    if not os.path.exists(path):
+        print(f"No checkpoint at {path}")
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    lines = data.get("lines", {})
+    done = [e for e in lines.values() if e["status"] == STATUS_DONE]
+    print(f"Draft: {data.get('draft')}")
+    print(f"{len(done)}/{len(lines)} lines done, {sum(e['duration_sec'] or 0 for e in done) / 60:.1f} min of speech")
+    for index, entry in sorted(lines.items(), key=lambda kv: int(kv[0])):
+        if entry["status"] != STATUS_DONE:
+            print(f"  [{int(index) + 1:02d}] {entry['role']}: {entry['status']} {entry.get('error') or ''}")
+    if data.get("output"):
+        out = data["output"]
+        print(f"Last export: {out['path']} ({'complete' if out['complete'] else 'PARTIAL'}, {out['duration_sec'] / 60:.1f} min)")
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print("Usage: python synth_checkpoint.py <manifest.json>")
+        sys.exit(1)
+    print_status(sys.argv[1])
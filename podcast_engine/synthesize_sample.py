@@ -14,17 +14,22 @@ def install_requirements():
 install_requirements()
 import imageio_ffmpeg
 
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(SCRIPT_DIR, ".."))
+from edge_tts_batch import run_batch
+
 sys.stdout = open(sys.stdout.fileno(), mode='w', encoding='utf8', buffering=1)
 ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
 
-draft_file = r"c:\work\code\todayInHistory\podcast_engine\podcast_draft.json"
-out_dir = r"c:\work\code\todayInHistory\podcast_engine\sample_clips"
+draft_file = os.path.join(SCRIPT_DIR, "podcast_draft.json")
+out_dir = os.path.join(SCRIPT_DIR, "sample_clips")
 os.makedirs(out_dir, exist_ok=True)
 
 with open(draft_file, 'r', encoding='utf-8') as f:
     dialogues = json.load(f)[:10]
 
-valid_clips = []
+# Synthesized in-process and concurrently (see edge_tts_batch.py) rather than one edge_tts subprocess per line
+items = []
 for i, line in enumerate(dialogues):
     role = line.get("role")
     text = line.get("text", "")
@@ -35,20 +40,15 @@ for i, line in enumerate(dialogues):
     if role not in ["host", "guest"]:
         continue
         
-    clean_text = re.sub(r'<[^>]+>', '', text)
+    # Inline <break>/<prosody> tags are honoured by the segmenter (see text_segmenter.py)
     file_path = os.path.join(out_dir, f"{i}.mp3")
-    
-    cmd = [
-        sys.executable, "-m", "edge_tts",
-        "--voice", voice,
-        "--rate", rate,
-        "--pitch", pitch,
-        "--text", clean_text,
-        "--write-media", file_path
-    ]
-    print(f"Generating block {i} ({voice}, {rate}): {clean_text[:30]}...")
-    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    valid_clips.append(file_path)
+    print(f"Generating block {i} ({voice}, {rate}): {re.sub(r'<[^>]+>', '', text)[:30]}...")
+    items.append({"text": text, "output_file": file_path, "voice": voice, "rate": rate, "pitch": pitch})
+
+results = run_batch(items, on_done=lambda k, error: error and print(f"Failed block {items[k]['output_file']}: {error}"))
+if not all(results):
+    sys.exit("❌ Some sample blocks failed to synthesize.")
+valid_clips = [item["output_file"] for item in items]
 
 print("Concatenating clips with FFmpeg...")
 concat_file = os.path.join(out_dir, "concat.txt")
@@ -58,7 +58,7 @@ with open(concat_file, "w", encoding="utf-8") as f:
         # using absolute paths with single quotes is fine in concat demuxer
         f.write(f"file '{clip.replace(os.sep, '/')}'\n")
 
-output_mp3 = r"c:\work\code\todayInHistory\podcast_engine\podcast_sample.mp3"
+output_mp3 = os.path.join(SCRIPT_DIR, "podcast_sample.mp3")
 os.makedirs(os.path.dirname(output_mp3), exist_ok=True)
 
 concat_cmd = [
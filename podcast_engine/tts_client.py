@@ -0,0 +1,133 @@
+"""
+Pooled TTS client for the custom GPT-SoVITS style /tts endpoint.
+
+One requests.Session (keep-alive connection pool) shared by a bounded thread pool,
+with per-request retries + exponential backoff, and results handed back in the
+original line order regardless of which request finished first.
+"""
+import os
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+TTS_URL = os.environ.get("PODCAST_TTS_URL", "http://101.227.82.130:13002/tts")
+TTS_CONCURRENCY = int(os.environ.get("PODCAST_TTS_CONCURRENCY", "6"))
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 90
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 20.0
+
+# Status codes worth retrying: the server is busy/restarting, not rejecting the request
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+DEFAULT_PAYLOAD = {
+    "text_lang": "zh",
+    "ref_audio_path": "voice/张舒怡.wav",
+    "prompt_lang": "zh",
+    "aux_ref_audio_paths": [],
+    "top_k": 30,
+    "top_p": 1,
+    "temperature": 1,
+    "text_split_method": "cut5",
+    "batch_size": 32,
+    "batch_threshold": 0.75,
+    "split_bucket": True,
+    "media_type": "wav",
+    "streaming_mode": False,
+    "seed": 100,
+    "parallel_infer": True,
+    "repetition_penalty": 1.35,
+    "sample_steps": 32,
+    "super_sampling": False,
+    "sample_rate": 32000,
+    "fragment_interval": 0.01,
+}
+
+class TTSError(Exception):
+    pass
+
+def build_payload(voice_id: str, text: str, speed_factor: float = 1.0, **overrides) -> Dict[str, Any]:
+    payload = dict(DEFAULT_PAYLOAD)
+    payload.update({"text": text, "speed_factor": speed_factor, "voice_id": voice_id})
+    payload.update(overrides)
+    return payload
+
+class TTSClient:
+    def __init__(self, url: str = TTS_URL, concurrency: int = TTS_CONCURRENCY, max_retries: int = MAX_RETRIES):
+        self.url = url
+        self.concurrency = max(1, concurrency)
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        # Pool as many keep-alive connections as there are workers, so no request waits for a socket
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+        self.stats = {"requests": 0, "retries": 0, "failures": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def synthesize(self, voice_id: str, text: str, speed_factor: float = 1.0, raw: bool = False, **overrides) -> bytes:
+        """
+        POST one line, retrying transient failures with exponential backoff + jitter. Returns the audio bytes.
+        raw=True asks for headerless streaming PCM (s16le mono at the payload's sample_rate), read chunk by chunk.
+        """
+        if raw:
+            overrides = {"media_type": "raw", "streaming_mode": True, **overrides}
+        payload = build_payload(voice_id, text, speed_factor, **overrides)
+        last_error = None
+        for attempt in range(self.max_retries + 1):
+            if attempt:
+                self._count("retries")
+                delay = min(BACKOFF_MAX, BACKOFF_BASE * (2 ** (attempt - 1)))
+                time.sleep(delay * (0.5 + random.random() / 2))
+            self._count("requests")
+            try:
+                with self.session.post(self.url, json=payload, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT), stream=raw) as resp:
+                    if resp.status_code == 200:
+                        audio = b"".join(resp.iter_content(chunk_size=64 * 1024)) if raw else resp.content
+                        if audio:
+                            return audio
+                    last_error = f"HTTP {resp.status_code}: {resp.text[:80]}"
+                    if resp.status_code not in RETRY_STATUSES:
+                        break
+            except requests.RequestException as e:
+                # Connection refused/reset, timeouts, or a stream cut off half way: all worth a retry
+                last_error = f"{type(e).__name__}: {e}"
+        self._count("failures")
+        raise TTSError(last_error)
+
+    def synthesize_many(self, requests_list: List[Dict[str, Any]],
+                        on_done: Optional[Callable[[int, Optional[bytes], Optional[str]], None]] = None) -> List[Optional[bytes]]:
+        """
+        Synthesize many lines concurrently (at most `concurrency` in flight).
+        Each item is a dict of synthesize() kwargs. Returns audio in input order; failed lines are None.
+        `on_done(index, audio, error)` is called as each line completes (from worker threads).
+        """
+        results: List[Optional[bytes]] = [None] * len(requests_list)
+
+        def work(index: int):
+            try:
+                audio = self.synthesize(**requests_list[index])
+                results[index] = audio
+                error = None
+            except TTSError as e:
+                audio, error = None, str(e)
+            if on_done:
+                on_done(index, audio, error)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            list(pool.map(work, range(len(requests_list))))
+        return results
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The pipeline modules import each other as top-level modules (see the sys.path lines at their top)
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+for sub in ("", "database_builder/pipeline", "database_builder/db", "database_builder/cleaner",
+            "database_builder/scrapers", "podcast_engine"):
+    path = os.path.normpath(os.path.join(ROOT_DIR, sub))
+    if path not in sys.path:
+        sys.path.insert(0, path)
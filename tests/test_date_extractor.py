@@ -0,0 +1,26 @@
+from date_extractor import extract_dates
+
+
+def _dates(text):
+    return [(c["year"], c["month"], c["day"]) for c in extract_dates(text)]
+
+
+def test_event_lines_are_kept():
+    text = ("March 1, 1973 – The first Ethernet memo is written.\n"
+            "1981: On August 12 IBM introduces the IBM PC.\n"
+            "\"Pong\", Atari's first arcade game, is released on November 29, 1972.")
+    assert _dates(text) == [(1973, 3, 1), (1981, 8, 12), (1972, 11, 29)]
+
+
+def test_reference_lines_are_skipped():
+    text = ("^ Smith, John (1 January 2019). \"Title\". Example.\n"
+            "Retrieved March 5, 2020.\n"
+            "Archived from the original on 2 May 2018.")
+    assert _dates(text) == []
+
+
+def test_quoted_title_with_publisher_list_is_skipped():
+    text = ("\"The history of artificial intelligence: Complete AI timeline\", Enterprise AI, TechTarget, "
+            "16 August 2023\n"
+            "“Timeline of Computer History,” Computer History Museum, Mountain View, May 4, 2021")
+    assert _dates(text) == []
@@ -0,0 +1,35 @@
+import json
+
+import dump_ingest
+
+
+def _entity(qid, label, classes, sitelinks=("enwiki",), time="+1981-08-12T00:00:00Z"):
+    return json.dumps({
+        "id": qid,
+        "labels": {"en": {"value": label}},
+        "descriptions": {"en": {"value": "test item"}},
+        "sitelinks": {site: {"title": label} for site in sitelinks},
+        "claims": {
+            "P31": [{"mainsnak": {"datavalue": {"value": {"id": cls}}}} for cls in classes],
+            "P585": [{"mainsnak": {"datavalue": {"value": {"time": time, "precision": 11}}}}],
+        },
+    }).encode() + b",\n"
+
+
+def test_event_class_with_enwiki_is_accepted():
+    events = dump_ingest.extract_entities([_entity("Q1", "IBM PC launch", ["Q1656682"])])
+    assert [(e["year"], e["month"], e["day"], e["title"]) for e in events] == [(1981, 8, 12, "IBM PC launch")]
+
+
+def test_non_event_item_is_rejected():
+    # Q13442814 = scholarly article: dated, labelled and linked, but not an event
+    assert dump_ingest.extract_entities([_entity("Q2", "A dated paper", ["Q13442814"])]) == []
+
+
+def test_item_without_enwiki_is_rejected():
+    assert dump_ingest.extract_entities([_entity("Q3", "Local event", ["Q1656682"], sitelinks=("dewiki",))]) == []
+
+
+def test_ingest_requires_a_channel():
+    import inspect
+    assert inspect.signature(dump_ingest.ingest).parameters["channel"].default is inspect.Parameter.empty
@@ -0,0 +1,32 @@
+import pytest
+
+import node_export
+from node_export import EXPORT_PROFILES
+
+@pytest.mark.parametrize("platform,aspect", [
+    ("youtube_shorts", (9, 16)),
+    ("youtube", (16, 9)),
+    ("instagram", (1, 1)),
+    ("douyin", (9, 16)),
+])
+def test_profile_aspects(platform, aspect):
+    assert EXPORT_PROFILES[platform]['aspect'] == aspect
+
+@pytest.mark.parametrize("platform", sorted(EXPORT_PROFILES))
+def test_renditions_match_profile_aspect(platform):
+    aspect_w, aspect_h = EXPORT_PROFILES[platform]['aspect']
+    for rendition in EXPORT_PROFILES[platform]['renditions']:
+        assert abs(rendition['width'] * aspect_h - rendition['height'] * aspect_w) <= aspect_h, rendition
+
+def test_shorts_scale_the_vertical_master_without_fill():
+    profile = EXPORT_PROFILES['youtube_shorts']
+    args = node_export.build_export_command("master.mp4", profile, [], ["a.mp4", "b.mp4"])
+    graph = args[args.index("-filter_complex") + 1]
+    assert "gblur" not in graph
+    assert graph.startswith("[0:v]scale=1080:1920")
+
+def test_square_export_fills_the_sides():
+    args = node_export.build_export_command("master.mp4", EXPORT_PROFILES['instagram'], [], ["sq.mp4"])
+    graph = args[args.index("-filter_complex") + 1]
+    assert "gblur" in graph
+    assert "[fg]" in graph
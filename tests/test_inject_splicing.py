@@ -0,0 +1,54 @@
+import os
+import json
+import shutil
+
+import numpy as np
+import pytest
+
+import podcast_timeline
+from audio_mixer import decode_audio, mix_timeline
+from database_builder.pipeline.ffmpeg_tools import get_ffmpeg_exe
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "inject_assets")
+SAMPLE_RATE = 32000
+
+pytestmark = pytest.mark.skipif(shutil.which(get_ffmpeg_exe()) is None, reason="ffmpeg not available")
+
+@pytest.fixture
+def dialogues():
+    with open(os.path.join(podcast_timeline.SCRIPT_DIR, "podcast_draft.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+@pytest.fixture
+def assets():
+    return podcast_timeline.load_inject_assets(os.path.join(FIXTURES, "inject_assets.json"))
+
+def _speech(dialogues):
+    tone = (np.sin(np.arange(int(0.2 * SAMPLE_RATE)) * 0.05) * 8000).astype("<i2")
+    return {i: tone for i, line in enumerate(dialogues) if line["role"] in ("host", "guest")}
+
+def test_fixtures_cover_every_configured_placeholder(assets):
+    assert set(assets) == set(podcast_timeline.load_inject_assets())
+
+def test_draft_placeholders_are_spliced(dialogues, assets):
+    events = podcast_timeline.build_timeline(dialogues, _speech(dialogues), SAMPLE_RATE, inject_assets=assets)
+    injected = {e["kind"]: e for e in events if e["kind"] != "speech"}
+
+    assert set(injected) == {"song", "ad", "qa"}
+    assert injected["song"]["title"] == "胜利的曙光"
+    # Songs crossfade and are not ducked; spoken inserts keep the gap and push the BGM down
+    assert injected["song"]["crossfade_sec"] > 0 and not injected["song"]["duck"]
+    assert injected["ad"]["crossfade_sec"] == 0 and injected["ad"]["duck"]
+    # max_seconds cuts the 3 s fixture song to 2 s
+    assert len(injected["song"]["samples"]) == pytest.approx(2 * SAMPLE_RATE, abs=SAMPLE_RATE // 20)
+
+def test_spliced_episode_is_longer_than_speech_alone(dialogues, assets, tmp_path):
+    speech = _speech(dialogues)
+    with_inserts = mix_timeline(podcast_timeline.build_timeline(dialogues, speech, SAMPLE_RATE, inject_assets=assets),
+                                str(tmp_path / "with.mp3"), SAMPLE_RATE)
+    speech_only = mix_timeline(podcast_timeline.build_timeline(dialogues, speech, SAMPLE_RATE, inject_assets={}),
+                               str(tmp_path / "without.mp3"), SAMPLE_RATE)
+
+    # 2 s song minus its two crossfades, plus 1.5 s ad and 1.5 s Q&A
+    assert with_inserts - speech_only > 3.0
+    assert len(decode_audio(str(tmp_path / "with.mp3"), SAMPLE_RATE)) / SAMPLE_RATE == pytest.approx(with_inserts, abs=0.2)
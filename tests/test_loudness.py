@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+import loudness
+from loudness import LoudnessMeter, TruePeakLimiter
+
+SAMPLE_RATE = 32000
+
+def _sine(amplitude, frequency, seconds=3.0, phase=0.0):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * frequency * t + phase)).astype(np.float32)
+
+def _blocks(samples, size):
+    return [samples[i:i + size] for i in range(0, samples.size, size)]
+
+@pytest.mark.parametrize("block_size", [333, 1000, 4410, 32000, 320000])
+def test_sub_ceiling_sine_passes_the_limiter_untouched(block_size):
+    signal = _sine(0.8, 100)
+    limiter = TruePeakLimiter(SAMPLE_RATE)
+    out = np.concatenate([limiter.process(block) for block in _blocks(signal, block_size)])
+    np.testing.assert_array_equal(out, signal)
+
+@pytest.mark.parametrize("block_size", [333, 1000, 4410, 32000, 320000])
+def test_streamed_true_peak_matches_the_signal(block_size):
+    meter = LoudnessMeter(SAMPLE_RATE)
+    for block in _blocks(_sine(0.5, 100), block_size):
+        meter.feed(block)
+    assert meter.true_peak_dbtp == pytest.approx(-6.02, abs=0.01)
+
+def test_inter_sample_peak_is_found():
+    # fs/4 at 45 degrees: every sample sits at 0.707 of the peak between them
+    signal = _sine(0.9, SAMPLE_RATE / 4, seconds=0.5, phase=np.pi / 4)
+    assert np.abs(signal).max() == pytest.approx(0.9 / np.sqrt(2), abs=1e-3)
+    # Away from the abrupt start/end, which are real steps with their own overshoot
+    peaks = loudness.oversampled_peak(signal)[1000 * loudness.OVERSAMPLE:-1000 * loudness.OVERSAMPLE]
+    assert peaks.max() == pytest.approx(0.9, abs=0.005)
+
+def test_limiter_holds_loud_signal_under_the_ceiling():
+    signal = _sine(1.2, 3000)
+    limiter = TruePeakLimiter(SAMPLE_RATE)
+    out = np.concatenate([limiter.process(block) for block in _blocks(signal, 4410)])
+    meter = LoudnessMeter(SAMPLE_RATE)
+    meter.feed(out)
+    assert meter.true_peak_dbtp <= loudness.TRUE_PEAK_CEILING_DBTP + 0.05
+
+def test_interpolation_keeps_the_original_samples():
+    phases = loudness.interpolation_phases()
+    identity = np.zeros(phases.shape[1])
+    identity[loudness.TRUE_PEAK_TAPS_PER_PHASE // 2] = 1.0
+    np.testing.assert_allclose(phases[0], identity, atol=1e-12)
+    np.testing.assert_allclose(phases.sum(axis=1), 1.0)
@@ -0,0 +1,36 @@
+import threading
+
+import pytest
+
+import node_preview
+import node_render
+
+@pytest.fixture
+def no_db(monkeypatch):
+    def fail():
+        raise AssertionError("render touched the database")
+    monkeypatch.setattr(node_render, "get_db_connection", fail)
+
+def test_render_refuses_unapproved_job(monkeypatch, no_db):
+    monkeypatch.setattr(node_preview, "REQUIRE_PREVIEW_APPROVAL", True)
+    monkeypatch.setattr(node_preview, "is_approved", lambda job_id: False)
+    assert node_render.render_video_for_job(5) is False
+
+def test_queue_render_runs_in_background_once(monkeypatch):
+    release = threading.Event()
+    done = threading.Event()
+    calls = []
+
+    def fake_render(job_id, concurrency=None):
+        calls.append(job_id)
+        release.wait(5)
+        done.set()
+        return True
+
+    monkeypatch.setattr(node_render, "render_video_for_job", fake_render)
+    assert node_render.queue_render(9) is True
+    # Still rendering: approving twice must not start a second render
+    assert node_render.queue_render(9) is False
+    release.set()
+    assert done.wait(5)
+    assert calls == [9]
@@ -0,0 +1,44 @@
+import pytest
+
+import render_metrics
+from render_metrics import RenderMetrics
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(render_metrics.time, "perf_counter", fake)
+    monkeypatch.setattr(RenderMetrics, "_insert", lambda self: None)
+    return fake
+
+def test_cli_bundling_does_not_count_as_render_time(clock):
+    metrics = RenderMetrics(1, "remotion")
+    metrics.enter_stage("render")
+    metrics.enter_stage("bundle")
+    metrics.feed_line("Bundling 50%")
+    clock.now += 60  # slow bundle + browser startup
+    metrics.feed_line("Getting composition")
+    metrics.feed_line("Rendered 30/300")
+    clock.now += 10
+    metrics.feed_line("Rendered 330/600")
+    metrics.finish(success=True)
+
+    assert metrics.fps == pytest.approx(30.0)
+    assert metrics.eta_sec == pytest.approx(9.0)
+    assert metrics.snapshot()["stages_ms"]["bundle"] == 60000
+
+def test_piece_based_renders_time_from_render_stage(clock):
+    metrics = RenderMetrics(1, "ffmpeg")
+    metrics.add_frames(total=300)
+    metrics.enter_stage("render")
+    clock.now += 5
+    metrics.add_frames(rendered=150, encoded=150)
+    metrics.finish(success=True)
+
+    assert metrics.fps == pytest.approx(30.0)
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+import ffmpeg_renderer
+import render_chunks
+import scene_cache
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(scene_cache, "SCENE_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(render_chunks.time, "sleep", lambda seconds: None)
+    return tmp_path
+
+def test_flaky_scene_is_retried_into_the_cache(cache_dir):
+    attempts = []
+
+    def render_scene(index, frame_range, output_path, concurrency):
+        attempts.append(output_path)
+        if len(attempts) < render_chunks.CHUNK_RETRIES:
+            raise RuntimeError("renderer hiccup")
+        with open(output_path, "wb") as f:
+            f.write(b"segment")
+
+    path = scene_cache._render_into_cache(render_scene, 2, (300, 449), "ab" * 32, 4, job_id=7)
+
+    assert len(attempts) == render_chunks.CHUNK_RETRIES
+    assert path == scene_cache._cache_path("ab" * 32)
+    with open(path, "rb") as f:
+        assert f.read() == b"segment"
+    assert os.listdir(os.path.dirname(path)) == [os.path.basename(path)]
+
+def test_scene_failing_every_attempt_leaves_no_partial_files(cache_dir):
+    def render_scene(index, frame_range, output_path, concurrency):
+        with open(output_path, "wb") as f:
+            f.write(b"half a segment")
+        raise RuntimeError("renderer crashed")
+
+    with pytest.raises(RuntimeError):
+        scene_cache._render_into_cache(render_scene, 0, (0, 149), "cd" * 32, 4, job_id=7)
+    assert os.listdir(os.path.join(str(cache_dir), "cd")) == []
+
+def test_renderer_fingerprint_ignores_source_edits():
+    fingerprint = ffmpeg_renderer.renderer_fingerprint()
+    assert f"v{ffmpeg_renderer.RENDERER_VERSION}" in fingerprint
+    assert fingerprint == ffmpeg_renderer.renderer_fingerprint()
+    assert fingerprint != ffmpeg_renderer.renderer_fingerprint(width=540, height=960)
@@ -0,0 +1,86 @@
+import io
+import json
+import wave
+import shutil
+import urllib.request
+
+import pytest
+
+import ffmpeg_tools
+import stub_tts_server
+
+@pytest.fixture
+def stub():
+    server = stub_tts_server.start_server(port=0)
+    yield f"http://127.0.0.1:{server.server_address[1]}/tts"
+    server.shutdown()
+    server.server_close()
+
+def _post(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return response.headers.get("Content-Type"), response.read()
+
+def test_stub_wav_length_follows_text(stub):
+    text = "大家好，欢迎来到今天的节目。"
+    content_type, body = _post(stub, {"voice_id": "zhoukai", "text": text, "speed_factor": 1.0})
+    assert content_type == "audio/wav"
+    with wave.open(io.BytesIO(body)) as wav:
+        seconds = wav.getnframes() / wav.getframerate()
+    assert seconds == pytest.approx(len(text) / stub_tts_server.CHARS_PER_SECOND, abs=0.01)
+
+def test_stub_raw_mode_streams_the_same_pcm(stub):
+    payload = {"voice_id": "zsy", "text": "十万？八年？", "media_type": "raw", "streaming_mode": True,
+               "sample_rate": 16000}
+    content_type, body = _post(stub, payload)
+    assert content_type == "audio/L16"
+    assert body == stub_tts_server.synth_pcm("十万？八年？", "zsy", 1.0, 16000)
+
+DRAFT = [
+    {"role": "host", "rate": "+5%", "text": "大家好，<break time=\"500ms\"/>欢迎来到今天的节目。"},
+    {"role": "sys_inject_ad", "text": "广告"},
+    {"role": "guest", "rate": "+10%", "text": "<prosody rate=\"fast\">今天是要搞大事情啊？</prosody>"},
+    {"role": "host", "rate": "+0%", "text": "<break time=\"300ms\"/>绝对的大事情。"},
+]
+
+@pytest.fixture
+def synth(tmp_path, monkeypatch):
+    pytest.importorskip("requests")
+    import clip_cache
+    import full_podcast_synth
+    monkeypatch.setattr(full_podcast_synth, "ClipCache", lambda: clip_cache.ClipCache(str(tmp_path / "clips")))
+    draft_file = tmp_path / "draft.json"
+    draft_file.write_text(json.dumps(DRAFT, ensure_ascii=False), encoding="utf-8")
+    return full_podcast_synth, str(draft_file), str(tmp_path / "episode.mp3")
+
+def test_short_script_synthesizes_every_line_through_the_stub(stub, synth):
+    full_podcast_synth, draft_file, output_mp3 = synth
+    lines = full_podcast_synth.plan_lines(DRAFT, engine="stub")
+    voiced = {}
+
+    def run():
+        checkpoint = full_podcast_synth.SynthCheckpoint(full_podcast_synth.checkpoint_path(output_mp3), draft_file)
+        return full_podcast_synth.synthesize_lines(
+            lines, checkpoint, full_podcast_synth.ClipCache(), stub, concurrency=2, engine="stub",
+            sink=lambda k, samples: voiced.__setitem__(lines[k]["index"], samples),
+        )
+
+    stats = run()
+    assert sorted(voiced) == [0, 2, 3]
+    assert all(samples is not None and len(samples) for samples in voiced.values())
+    assert stats["failures"] == 0 and stats["reused"] == 0
+    # The leading <break> of the last line is kept as silence in front of it
+    assert not voiced[3][:int(0.3 * full_podcast_synth.SAMPLE_RATE) - 1].any()
+
+    # Second run: every line comes from the clip cache, no request reaches the server
+    lines = full_podcast_synth.plan_lines(DRAFT, engine="stub")
+    stats = run()
+    assert stats["reused"] == 3 and stats["requests"] == 0
+
+@pytest.mark.skipif(shutil.which(ffmpeg_tools.get_ffmpeg_exe()) is None, reason="ffmpeg not available")
+def test_short_script_encodes_an_episode(stub, synth):
+    full_podcast_synth, draft_file, output_mp3 = synth
+    result = full_podcast_synth.main(draft_file, output_mp3, tts_url=stub, concurrency=2, engine="stub", mix=False)
+    assert result["complete"] and result["lines_done"] == 3
+    assert result["duration_sec"] > 1.0
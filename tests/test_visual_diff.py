@@ -0,0 +1,50 @@
+import shutil
+
+import pytest
+
+import ffmpeg_renderer
+import ffmpeg_tools
+
+SSIM_LINE = ("[Parsed_ssim_4 @ 0x55d0c8e0] SSIM Y:0.912345 (10.583) U:0.954321 (13.402) "
+             "V:0.951234 (13.124) All:0.927654 (11.399)\n")
+PSNR_LINE = ("[Parsed_psnr_5 @ 0x55d0c9a0] PSNR y:28.123456 u:34.567890 v:34.012345 "
+             "average:29.654321 min:25.432100 max:33.210000\n")
+
+def test_parse_diff_scores_reads_summary_lines():
+    scores = ffmpeg_renderer.parse_diff_scores("frame=  300 fps=0.0 q=-0.0 size=N/A\n" + SSIM_LINE + PSNR_LINE)
+    assert scores == {"ssim": 0.927654, "psnr": 29.654321}
+
+def test_parse_diff_scores_identical_inputs_give_inf_psnr():
+    scores = ffmpeg_renderer.parse_diff_scores(SSIM_LINE.replace("0.927654", "1.000000") +
+                                               PSNR_LINE.replace("average:29.654321", "average:inf"))
+    assert scores["ssim"] == 1.0
+    assert scores["psnr"] == float("inf")
+
+def test_parse_diff_scores_raises_on_missing_scores():
+    with pytest.raises(RuntimeError):
+        ffmpeg_renderer.parse_diff_scores("candidate.mp4: No such file or directory\n")
+    with pytest.raises(RuntimeError):
+        ffmpeg_renderer.parse_diff_scores(SSIM_LINE)
+
+def _has_ffmpeg():
+    return shutil.which(ffmpeg_tools.get_ffmpeg_exe()) is not None
+
+@pytest.mark.skipif(not _has_ffmpeg(), reason="ffmpeg not available")
+def test_visual_diff_on_rendered_fixture(tmp_path):
+    reference = str(tmp_path / "reference.mp4")
+    noisy = str(tmp_path / "noisy.mp4")
+    ffmpeg_tools.run_ffmpeg(["-f", "lavfi", "-i", "testsrc2=s=270x480:r=30:d=1",
+                             "-c:v", "libx264", "-crf", "18", "-pix_fmt", "yuv420p", reference])
+    ffmpeg_tools.run_ffmpeg(["-i", reference, "-vf", "noise=alls=40:allf=t",
+                             "-c:v", "libx264", "-crf", "18", "-pix_fmt", "yuv420p", noisy])
+
+    same = ffmpeg_renderer.visual_diff(reference, reference)
+    assert same["ssim"] > 0.99
+    worse = ffmpeg_renderer.visual_diff(reference, noisy)
+    assert worse["ssim"] < same["ssim"]
+    assert worse["psnr"] < same["psnr"]
+
+@pytest.mark.skipif(not _has_ffmpeg(), reason="ffmpeg not available")
+def test_visual_diff_raises_when_ffmpeg_fails(tmp_path):
+    with pytest.raises(RuntimeError):
+        ffmpeg_renderer.visual_diff(str(tmp_path / "missing.mp4"), str(tmp_path / "also_missing.mp4"))
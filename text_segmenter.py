@@ -0,0 +1,228 @@
+"""
+SSML-aware text segmentation for TTS.
+
+Long narrations (stock_replay runs 5,000-8,000 characters) and long dialogue lines are cut
+into pieces at sentence punctuation - falling back to clause punctuation, then a hard cut -
+so the pieces can be synthesized concurrently and stitched back with short pauses. Latency
+then scales with the number of TTS workers instead of the length of the text, and one
+failed request costs one piece instead of the whole narration.
+
+The inline SSML in podcast drafts is honoured instead of stripped:
+  <break time="500ms"/>           ends a piece and becomes that much silence (before the first
+                                  piece when the text opens with it)
+  <prosody rate/pitch/volume=..>  its text becomes pieces of their own with adjusted settings
+Any other tag is dropped and its text kept.
+
+    python text_segmenter.py "<text or path to a .txt/.json draft>"   # show the pieces
+"""
+import os
+import re
+import sys
+import json
+from typing import Any, Dict, List, Optional
+
+SEGMENT_MAX_CHARS = int(os.environ.get("TTS_SEGMENT_MAX_CHARS", "150"))
+SENTENCE_PAUSE_SEC = 0.2   # between pieces cut at 。！？ or a paragraph break
+CLAUSE_PAUSE_SEC = 0.08    # between pieces cut at ，、： (sentence longer than a piece)
+
+SENTENCE_END = "。！？!?；;…\n"
+CLAUSE_END = "，、：,:"
+CLOSERS = "”’」』）)\"'"
+
+# Relative SSML keywords, mapped to what the engines take (rate multiplier / Hz / percent)
+RATE_WORDS = {"x-slow": 0.7, "slow": 0.85, "medium": 1.0, "default": 1.0, "fast": 1.15, "x-fast": 1.3}
+PITCH_WORDS = {"x-low": -20.0, "low": -10.0, "medium": 0.0, "default": 0.0, "high": 10.0, "x-high": 20.0}
+VOLUME_WORDS = {"silent": -100.0, "x-soft": -40.0, "soft": -20.0, "medium": 0.0, "default": 0.0,
+                "loud": 20.0, "x-loud": 40.0}
+BREAK_STRENGTHS = {"none": 0.0, "x-weak": 0.1, "weak": 0.2, "medium": 0.4, "strong": 0.7, "x-strong": 1.0}
+
+TAG_RE = re.compile(r'<\s*(/?)\s*([a-zA-Z]+)([^>]*?)(/?)\s*>')
+ATTR_RE = re.compile(r'([a-zA-Z_-]+)\s*=\s*\\?["\']([^"\'\\]*)\\?["\']')
+SENTENCE_RE = re.compile(rf'[^{SENTENCE_END}]*[{SENTENCE_END}]+[{CLOSERS}]*|[^{SENTENCE_END}]+$')
+CLAUSE_RE = re.compile(rf'[^{CLAUSE_END}]*[{CLAUSE_END}]+[{CLOSERS}]*|[^{CLAUSE_END}]+$')
+SPOKEN_RE = re.compile(r'\w')
+
+def _percent(value: str) -> Optional[float]:
+    match = re.fullmatch(r'\s*([+-]?\d+(?:\.\d+)?)\s*%\s*', value)
+    return float(match.group(1)) if match else None
+
+def parse_rate(value: str) -> float:
+    """SSML rate -> speed multiplier ('fast' -> 1.15, '+20%' -> 1.2, '0.9' -> 0.9)."""
+    value = value.strip().lower()
+    if value in RATE_WORDS:
+        return RATE_WORDS[value]
+    pct = _percent(value)
+    if pct is not None:
+        return max(0.1, 1.0 + pct / 100.0)
+    try:
+        return max(0.1, float(value))
+    except ValueError:
+        return 1.0
+
+def parse_pitch(value: str) -> float:
+    """SSML pitch -> offset in Hz ('high' -> +10, '-5Hz' -> -5)."""
+    value = value.strip().lower()
+    if value in PITCH_WORDS:
+        return PITCH_WORDS[value]
+    match = re.fullmatch(r'([+-]?\d+(?:\.\d+)?)\s*hz', value)
+    return float(match.group(1)) if match else 0.0
+
+def parse_volume(value: str) -> float:
+    """SSML volume -> offset in percent ('loud' -> +20, '-10%' -> -10)."""
+    value = value.strip().lower()
+    if value in VOLUME_WORDS:
+        return VOLUME_WORDS[value]
+    pct = _percent(value)
+    return pct if pct is not None else 0.0
+
+def parse_break(attrs: Dict[str, str]) -> float:
+    """<break time="500ms"/> / time="1.5s" / strength="strong" -> seconds."""
+    time_value = attrs.get("time", "").strip().lower()
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)\s*(ms|s)', time_value)
+    if match:
+        return float(match.group(1)) / (1000.0 if match.group(2) == "ms" else 1.0)
+    return BREAK_STRENGTHS.get(attrs.get("strength", "medium").strip().lower(), BREAK_STRENGTHS["medium"])
+
+def parse_ssml(text: str) -> List[Dict[str, Any]]:
+    """
+    Inline SSML -> runs of plain text with uniform voice settings:
+    [{text, rate, pitch_hz, volume_pct, pause_before_sec, pause_after_sec}]. A break always ends
+    a run; breaks before any text become the first run's pause_before_sec.
+    """
+    runs: List[Dict[str, Any]] = []
+    stack: List[Dict[str, float]] = [{"rate": 1.0, "pitch_hz": 0.0, "volume_pct": 0.0}]
+    force_new = True
+    lead_pause = 0.0
+
+    def add_text(chunk: str):
+        nonlocal force_new
+        if not chunk:
+            return
+        style = stack[-1]
+        if not force_new and runs and all(runs[-1][k] == style[k] for k in style):
+            runs[-1]["text"] += chunk
+        else:
+            runs.append({"text": chunk, **style, "pause_before_sec": 0.0 if runs else lead_pause,
+                         "pause_after_sec": 0.0})
+        force_new = False
+
+    pos = 0
+    for match in TAG_RE.finditer(text):
+        add_text(text[pos:match.start()])
+        pos = match.end()
+        closing, name, attr_text, self_closing = match.group(1), match.group(2).lower(), match.group(3), match.group(4)
+        attrs = {k.lower(): v for k, v in ATTR_RE.findall(attr_text)}
+        if name == "break":
+            if runs:
+                runs[-1]["pause_after_sec"] += parse_break(attrs)
+            else:
+                lead_pause += parse_break(attrs)
+            force_new = True
+        elif name == "prosody" and closing:
+            if len(stack) > 1:
+                stack.pop()
+        elif name == "prosody" and not self_closing:
+            parent = stack[-1]
+            stack.append({
+                "rate": round(parent["rate"] * parse_rate(attrs["rate"]), 4) if "rate" in attrs else parent["rate"],
+                "pitch_hz": parent["pitch_hz"] + parse_pitch(attrs.get("pitch", "default")),
+                "volume_pct": parent["volume_pct"] + parse_volume(attrs.get("volume", "default")),
+            })
+    add_text(text[pos:])
+    return runs
+
+def clean_ssml(text: str) -> str:
+    """Spoken text only, every tag stripped."""
+    return TAG_RE.sub('', text)
+
+def _pack(units: List[str], max_chars: int, pause_sec: float) -> List[Dict[str, Any]]:
+    """Greedily join consecutive units into chunks of at most max_chars (a unit longer than that stands alone)."""
+    chunks: List[Dict[str, Any]] = []
+    for unit in units:
+        if chunks and len(chunks[-1]["text"]) + len(unit) <= max_chars:
+            chunks[-1]["text"] += unit
+        else:
+            chunks.append({"text": unit, "pause_after_sec": pause_sec})
+    return chunks
+
+def split_text(text: str, max_chars: int = SEGMENT_MAX_CHARS) -> List[Dict[str, Any]]:
+    """Plain text -> [{text, pause_after_sec}] of at most max_chars each, cut at the strongest punctuation available."""
+    if len(text) <= max_chars:
+        return [{"text": text, "pause_after_sec": 0.0}]
+    pieces: List[Dict[str, Any]] = []
+    for chunk in _pack(SENTENCE_RE.findall(text), max_chars, SENTENCE_PAUSE_SEC):
+        if len(chunk["text"]) <= max_chars:
+            pieces.append(chunk)
+            continue
+        for sub in _pack(CLAUSE_RE.findall(chunk["text"]), max_chars, CLAUSE_PAUSE_SEC):
+            if len(sub["text"]) <= max_chars:
+                pieces.append(sub)
+                continue
+            # No punctuation for max_chars: hard cut, no pause
+            long_text = sub["text"]
+            for start in range(0, len(long_text), max_chars):
+                pieces.append({"text": long_text[start:start + max_chars], "pause_after_sec": 0.0})
+            pieces[-1]["pause_after_sec"] = sub["pause_after_sec"]
+        pieces[-1]["pause_after_sec"] = chunk["pause_after_sec"]
+    pieces[-1]["pause_after_sec"] = 0.0
+    return pieces
+
+def segment_text(text: str, max_chars: int = SEGMENT_MAX_CHARS) -> List[Dict[str, Any]]:
+    """
+    SSML text -> pieces to synthesize independently and stitch in order:
+    [{text, rate, pitch_hz, volume_pct, pause_before_sec, pause_after_sec}]. Pieces with nothing to
+    pronounce are dropped (their pause moves to the previous piece, or before the first one); the
+    last piece has no trailing pause. Only the first piece can have a pause_before_sec: a text
+    that opens with a <break> keeps that silence.
+    """
+    pieces: List[Dict[str, Any]] = []
+    lead_pause = 0.0
+    for run in parse_ssml(text):
+        style = {k: run[k] for k in ("rate", "pitch_hz", "volume_pct")}
+        lead_pause += run["pause_before_sec"]
+        split = split_text(run["text"].strip(), max_chars)
+        split[-1]["pause_after_sec"] = run["pause_after_sec"]
+        for piece in split:
+            if SPOKEN_RE.search(piece["text"]):
+                pieces.append({"text": piece["text"].strip(), **style, "pause_before_sec": 0.0 if pieces else lead_pause,
+                               "pause_after_sec": piece["pause_after_sec"]})
+            elif pieces:
+                pieces[-1]["pause_after_sec"] += piece["pause_after_sec"]
+            else:
+                lead_pause += piece["pause_after_sec"]
+    if pieces:
+        pieces[-1]["pause_after_sec"] = 0.0
+    return pieces
+
+def _signed(value: float, unit: str) -> str:
+    return f"{int(round(value)):+d}{unit}"
+
+def edge_settings(piece: Dict[str, Any], rate: str = "+0%", pitch: str = "+0Hz", volume: str = "+0%") -> Dict[str, str]:
+    """A piece's rate/pitch/volume on top of a line's base Edge-TTS settings."""
+    base_rate = _percent(rate) or 0.0
+    base_pitch = re.fullmatch(r'\s*([+-]?\d+(?:\.\d+)?)\s*Hz\s*', pitch, re.IGNORECASE)
+    return {
+        "rate": _signed(((1 + base_rate / 100.0) * piece["rate"] - 1) * 100, "%"),
+        "pitch": _signed((float(base_pitch.group(1)) if base_pitch else 0.0) + piece["pitch_hz"], "Hz"),
+        "volume": _signed((_percent(volume) or 0.0) + piece["volume_pct"], "%"),
+    }
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print('Usage: python text_segmenter.py "<text or path to a .txt/.json draft>"')
+        sys.exit(1)
+    source = sys.argv[1]
+    texts = [source]
+    if os.path.exists(source):
+        with open(source, 'r', encoding='utf-8') as f:
+            texts = [d.get("text", "") for d in json.load(f)] if source.endswith(".json") else [f.read()]
+    for t, text in enumerate(texts):
+        pieces = segment_text(text)
+        print(f"--- text {t + 1}: {len(clean_ssml(text))} chars -> {len(pieces)} pieces")
+        if pieces and pieces[0]["pause_before_sec"]:
+            print(f"  <{pieces[0]['pause_before_sec']:.2f}s>")
+        for piece in pieces:
+            style = "" if piece["rate"] == 1.0 and not piece["pitch_hz"] and not piece["volume_pct"] else \
+                f" [rate x{piece['rate']}, {piece['pitch_hz']:+.0f}Hz, {piece['volume_pct']:+.0f}%]"
+            pause = f"  <{piece['pause_after_sec']:.2f}s>" if piece["pause_after_sec"] else ""
+            print(f"  {len(piece['text']):4d}ch{style} {piece['text'][:50]}{pause}")
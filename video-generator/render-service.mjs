@@ -0,0 +1,173 @@
+/**
+ * Long-lived render worker driven by database_builder/pipeline/render_service.py.
+ *
+ * - Bundles src/ once into --bundle-dir (skipped if that bundle already exists; the
+ *   Python side names the dir after a hash of the composition sources).
+ * - Keeps one Chromium instance open and reuses it for every job.
+ * - Serves the staged per-job asset dirs (--static-root) over HTTP, so the bundle
+ *   itself never has to contain job assets.
+ *
+ * Protocol: one JSON request per line on stdin, one JSON message per line on stdout
+ * prefixed with MESSAGE_PREFIX (anything else on stdout is plain log output).
+ */
+import fs from "node:fs";
+import http from "node:http";
+import path from "node:path";
+import readline from "node:readline";
+import { fileURLToPath } from "node:url";
+import { bundle } from "@remotion/bundler";
+import { openBrowser, renderMedia, selectComposition } from "@remotion/renderer";
+import { enableTailwind } from "@remotion/tailwind-v4";
+
+const MESSAGE_PREFIX = "@@render-service ";
+const PROJECT_DIR = path.dirname(fileURLToPath(import.meta.url));
+
+const parseArgs = (argv) => {
+  const args = {};
+  for (let i = 0; i < argv.length; i += 2) {
+    args[argv[i].replace(/^--/, "")] = argv[i + 1];
+  }
+  return args;
+};
+
+const send = (message) => {
+  process.stdout.write(MESSAGE_PREFIX + JSON.stringify(message) + "\n");
+};
+
+const CONTENT_TYPES = {
+  ".png": "image/png",
+  ".jpg": "image/jpeg",
+  ".jpeg": "image/jpeg",
+  ".mp3": "audio/mpeg",
+  ".wav": "audio/wav",
+  ".json": "application/json",
+};
+
+const startStaticServer = (root) =>
+  new Promise((resolve) => {
+    const server = http.createServer((req, res) => {
+      const urlPath = decodeURIComponent(new URL(req.url, "http://localhost").pathname);
+      const filePath = path.join(root, urlPath);
+      if (!filePath.startsWith(root) || !fs.existsSync(filePath) || !fs.statSync(filePath).isFile()) {
+        res.writeHead(404);
+        res.end();
+        return;
+      }
+      res.writeHead(200, {
+        "Content-Type": CONTENT_TYPES[path.extname(filePath).toLowerCase()] || "application/octet-stream",
+        "Content-Length": fs.statSync(filePath).size,
+        "Access-Control-Allow-Origin": "*",
+      });
+      fs.createReadStream(filePath).pipe(res);
+    });
+    server.listen(0, "127.0.0.1", () => resolve(server));
+  });
+
+const ensureBundle = async (bundleDir) => {
+  if (fs.existsSync(path.join(bundleDir, "index.html"))) {
+    return { serveUrl: bundleDir, bundleMs: 0, cached: true };
+  }
+  const start = Date.now();
+  // Assets come from the static server, so the bundle gets an empty public dir
+  const emptyPublicDir = path.join(path.dirname(bundleDir), "empty-public");
+  fs.mkdirSync(emptyPublicDir, { recursive: true });
+  const tmpDir = `${bundleDir}.tmp-${process.pid}`;
+  await bundle({
+    entryPoint: path.join(PROJECT_DIR, "src", "index.ts"),
+    outDir: tmpDir,
+    publicDir: emptyPublicDir,
+    webpackOverride: enableTailwind,
+  });
+  fs.renameSync(tmpDir, bundleDir);
+  return { serveUrl: bundleDir, bundleMs: Date.now() - start, cached: false };
+};
+
+const main = async () => {
+  const args = parseArgs(process.argv.slice(2));
+  const staticRoot = path.resolve(args["static-root"]);
+  fs.mkdirSync(staticRoot, { recursive: true });
+
+  const { serveUrl, bundleMs, cached } = await ensureBundle(path.resolve(args["bundle-dir"]));
+
+  const browserStart = Date.now();
+  const browser = await openBrowser("chrome");
+  const browserMs = Date.now() - browserStart;
+
+  const server = await startStaticServer(staticRoot);
+  const staticUrl = `http://127.0.0.1:${server.address().port}`;
+
+  const handleRender = async (request) => {
+    const start = Date.now();
+    const inputProps = request.inputProps;
+    const composition = await selectComposition({
+      serveUrl,
+      id: request.compositionId,
+      inputProps,
+      puppeteerInstance: browser,
+    });
+    const selectMs = Date.now() - start;
+
+    let firstFrameMs = null;
+    let lastReport = 0;
+    await renderMedia({
+      serveUrl,
+      composition,
+      inputProps,
+      codec: "h264",
+      imageFormat: "jpeg",
+      outputLocation: request.outputLocation,
+      puppeteerInstance: browser,
+      concurrency: request.concurrency ?? null,
+      frameRange: request.frameRange ?? null,
+      muted: request.muted ?? false,
+      // Preview renders: output scale and fast encoder settings
+      scale: request.scale ?? 1,
+      crf: request.crf ?? null,
+      x264Preset: request.x264Preset ?? null,
+      jpegQuality: request.jpegQuality ?? undefined,
+      overwrite: true,
+      onProgress: ({ renderedFrames, encodedFrames, stitchStage, progress }) => {
+        if (firstFrameMs === null && renderedFrames > 0) {
+          firstFrameMs = Date.now() - start;
+        }
+        const now = Date.now();
+        if (now - lastReport > 1000 || progress === 1) {
+          lastReport = now;
+          send({ type: "progress", id: request.id, renderedFrames, encodedFrames, stitchStage, progress });
+        }
+      },
+    });
+
+    send({
+      type: "done",
+      id: request.id,
+      totalMs: Date.now() - start,
+      selectMs,
+      firstFrameMs,
+      frames: composition.durationInFrames,
+    });
+  };
+
+  const rl = readline.createInterface({ input: process.stdin });
+  rl.on("line", (line) => {
+    if (!line.trim()) {
+      return;
+    }
+    const request = JSON.parse(line);
+    handleRender(request).catch((err) => {
+      send({ type: "error", id: request.id, message: String(err && err.stack ? err.stack : err) });
+    });
+  });
+  rl.on("close", async () => {
+    server.close();
+    await browser.close({ silent: true });
+    process.exit(0);
+  });
+
+  send({ type: "ready", serveUrl, staticUrl, bundleMs, bundleCached: cached, browserMs });
+};
+
+main().catch((err) => {
+  send({ type: "fatal", message: String(err && err.stack ? err.stack : err) });
+  process.exit(1);
+});
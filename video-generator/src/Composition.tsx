@@ -5,12 +5,42 @@ import {
   Img,
   Sequence,
   useCurrentFrame,
+  useVideoConfig,
   staticFile,
   interpolate,
 } from "remotion";
-import scriptData from "./current_script.json";
 
-export const MyComposition = () => {
+export type SceneData = {
+  durationInFrames?: number;
+  text?: string;
+  imagePrompt?: string;
+  imageUrl?: string;
+  animationUrl?: string;
+};
+
+// The job's script_json is passed in as input props (`remotion render --props=<file>`),
+// so every render carries its own data and the bundle never changes between jobs.
+export type ScriptProps = {
+  // Set by the render service, which serves staged job assets over HTTP instead of baking them into the bundle
+  assetBaseUrl?: string;
+  audioUrl?: string;
+  bgmUrl?: string;
+  filterStyle?: string;
+  // Review previews render at a lower frame rate; see calculateMetadata in Root.tsx
+  previewFps?: number;
+  scenes: SceneData[];
+};
+
+export const BASE_FPS = 30;
+
+export const DEFAULT_FILTER_STYLE = "sepia(0.3) contrast(1.1) brightness(0.9) grayscale(0.2)";
+
+const resolveAsset = (url: string, assetBaseUrl?: string) => (assetBaseUrl ? `${assetBaseUrl}${url}` : staticFile(url));
+
+export const getTotalFrames = (scenes: SceneData[]) =>
+  scenes.reduce((sum, scene) => sum + (scene.durationInFrames || 150), 0);
+
+export const MyComposition: React.FC<ScriptProps> = (scriptData) => {
   // Accumulate frames to determine exact start time for each scene sequentially
   let runningFrame = 0;
   const scenesWithFrames = scriptData.scenes.map((scene) => {
@@ -21,8 +51,9 @@ export const MyComposition = () => {
   });
 
   // Protect against empty audioUrl in testing
-  const audioSource = scriptData.audioUrl ? staticFile(scriptData.audioUrl) : null;
-  const bgmSource = (scriptData as any).bgmUrl ? staticFile((scriptData as any).bgmUrl) : null;
+  const audioSource = scriptData.audioUrl ? resolveAsset(scriptData.audioUrl, scriptData.assetBaseUrl) : null;
+  const bgmSource = scriptData.bgmUrl ? resolveAsset(scriptData.bgmUrl, scriptData.assetBaseUrl) : null;
+  const filterStyle = scriptData.filterStyle || DEFAULT_FILTER_STYLE;
 
   return (
     <AbsoluteFill style={{ backgroundColor: "#000" }}>
@@ -32,7 +63,13 @@ export const MyComposition = () => {
       {scenesWithFrames.map((scene, index) => {
         return (
           <Sequence key={index} from={scene.startFrame} durationInFrames={scene.durationFrames}>
-            <SceneContent scene={scene} index={index} durationInFrames={scene.durationFrames} />
+            <SceneContent
+              scene={scene}
+              index={index}
+              durationInFrames={scene.durationFrames}
+              filterStyle={filterStyle}
+              assetBaseUrl={scriptData.assetBaseUrl}
+            />
           </Sequence>
         );
       })}
@@ -40,8 +77,15 @@ export const MyComposition = () => {
   );
 };
 
-const SceneContent: React.FC<{ scene: any; index: number; durationInFrames: number }> = ({ scene, index, durationInFrames }) => {
+const SceneContent: React.FC<{
+  scene: SceneData;
+  index: number;
+  durationInFrames: number;
+  filterStyle: string;
+  assetBaseUrl?: string;
+}> = ({ scene, index, durationInFrames, filterStyle, assetBaseUrl }) => {
   const frame = useCurrentFrame();
+  const { fps } = useVideoConfig();
 
   // Dynamic Ken Burns effect based on odd/even scene index (since JSON doesn't specify animation anymore)
   let scale = 1;
@@ -63,8 +107,9 @@ const SceneContent: React.FC<{ scene: any; index: number; durationInFrames: numb
     translateX = interpolate(frame, [0, durationInFrames], [50, -50]);
   }
 
-  // Fade in text
-  const opacity = interpolate(Math.min(frame, 30), [0, 15], [0, 1], {
+  // Fade in text over half a second (15 frames at 30fps)
+  const fadeFrames = fps / 2;
+  const opacity = interpolate(Math.min(frame, fadeFrames * 2), [0, fadeFrames], [0, 1], {
     extrapolateRight: "clamp",
   });
 
@@ -72,13 +117,13 @@ const SceneContent: React.FC<{ scene: any; index: number; durationInFrames: numb
     <AbsoluteFill style={{ overflow: "hidden", justifyContent: "center", alignItems: "center" }}>
       {scene.imageUrl && (
         <Img
-          src={staticFile(scene.imageUrl)}
+          src={resolveAsset(scene.imageUrl, assetBaseUrl)}
           style={{
             minWidth: "100%",
             minHeight: "100%",
             objectFit: "cover",
             transform: `scale(${scale}) translateX(${translateX}px)`,
-            filter: (scriptData as any).filterStyle || "sepia(0.3) contrast(1.1) brightness(0.9) grayscale(0.2)",
+            filter: filterStyle,
           }}
         />
       )}
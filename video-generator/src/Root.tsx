@@ -1,26 +1,43 @@
 import "./index.css";
-import { Composition } from "remotion";
-import { MyComposition } from "./Composition";
-import scriptData from "./current_script.json";
+import { CalculateMetadataFunction, Composition } from "remotion";
+import { BASE_FPS, MyComposition, ScriptProps, getTotalFrames } from "./Composition";
+import sampleScript from "./current_script.json";
 
-// Dynamically calculate total frames from the script JSON
+// Dynamically calculate total frames from the job's input props
 // This ensures the video ends exactly when the audio/scenes end — no more black screens!
-const totalDuration = scriptData.scenes.reduce(
-  (sum: number, scene: { durationInFrames?: number }) => sum + (scene.durationInFrames || 150),
-  0
-);
+// Previews (previewFps) keep the same timing: scene lengths are rescaled from 30fps frames to the preview rate
+const calculateMetadata: CalculateMetadataFunction<ScriptProps> = ({ props }) => {
+  if (!props.previewFps || props.previewFps === BASE_FPS) {
+    return {
+      durationInFrames: getTotalFrames(props.scenes),
+    };
+  }
+  const ratio = props.previewFps / BASE_FPS;
+  const scenes = props.scenes.map((scene) => ({
+    ...scene,
+    durationInFrames: Math.max(1, Math.round((scene.durationInFrames || 150) * ratio)),
+  }));
+  return {
+    durationInFrames: getTotalFrames(scenes),
+    fps: props.previewFps,
+    props: { ...props, scenes },
+  };
+};
 
 // We use 1080x1920 since this is targeted for shorts (Douyin/Xiaohongshu/TikTok)
+// current_script.json is only the Studio preview sample; renders pass each job's script via --props
 export const RemotionRoot: React.FC = () => {
   return (
     <>
       <Composition
         id="IT-History-Today-Xerox-Alto"
         component={MyComposition}
-        durationInFrames={totalDuration}
-        fps={30}
+        durationInFrames={getTotalFrames(sampleScript.scenes)}
+        fps={BASE_FPS}
         width={1080}
         height={1920}
+        defaultProps={sampleScript as ScriptProps}
+        calculateMetadata={calculateMetadata}
       />
     </>
   );